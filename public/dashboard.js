@@ -10385,6 +10385,71 @@ function initAiAnalysis() {
   }
 }
 
+const AI_ANALYSIS_SECTIONS = [
+  ["Key Observations", "key_observations"],
+  ["Positive Indicators", "positive_indicators"],
+  ["Areas of Concern", "areas_of_concern"],
+  ["Recommendations", "recommendations"]
+];
+
+// Builds markdown from the partial submit_analysis tool input streamed so far,
+// keeping only bullets whose JSON string has been fully received
+function partialAiAnalysisMarkdown(partialJson) {
+  let markdown = "";
+  AI_ANALYSIS_SECTIONS.forEach(([title, key]) => {
+    const match = new RegExp(`"${key}"\\s*:\\s*\\[((?:\\s*"(?:[^"\\\\]|\\\\.)*"\\s*,?)*)`).exec(partialJson);
+    const items = match ? match[1].match(/"(?:[^"\\]|\\.)*"/g) : null;
+    if (!items) return;
+    markdown += `## ${title}\n` + items.slice(0, 4).map(item => `- ${JSON.parse(item)}\n`).join("");
+  });
+  return markdown;
+}
+
+// Reads an AI analysis response. The Flask API streams Server-Sent Events
+// ({delta} tool-input fragments followed by a final {success, analysis} or
+// {error} event); onPartial receives markdown for the bullets finished so far.
+// Errors raised before streaming starts, and the Netlify functions, return a
+// single JSON body.
+async function readAiAnalysisResponse(response, onPartial) {
+  const contentType = response.headers.get("Content-Type") || "";
+  if (!contentType.includes("text/event-stream") || !response.body) {
+    return response.json();
+  }
+  
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let partialJson = "";
+  let rendered = "";
+  let result = { error: "AI analysis stream ended unexpectedly" };
+  
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const event = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      if (!event.startsWith("data: ")) continue;
+      const payload = JSON.parse(event.slice(6));
+      if (payload.delta === undefined) {
+        result = payload;
+      } else if (onPartial) {
+        partialJson += payload.delta;
+        const markdown = partialAiAnalysisMarkdown(partialJson);
+        if (markdown && markdown !== rendered) {
+          rendered = markdown;
+          onPartial(markdown);
+        }
+      }
+    }
+  }
+  
+  return result;
+}
+
 async function performAiAnalysis() {
   const analyzeBtn = document.getElementById("isAiAnalyzeBtn");
   const panel = document.getElementById("isAiAnalysisPanel");
@@ -10414,7 +10479,9 @@ async function performAiAnalysis() {
       body: JSON.stringify({ statementData, periodInfo })
     });
     
-    const result = await response.json();
+    const result = await readAiAnalysisResponse(response, markdown => {
+      contentContainer.innerHTML = formatMarkdown(markdown);
+    });
     
     if (result.success && result.analysis) {
       contentContainer.innerHTML = formatMarkdown(result.analysis);
@@ -13765,7 +13832,9 @@ async function performCFAiAnalysis() {
       body: JSON.stringify({ statementData, periodInfo })
     });
     
-    const result = await response.json();
+    const result = await readAiAnalysisResponse(response, markdown => {
+      contentContainer.innerHTML = formatMarkdown(markdown);
+    });
     
     if (result.success && result.analysis) {
       contentContainer.innerHTML = formatMarkdown(result.analysis);
@@ -27601,6 +27670,7 @@ function closeCCDrilldownModal() {
 let adminRoles = [];
 let adminPermissions = [];
 let adminUsers = [];
+let auditFiltersLoaded = false;
 
 function getAuthHeaders() {
   const token = getAuthToken();
@@ -27619,7 +27689,10 @@ function initAdminModule() {
       
       if (tabId === 'users') loadUsers();
       if (tabId === 'roles') loadRoles();
-      if (tabId === 'audit') loadAuditLog();
+      if (tabId === 'audit') {
+        loadAuditLogFilters();
+        loadAuditLog();
+      }
     });
   });
   
@@ -28203,6 +28276,47 @@ async function saveRolePermissions(roleId) {
   }
 }
 
+const AUDIT_CATEGORY_LABELS = {
+  authentication: 'Authentication',
+  security: 'Security',
+  user_management: 'User Management',
+  role_management: 'Role Management',
+  data_access: 'Data Access',
+  general: 'General'
+};
+
+// Fills the category/severity filters from the categories actually logged;
+// fetched once per page load when the audit tab is first opened
+async function loadAuditLogFilters() {
+  if (auditFiltersLoaded) return;
+  auditFiltersLoaded = true;
+  
+  try {
+    const resp = await fetch('/api/admin/audit-log/meta', { headers: getAuthHeaders() });
+    const data = await resp.json();
+    if (!data.success) throw new Error(data.error);
+    
+    const fillSelect = (id, allLabel, values, label) => {
+      const select = document.getElementById(id);
+      if (!select) return;
+      const current = select.value;
+      select.innerHTML = `<option value="">${allLabel}</option>` + values.map(value =>
+        `<option value="${escapeHtml(value)}">${escapeHtml(label(value))}</option>`
+      ).join('');
+      if (values.includes(current)) select.value = current;
+    };
+    
+    fillSelect('auditCategoryFilter', 'All Categories', data.filters.categories,
+      cat => AUDIT_CATEGORY_LABELS[cat] || cat.replace(/_/g, ' ').replace(/\b\w/g, c => c.toUpperCase()));
+    fillSelect('auditSeverityFilter', 'All Severities', data.filters.severities,
+      sev => sev.charAt(0).toUpperCase() + sev.slice(1));
+  } catch (err) {
+    // Keep the built-in options and try again next time the tab opens
+    auditFiltersLoaded = false;
+    console.error('Error loading audit log filters:', err);
+  }
+}
+
 async function loadAuditLog() {
   const tbody = document.getElementById('auditLogBody');
   tbody.innerHTML = '<tr><td colspan="7" class="loading-cell">Loading audit log...</td></tr>';
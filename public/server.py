@@ -1,33 +1,88 @@
 #!/usr/bin/env python3
 import os
 from html import escape as html_escape
+from string import Template
 import json
 import base64
 import uuid
 import hashlib
+import re
 import threading
+import queue
+import sys
+import atexit
+import logging
+import logging.handlers
+from array import array
 import time
-from datetime import datetime, timedelta
+import traceback
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
+from types import MappingProxyType
+from typing import NamedTuple
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from flask import Flask, send_from_directory, request, jsonify, Response
+from flask import Flask, send_from_directory, request, jsonify, Response, g, has_request_context, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 import requests
 from anthropic import Anthropic
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+import bcrypt
 import pyotp
 import qrcode
 import io
 import secrets
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from itsdangerous import URLSafeTimedSerializer, BadData
 from metrics_etl import metrics_cache, init_metrics
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+    def _json_dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode()
+
 app = Flask(__name__, static_folder=None)
 
+if orjson is not None:
+    class OrjsonProvider(DefaultJSONProvider):
+        """jsonify/request.get_json backed by orjson.
+
+        Dates, Decimals, UUIDs etc. still go through Flask's default hook so
+        responses serialize the same way as with the stdlib provider.
+        """
+        _options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=self.default, option=self._options).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+
 SCHEDULER_INTERVAL = 60
 
 # Database connection
 DATABASE_URL = os.environ.get("DATABASE_URL")
+# ThreadedConnectionPool keeps only minconn idle connections and closes the
+# rest on release, so minconn covers every thread that can hold one at once:
+# 8 gunicorn request threads (--threads 8 in .replit), the 8-thread background
+# executor (audit writes) plus the audit writer and scheduler threads
+DB_POOL_MIN_CONN = int(os.environ.get("DB_POOL_MIN_CONN", 18))
+DB_POOL_MAX_CONN = int(os.environ.get("DB_POOL_MAX_CONN", 32))
 
 # Encryption key for TOTP secrets - derived from a secret or generated
 def get_encryption_key():
@@ -51,8 +106,9 @@ def encrypt_totp_secret(secret):
         return None
     return _fernet.encrypt(secret.encode()).decode()
 
+@lru_cache(maxsize=1024)
 def decrypt_totp_secret(encrypted_secret):
-    """Decrypt TOTP secret from database"""
+    """Decrypt TOTP secret from database (memoized by ciphertext; cleared when 2FA is reset or disabled)"""
     if not encrypted_secret:
         return None
     try:
@@ -63,20 +119,103 @@ def decrypt_totp_secret(encrypted_secret):
             return encrypted_secret
         return None
 
+_db_pool = None
+_db_pool_lock = threading.Lock()
+# Pooled connections idle longer than this are pinged before being handed out
+DB_POOL_PING_AFTER = 30  # seconds
+_db_conn_released_at = {}
+
+def get_db_pool():
+    """Create the shared connection pool on first use"""
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = ThreadedConnectionPool(
+                    DB_POOL_MIN_CONN, DB_POOL_MAX_CONN, DATABASE_URL,
+                    cursor_factory=RealDictCursor,
+                    # TCP keepalives so idle pooled sockets are not silently dropped
+                    keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3
+                )
+    return _db_pool
+
 def get_db_connection():
-    return psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+    """Check out a pooled connection; release it with release_db_connection()"""
+    pool = get_db_pool()
+    for _ in range(DB_POOL_MAX_CONN + 1):
+        conn = pool.getconn()
+        released_at = _db_conn_released_at.pop(conn, None)
+        if not conn.closed:
+            if released_at is None or time.monotonic() - released_at < DB_POOL_PING_AFTER:
+                break
+            # conn.closed only flips once a query fails, so a connection the
+            # server dropped while idle (restart, idle timeout) has to be probed
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+                break
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                pass
+        pool.putconn(conn, close=True)
+    else:
+        conn = pool.getconn()
+    if has_request_context():
+        # Tracked so teardown can return connections leaked by an exception
+        g.setdefault('db_connections', []).append(conn)
+    return conn
+
+def release_db_connection(conn):
+    """Return a connection to the pool (rolls back any open transaction)"""
+    if has_request_context():
+        held = g.get('db_connections', [])
+        if conn in held:
+            held.remove(conn)
+    return_db_connection(conn)
+
+def return_db_connection(conn):
+    """putconn() plus the idle timestamp get_db_connection uses to decide on a ping"""
+    _db_conn_released_at[conn] = time.monotonic()
+    get_db_pool().putconn(conn)
+    if conn.closed:
+        # The pool closes connections returned beyond minconn; they are never
+        # checked out again, so their entry would otherwise never be popped
+        _db_conn_released_at.pop(conn, None)
+
+@contextmanager
+def db_cursor():
+    """Yield (conn, cur) from the pool, always closing the cursor and releasing
+    the connection. Commit explicitly; uncommitted work is rolled back on release."""
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        try:
+            yield conn, cur
+        finally:
+            cur.close()
+    finally:
+        release_db_connection(conn)
+
+# bcrypt releases the GIL while hashing, so a small thread pool keeps the
+# expensive key expansion off the request thread and caps how many hashes
+# can compete for CPU at once.
+_bcrypt_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix='bcrypt')
+
+def _bcrypt_hashpw(password):
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+def _bcrypt_checkpw(password, password_hash):
+    return bcrypt.checkpw(password.encode(), password_hash.encode())
 
 def hash_password(password):
     """Hash password using bcrypt for secure storage"""
-    import bcrypt
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    return _bcrypt_executor.submit(_bcrypt_hashpw, password).result()
 
 def verify_password(password, password_hash):
     """Verify password against bcrypt hash, with fallback for SHA-256"""
-    import bcrypt
     try:
         # Try bcrypt first
-        return bcrypt.checkpw(password.encode(), password_hash.encode())
+        return _bcrypt_executor.submit(_bcrypt_checkpw, password, password_hash).result()
     except (ValueError, AttributeError):
         # Fallback to SHA-256 for legacy hashes
         legacy_hash = hashlib.sha256(password.encode()).hexdigest()
@@ -84,10 +223,9 @@ def verify_password(password, password_hash):
 
 def verify_password_with_rehash(password, password_hash):
     """Verify password and indicate if rehash is needed for legacy hashes"""
-    import bcrypt
     try:
         # Try bcrypt first
-        if bcrypt.checkpw(password.encode(), password_hash.encode()):
+        if _bcrypt_executor.submit(_bcrypt_checkpw, password, password_hash).result():
             return True, False  # Valid, no rehash needed
         return False, False  # Invalid
     except (ValueError, AttributeError):
@@ -97,6 +235,10 @@ def verify_password_with_rehash(password, password_hash):
             return True, True  # Valid, needs rehash to bcrypt
         return False, False  # Invalid
 
+# Bump whenever init_database's DDL or seed data changes so existing
+# databases pick up the change on the next start
+SCHEMA_VERSION = 1
+
 def init_database():
     """Initialize database tables and seed default users, roles, and permissions"""
     if not DATABASE_URL:
@@ -107,6 +249,18 @@ def init_database():
         conn = get_db_connection()
         cur = conn.cursor()
         
+        # Skip the DDL entirely when this schema version has already been applied
+        cur.execute("SELECT to_regclass('schema_version') IS NOT NULL AS present")
+        if cur.fetchone()['present']:
+            cur.execute("SELECT version FROM schema_version LIMIT 1")
+            row = cur.fetchone()
+            if row and row['version'] == SCHEMA_VERSION:
+                conn.rollback()
+                cur.close()
+                release_db_connection(conn)
+                print(f"Database schema up to date (version {SCHEMA_VERSION}), skipping initialization")
+                return
+        
         # Create roles table
         cur.execute("""
             CREATE TABLE IF NOT EXISTS roles (
@@ -166,11 +320,8 @@ def init_database():
             ("two_factor_secret", "TEXT"),
             ("two_factor_confirmed_at", "TIMESTAMP")
         ]
-        for col_name, col_def in new_columns:
-            try:
-                cur.execute(f"ALTER TABLE users ADD COLUMN IF NOT EXISTS {col_name} {col_def}")
-            except:
-                pass
+        cur.execute("ALTER TABLE users " + ", ".join(
+            f"ADD COLUMN IF NOT EXISTS {col_name} {col_def}" for col_name, col_def in new_columns))
         
         # Create sessions table with IP tracking
         cur.execute("""
@@ -210,13 +361,20 @@ def init_database():
             ("severity", "VARCHAR(20) DEFAULT 'info'"),
             ("user_agent", "TEXT"),
             ("session_id", "VARCHAR(255)"),
-            ("result", "VARCHAR(20) DEFAULT 'success'")
+            ("result", "VARCHAR(20) DEFAULT 'success'"),
+            # Full-text search over action and IP, kept in sync by Postgres
+            ("search_text", "tsvector GENERATED ALWAYS AS (to_tsvector('simple', coalesce(action, '') || ' ' || coalesce(ip_address, ''))) STORED")
         ]
-        for col_name, col_def in enhanced_audit_columns:
-            try:
-                cur.execute(f"ALTER TABLE audit_log ADD COLUMN IF NOT EXISTS {col_name} {col_def}")
-            except:
-                pass
+        cur.execute("ALTER TABLE audit_log " + ", ".join(
+            f"ADD COLUMN IF NOT EXISTS {col_name} {col_def}" for col_name, col_def in enhanced_audit_columns))
+        
+        # Matches the audit log page order so keyset pagination is an index range scan
+        cur.execute("CREATE INDEX IF NOT EXISTS audit_log_created_at_id_idx ON audit_log (created_at DESC, id DESC)")
+        cur.execute("CREATE INDEX IF NOT EXISTS audit_log_search_text_idx ON audit_log USING GIN (search_text)")
+        # Audit log filters (user, action, category/severity) paired with the page order
+        cur.execute("CREATE INDEX IF NOT EXISTS audit_log_user_created_idx ON audit_log (user_id, created_at DESC)")
+        cur.execute("CREATE INDEX IF NOT EXISTS audit_log_action_created_idx ON audit_log (action, created_at DESC)")
+        cur.execute("CREATE INDEX IF NOT EXISTS audit_log_category_severity_created_idx ON audit_log (category, severity, created_at DESC)")
         
         # Create scheduled_reports table
         cur.execute("""
@@ -238,6 +396,45 @@ def init_database():
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        # Scheduler polls for active, due reports; inactive rows never enter the index
+        cur.execute("CREATE INDEX IF NOT EXISTS scheduled_reports_due_idx ON scheduled_reports (next_send_at) WHERE is_active = TRUE")
+
+        # Next send time for a schedule, computed in the database so writes can
+        # set next_send_at in the same statement. Uses the database clock
+        # (LOCALTIMESTAMP) so it agrees with the scheduler's next_send_at <= NOW()
+        # check regardless of the app server's local timezone.
+        cur.execute("""
+            CREATE OR REPLACE FUNCTION compute_next_send(p_frequency TEXT, p_day_of_week INTEGER, p_day_of_month INTEGER, p_send_time TIME)
+            RETURNS TIMESTAMP AS $$
+            DECLARE
+                now_ts TIMESTAMP := LOCALTIMESTAMP;
+                next_send TIMESTAMP;
+                days_ahead INTEGER;
+            BEGIN
+                IF p_frequency = 'daily' THEN
+                    next_send := now_ts::date + p_send_time;
+                    IF next_send <= now_ts THEN
+                        next_send := next_send + INTERVAL '1 day';
+                    END IF;
+                ELSIF p_frequency = 'weekly' THEN
+                    -- day_of_week uses Python's weekday(): Monday = 0
+                    days_ahead := p_day_of_week - (EXTRACT(ISODOW FROM now_ts)::INTEGER - 1);
+                    IF days_ahead < 0 OR (days_ahead = 0 AND EXTRACT(HOUR FROM now_ts) >= EXTRACT(HOUR FROM p_send_time)) THEN
+                        days_ahead := days_ahead + 7;
+                    END IF;
+                    next_send := now_ts::date + days_ahead + p_send_time;
+                ELSIF p_frequency = 'monthly' THEN
+                    next_send := date_trunc('month', now_ts)::date + (LEAST(p_day_of_month, 28) - 1) + p_send_time;
+                    IF next_send <= now_ts THEN
+                        next_send := next_send + INTERVAL '1 month';
+                    END IF;
+                ELSE
+                    next_send := now_ts + INTERVAL '1 day';
+                END IF;
+                RETURN next_send;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
         
         # Create backup_codes table for 2FA recovery
         cur.execute("""
@@ -261,19 +458,30 @@ def init_database():
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
-        
+
+        # Indexes for hot auth lookups. sessions.token and users.email are
+        # already covered by their UNIQUE constraints.
+        # Session invalidation (password change/reset, disable user, cascades)
+        cur.execute("CREATE INDEX IF NOT EXISTS sessions_user_id_idx ON sessions(user_id)")
+        # Reset-token lookup; only the few users with a pending reset are indexed
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS users_reset_token_idx ON users(password_reset_token)
+            WHERE password_reset_token IS NOT NULL
+        """)
+        # Role names are unique regardless of case; lets create_role rely on ON CONFLICT
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS roles_lower_name_idx ON roles(LOWER(name))")
+
         # Seed default roles
         default_roles = [
             ('admin', 'Full access to all features including user management'),
             ('manager', 'Access to all dashboard pages but not admin functions'),
             ('project_manager', 'Access to job reports and payments')
         ]
-        for role_name, description in default_roles:
-            cur.execute("""
-                INSERT INTO roles (name, description)
-                VALUES (%s, %s)
-                ON CONFLICT (name) DO NOTHING
-            """, (role_name, description))
+        execute_values(cur, """
+            INSERT INTO roles (name, description)
+            VALUES %s
+            ON CONFLICT (name) DO NOTHING
+        """, default_roles)
         
         # Seed default permissions (one per dashboard page)
         default_permissions = [
@@ -295,12 +503,11 @@ def init_database():
             ('ar_aging', 'AR Aging', 'View accounts receivable aging report'),
             ('admin', 'Admin', 'Access user management and settings')
         ]
-        for page_key, page_name, description in default_permissions:
-            cur.execute("""
-                INSERT INTO permissions (page_key, page_name, description)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (page_key) DO NOTHING
-            """, (page_key, page_name, description))
+        execute_values(cur, """
+            INSERT INTO permissions (page_key, page_name, description)
+            VALUES %s
+            ON CONFLICT (page_key) DO NOTHING
+        """, default_permissions)
         
         # Get role IDs
         cur.execute("SELECT id, name FROM roles")
@@ -310,35 +517,26 @@ def init_database():
         cur.execute("SELECT id, page_key FROM permissions")
         perms = {row['page_key']: row['id'] for row in cur.fetchall()}
         
+        default_role_permissions = []
+        
         # Admin role gets all permissions
         if 'admin' in roles:
-            for perm_id in perms.values():
-                cur.execute("""
-                    INSERT INTO role_permissions (role_id, permission_id)
-                    VALUES (%s, %s)
-                    ON CONFLICT DO NOTHING
-                """, (roles['admin'], perm_id))
+            default_role_permissions += [(roles['admin'], perm_id) for perm_id in perms.values()]
         
         # Manager role gets all except admin
         if 'manager' in roles:
-            for page_key, perm_id in perms.items():
-                if page_key != 'admin':
-                    cur.execute("""
-                        INSERT INTO role_permissions (role_id, permission_id)
-                        VALUES (%s, %s)
-                        ON CONFLICT DO NOTHING
-                    """, (roles['manager'], perm_id))
+            default_role_permissions += [(roles['manager'], perm_id) for page_key, perm_id in perms.items() if page_key != 'admin']
         
         # Project Manager role gets job reports and payments
         if 'project_manager' in roles:
             pm_permissions = ['job_overview', 'job_budgets', 'job_actuals', 'over_under_billing', 'cost_codes', 'missing_budgets', 'pm_report', 'payments', 'job_analytics']
-            for page_key in pm_permissions:
-                if page_key in perms:
-                    cur.execute("""
-                        INSERT INTO role_permissions (role_id, permission_id)
-                        VALUES (%s, %s)
-                        ON CONFLICT DO NOTHING
-                    """, (roles['project_manager'], perms[page_key]))
+            default_role_permissions += [(roles['project_manager'], perms[page_key]) for page_key in pm_permissions if page_key in perms]
+        
+        execute_values(cur, """
+            INSERT INTO role_permissions (role_id, permission_id)
+            VALUES %s
+            ON CONFLICT DO NOTHING
+        """, default_role_permissions)
         
         # Only seed default users on first-time initialization (when no users exist)
         cur.execute("SELECT COUNT(*) as count FROM users")
@@ -355,23 +553,27 @@ def init_database():
             
             default_password_hash = hash_password('Ftgb2025$')
             
-            for email, display_name, role_name in default_users:
-                role_id = roles.get(role_name)
-                cur.execute("""
-                    INSERT INTO users (email, display_name, password_hash, role_id, is_active)
-                    VALUES (%s, %s, %s, %s, TRUE)
-                    ON CONFLICT (email) DO NOTHING
-                """, (email, display_name, default_password_hash, role_id))
+            execute_values(cur, """
+                INSERT INTO users (email, display_name, password_hash, role_id, is_active)
+                VALUES %s
+                ON CONFLICT (email) DO NOTHING
+            """, [(email, display_name, default_password_hash, roles.get(role_name))
+                  for email, display_name, role_name in default_users],
+                template="(%s, %s, %s, %s, TRUE)")
         else:
             print(f"Found {user_count} existing users - skipping default user seeding")
         
+        # Record the applied schema version (single row)
+        cur.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+        cur.execute("DELETE FROM schema_version")
+        cur.execute("INSERT INTO schema_version (version) VALUES (%s)", (SCHEMA_VERSION,))
+        
         conn.commit()
         cur.close()
-        conn.close()
+        release_db_connection(conn)
         print("Database initialized successfully with roles and permissions")
     except Exception as e:
         print(f"Database initialization error: {e}")
-        import traceback
         traceback.print_exc()
 
 # Initialize database on startup
@@ -384,13 +586,61 @@ init_metrics()
 # The newest Anthropic model is "claude-sonnet-4-20250514"
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
 
+# One shared client (thread-safe) so AI requests reuse its HTTP connection pool
+_ANTHROPIC_CLIENT = Anthropic(api_key=ANTHROPIC_API_KEY) if ANTHROPIC_API_KEY else None
+
 def get_anthropic_client():
-    if not ANTHROPIC_API_KEY:
+    if _ANTHROPIC_CLIENT is None:
         raise Exception("Anthropic API key not configured. Please add ANTHROPIC_API_KEY to your secrets.")
-    return Anthropic(api_key=ANTHROPIC_API_KEY)
+    return _ANTHROPIC_CLIENT
+
+# Shared HTTP session so Google/connector calls reuse keep-alive connections
+_HTTP = requests.Session()
+_HTTP.mount('https://', requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=20))
+
+# Access tokens by source -> (token, expiry as epoch seconds); refreshed
+# shortly before they lapse instead of on every email/sheet call
+ACCESS_TOKEN_REFRESH_MARGIN = 60  # seconds
+ACCESS_TOKEN_DEFAULT_TTL = 3600  # seconds, when the provider gives no expiry
+_access_token_cache = {}
+_access_token_lock = threading.Lock()
+
+def get_cached_access_token(key):
+    """Return a cached access token that is not about to expire, else None"""
+    with _access_token_lock:
+        entry = _access_token_cache.get(key)
+    if entry and time.time() < entry[1] - ACCESS_TOKEN_REFRESH_MARGIN:
+        return entry[0]
+    return None
+
+def cache_access_token(key, token, expires_at):
+    """Remember an access token until expires_at (epoch seconds)"""
+    with _access_token_lock:
+        _access_token_cache[key] = (token, expires_at)
+
+def invalidate_access_token(token):
+    """Drop the cache entry holding token (revoked or rotated before its expiry)"""
+    with _access_token_lock:
+        for key, entry in list(_access_token_cache.items()):
+            if entry[0] == token:
+                del _access_token_cache[key]
+
+def google_api_request(method, url, get_token, headers=None, **kwargs):
+    """Call a Google API with a cached bearer token from get_token; on a 401
+    the token is dropped from the cache and the call is retried once"""
+    for attempt in range(2):
+        access_token = get_token()
+        response = _HTTP.request(method, url, headers={**(headers or {}), 'Authorization': f'Bearer {access_token}'}, **kwargs)
+        if response.status_code != 401 or attempt:
+            return response
+        invalidate_access_token(access_token)
 
 def get_connector_access_token(connector_name):
     """Get access token for a Replit connector (gmail, google-sheet, etc.)"""
+    cached = get_cached_access_token(connector_name)
+    if cached:
+        return cached
+    
     hostname = os.environ.get('REPLIT_CONNECTORS_HOSTNAME')
     repl_identity = os.environ.get('REPL_IDENTITY')
     web_repl_renewal = os.environ.get('WEB_REPL_RENEWAL')
@@ -405,7 +655,7 @@ def get_connector_access_token(connector_name):
     if not hostname:
         raise Exception('Replit connectors not available. Please try again.')
     
-    response = requests.get(
+    response = _HTTP.get(
         f'https://{hostname}/api/v2/connection?include_secrets=true&connector_names={connector_name}',
         headers={
             'Accept': 'application/json',
@@ -432,6 +682,15 @@ def get_connector_access_token(connector_name):
     if not access_token:
         raise Exception(f'{connector_name} access token not found. Please reconnect.')
     
+    settings = connection_settings.get('settings', {})
+    expires_at = settings.get('expires_at') or settings.get('oauth', {}).get('credentials', {}).get('expires_at')
+    try:
+        expiry = datetime.fromisoformat(expires_at.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        expires_in = settings.get('expires_in') or settings.get('oauth', {}).get('credentials', {}).get('expires_in')
+        expiry = time.time() + (expires_in or ACCESS_TOKEN_DEFAULT_TTL)
+    cache_access_token(connector_name, access_token, expiry)
+    
     return access_token
 
 def get_gmail_access_token():
@@ -439,6 +698,10 @@ def get_gmail_access_token():
 
 def get_sheets_access_token_via_service_account():
     """Get access token using Google Service Account credentials (for production)"""
+    cached = get_cached_access_token('service-account')
+    if cached:
+        return cached
+    
     from google.oauth2 import service_account
     from google.auth.transport.requests import Request
     
@@ -462,24 +725,55 @@ def get_sheets_access_token_via_service_account():
         scopes=['https://www.googleapis.com/auth/spreadsheets.readonly']
     )
     
-    credentials.refresh(Request())
+    credentials.refresh(Request(session=_HTTP))
+    if credentials.expiry:
+        # google-auth reports expiry as naive UTC
+        expiry = credentials.expiry.replace(tzinfo=timezone.utc).timestamp()
+    else:
+        expiry = time.time() + ACCESS_TOKEN_DEFAULT_TTL
+    cache_access_token('service-account', credentials.token, expiry)
     return credentials.token
 
+# Once the connector has failed and the service account worked, skip the
+# connector attempt for a while instead of paying for it on every call
+SHEETS_CONNECTOR_RETRY_AFTER = 300  # seconds
+_sheets_connector_state = {'skip_until': 0}
+
 def get_sheets_access_token():
     """Get Google Sheets access token - tries Replit connector first, falls back to service account"""
+    if time.monotonic() < _sheets_connector_state['skip_until']:
+        return get_sheets_access_token_via_service_account()
     try:
         return get_connector_access_token('google-sheet')
     except Exception as connector_error:
         print(f"Replit connector failed: {connector_error}, trying service account...")
         try:
-            return get_sheets_access_token_via_service_account()
+            token = get_sheets_access_token_via_service_account()
+            _sheets_connector_state['skip_until'] = time.monotonic() + SHEETS_CONNECTOR_RETRY_AFTER
+            return token
         except Exception as sa_error:
             print(f"Service account also failed: {sa_error}")
             raise Exception(f"Could not get Google Sheets access. Connector: {connector_error}. Service Account: {sa_error}")
 
+# Fire-and-forget work (audit writes, notification emails) that shouldn't hold
+# up the HTTP response
+_background_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='background-io')
+
+# Scheduled report emails fan out one send per recipient on this pool
+_email_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='email')
+
+def _run_logged(fn, *args, **kwargs):
+    try:
+        fn(*args, **kwargs)
+    except Exception as e:
+        print(f"[BACKGROUND] {fn.__name__} failed: {e}")
+        traceback.print_exc()
+
+def run_in_background(fn, *args, **kwargs):
+    """Run fn on the background pool; errors are logged rather than raised"""
+    return _background_executor.submit(_run_logged, fn, *args, **kwargs)
+
 def send_gmail(to_email, subject, html_content):
-    access_token = get_gmail_access_token()
-    
     message = MIMEMultipart('alternative')
     message['to'] = to_email
     message['subject'] = subject
@@ -489,12 +783,9 @@ def send_gmail(to_email, subject, html_content):
     
     raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
     
-    response = requests.post(
-        'https://gmail.googleapis.com/gmail/v1/users/me/messages/send',
-        headers={
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json'
-        },
+    response = google_api_request(
+        'POST', 'https://gmail.googleapis.com/gmail/v1/users/me/messages/send', get_gmail_access_token,
+        headers={'Content-Type': 'application/json'},
         json={'raw': raw_message}
     )
     
@@ -503,9 +794,20 @@ def send_gmail(to_email, subject, html_content):
     
     return response.json()
 
+# Per-request access log: request threads only enqueue the record, a
+# background listener does the stdout write
+_request_log_queue = queue.SimpleQueue()
+_request_log_listener = logging.handlers.QueueListener(_request_log_queue, logging.StreamHandler(sys.stdout))
+_request_log_listener.start()
+atexit.register(_request_log_listener.stop)
+request_logger = logging.getLogger('ftg.requests')
+request_logger.setLevel(logging.INFO)
+request_logger.propagate = False
+request_logger.addHandler(logging.handlers.QueueHandler(_request_log_queue))
+
 @app.before_request
 def log_request():
-    print(f"Incoming request: {request.method} {request.path}")
+    request_logger.info("Incoming request: %s %s", request.method, request.path)
     if request.method == 'OPTIONS':
         response = Response()
         response.headers['Access-Control-Allow-Origin'] = '*'
@@ -520,6 +822,15 @@ def add_cors_headers(response):
     response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
     return response
 
+@app.teardown_request
+def release_request_db_connections(exc):
+    """Return any pooled connections a handler failed to release"""
+    for conn in g.pop('db_connections', []):
+        try:
+            return_db_connection(conn)
+        except Exception as e:
+            print(f"Failed to release DB connection: {e}")
+
 @app.route('/api/send-email', methods=['POST', 'OPTIONS'])
 @app.route('/__api__/send-email', methods=['POST', 'OPTIONS'])
 @app.route('/send-email.json', methods=['POST', 'OPTIONS'])
@@ -546,98 +857,116 @@ def api_send_email():
         result = send_gmail(to_email, subject, html_content)
         return jsonify({'success': True, 'messageId': result.get('id')})
     except Exception as e:
-        import traceback
         print(f"Email error: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/analyze-income-statement', methods=['POST', 'OPTIONS'])
-def api_analyze_income_statement():
-    if request.method == 'OPTIONS':
-        return jsonify({'status': 'ok'})
-    
-    try:
-        data = request.get_json(force=True, silent=True)
-        if not data:
-            return jsonify({'error': 'Invalid JSON data'}), 400
-        
-        statement_data = data.get('statementData')
-        period_info = data.get('periodInfo', '')
-        
-        if not statement_data:
-            return jsonify({'error': 'Missing statement data'}), 400
-        
-        client = get_anthropic_client()
-        
-        system_prompt = """You are a CFO analyzing a construction company's Income Statement.
+STATEMENT_ANALYSIS_SECTIONS = (
+    ("Key Observations", "key_observations"),
+    ("Positive Indicators", "positive_indicators"),
+    ("Areas of Concern", "areas_of_concern"),
+    ("Recommendations", "recommendations"),
+)
+
+def build_statement_analysis(result):
+    """Render the 4-section statement analysis JSON as markdown (max 4 bullets each)"""
+    return "\n".join(
+        f"## {title}\n" + "".join(f"- {item}\n" for item in result.get(key, [])[:4])
+        for title, key in STATEMENT_ANALYSIS_SECTIONS
+    )
 
-You must respond with ONLY a valid JSON object containing exactly these 4 arrays:
-{
-  "key_observations": ["observation 1", "observation 2", "observation 3"],
-  "positive_indicators": ["indicator 1", "indicator 2", "indicator 3"],
-  "areas_of_concern": ["concern 1", "concern 2", "concern 3"],
-  "recommendations": ["recommendation 1", "recommendation 2", "recommendation 3"]
-}
+# CFO analysis prompts per statement type: (system prompt, statement name, error log label)
+STATEMENT_ANALYSIS_PROMPTS = {
+    'income_statement': ("""You are a CFO analyzing a construction company's Income Statement.
+
+Submit your analysis with the submit_analysis tool.
 
 STRICT RULES:
-- Return ONLY the JSON object, no other text before or after
-- Each array must have exactly 3-4 items
+- Each list must have exactly 3-4 items
 - Each item is one concise sentence with specific dollar amounts
 - Round all dollar amounts to whole numbers (no decimals) - use $3.8M not $3.84M
-- DO NOT add any other fields or sections"""
+- DO NOT add any other fields or sections""", "Income Statement", "AI Analysis error"),
+    'cash_flow': ("""You are a CFO analyzing a construction company's Statement of Cash Flows.
 
-        user_prompt = f"""Analyze this Income Statement for FTG Builders:
+Submit your analysis with the submit_analysis tool.
 
-Period: {period_info}
+STRICT RULES:
+- Each list must have exactly 3-4 items
+- Each item is one concise sentence with specific dollar amounts
+- Round all dollar amounts to whole numbers - use $3.8M not $3.84M, use $150K not $150,234
+- Focus on cash flow dynamics: operating cash generation, investment decisions, financing activities
+- DO NOT add any other fields or sections""", "Statement of Cash Flows", "Cash Flow AI Analysis error"),
+}
 
-{statement_data}"""
+# Forced tool call so the model returns the four sections as structured input
+# instead of free text that has to be parsed as JSON
+STATEMENT_ANALYSIS_TOOL = {
+    "name": "submit_analysis",
+    "description": "Submit the CFO analysis of the financial statement.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            key: {"type": "array", "items": {"type": "string"}, "minItems": 3, "maxItems": 4}
+            for _, key in STATEMENT_ANALYSIS_SECTIONS
+        },
+        "required": [key for _, key in STATEMENT_ANALYSIS_SECTIONS]
+    }
+}
 
-        # Using Claude Sonnet 4 - the latest model
-        response = client.messages.create(
+def stream_statement_analysis(client, system_prompt, user_prompt, error_label):
+    """Stream a statement analysis as Server-Sent Events.
+
+    The API request is opened before the response starts, so a failure to
+    reach the model raises here and the caller returns a JSON error with a
+    500 status. After that, emits a {'delta': text} event per partial
+    tool-input chunk (the client renders finished bullets as they arrive),
+    then a final {'success': True, 'analysis': markdown} or {'error': ...}
+    event built from the completed submit_analysis call.
+    """
+    def sse(payload):
+        return b"data: " + _json_dumps(payload) + b"\n\n"
+
+    def generate():
+        with client.messages.stream(
             model="claude-sonnet-4-20250514",
             max_tokens=2048,
             system=system_prompt,
             messages=[
                 {"role": "user", "content": user_prompt}
-            ]
-        )
-        
-        import json
-        
-        # Extract text from the response content block
-        content_block = response.content[0]
-        raw_content = getattr(content_block, 'text', '') or ""
-        
-        # Parse the JSON response
-        result = json.loads(raw_content)
-        
-        # Build markdown output with EXACTLY 4 sections, max 4 bullets each
-        analysis = "## Key Observations\n"
-        for item in result.get("key_observations", [])[:4]:
-            analysis += f"- {item}\n"
-        analysis += "\n## Positive Indicators\n"
-        for item in result.get("positive_indicators", [])[:4]:
-            analysis += f"- {item}\n"
-        analysis += "\n## Areas of Concern\n"
-        for item in result.get("areas_of_concern", [])[:4]:
-            analysis += f"- {item}\n"
-        analysis += "\n## Recommendations\n"
-        for item in result.get("recommendations", [])[:4]:
-            analysis += f"- {item}\n"
-        
-        return jsonify({'success': True, 'analysis': analysis})
-        
-    except Exception as e:
-        import traceback
-        print(f"AI Analysis error: {str(e)}")
-        traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+            ],
+            tools=[STATEMENT_ANALYSIS_TOOL],
+            tool_choice={"type": "tool", "name": STATEMENT_ANALYSIS_TOOL["name"]}
+        ) as stream:
+            # SSE comment; reaching it means the request was accepted
+            yield b": connected\n\n"
+            try:
+                for event in stream:
+                    if event.type == 'content_block_delta' and event.delta.type == 'input_json_delta':
+                        yield sse({'delta': event.delta.partial_json})
+                message = stream.get_final_message()
+                result = next(block.input for block in message.content if block.type == 'tool_use')
+                yield sse({'success': True, 'analysis': build_statement_analysis(result)})
+            except Exception as e:
+                print(f"{error_label}: {str(e)}")
+                traceback.print_exc()
+                yield sse({'error': str(e)})
 
-@app.route('/api/analyze-cash-flow', methods=['POST', 'OPTIONS'])
-def api_analyze_cash_flow():
+    events = generate()
+    first = next(events)
+
+    def relay():
+        yield first
+        yield from events
+
+    return Response(stream_with_context(relay()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def run_statement_analysis(statement_type):
+    """Shared handler for the CFO statement analysis endpoints"""
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'})
     
+    system_prompt, statement_name, error_label = STATEMENT_ANALYSIS_PROMPTS[statement_type]
     try:
         data = request.get_json(force=True, silent=True)
         if not data:
@@ -651,67 +980,27 @@ def api_analyze_cash_flow():
         
         client = get_anthropic_client()
         
-        system_prompt = """You are a CFO analyzing a construction company's Statement of Cash Flows.
-
-You must respond with ONLY a valid JSON object containing exactly these 4 arrays:
-{
-  "key_observations": ["observation 1", "observation 2", "observation 3"],
-  "positive_indicators": ["indicator 1", "indicator 2", "indicator 3"],
-  "areas_of_concern": ["concern 1", "concern 2", "concern 3"],
-  "recommendations": ["recommendation 1", "recommendation 2", "recommendation 3"]
-}
-
-STRICT RULES:
-- Return ONLY the JSON object, no other text before or after
-- Each array must have exactly 3-4 items
-- Each item is one concise sentence with specific dollar amounts
-- Round all dollar amounts to whole numbers - use $3.8M not $3.84M, use $150K not $150,234
-- Focus on cash flow dynamics: operating cash generation, investment decisions, financing activities
-- DO NOT add any other fields or sections"""
-
-        user_prompt = f"""Analyze this Statement of Cash Flows for FTG Builders:
+        user_prompt = f"""Analyze this {statement_name} for FTG Builders:
 
 Period: {period_info}
 
 {statement_data}"""
 
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=2048,
-            system=system_prompt,
-            messages=[
-                {"role": "user", "content": user_prompt}
-            ]
-        )
-        
-        import json
-        
-        content_block = response.content[0]
-        raw_content = getattr(content_block, 'text', '') or ""
-        
-        result = json.loads(raw_content)
-        
-        analysis = "## Key Observations\n"
-        for item in result.get("key_observations", [])[:4]:
-            analysis += f"- {item}\n"
-        analysis += "\n## Positive Indicators\n"
-        for item in result.get("positive_indicators", [])[:4]:
-            analysis += f"- {item}\n"
-        analysis += "\n## Areas of Concern\n"
-        for item in result.get("areas_of_concern", [])[:4]:
-            analysis += f"- {item}\n"
-        analysis += "\n## Recommendations\n"
-        for item in result.get("recommendations", [])[:4]:
-            analysis += f"- {item}\n"
-        
-        return jsonify({'success': True, 'analysis': analysis})
+        return stream_statement_analysis(client, system_prompt, user_prompt, error_label)
         
     except Exception as e:
-        import traceback
-        print(f"Cash Flow AI Analysis error: {str(e)}")
+        print(f"{error_label}: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/analyze-income-statement', methods=['POST', 'OPTIONS'])
+def api_analyze_income_statement():
+    return run_statement_analysis('income_statement')
+
+@app.route('/api/analyze-cash-flow', methods=['POST', 'OPTIONS'])
+def api_analyze_cash_flow():
+    return run_statement_analysis('cash_flow')
+
 @app.route('/api/email-cash-report', methods=['POST', 'OPTIONS'])
 def api_email_cash_report():
     """Send Cash Report as HTML email with content embedded in body"""
@@ -737,7 +1026,6 @@ def api_email_cash_report():
         html_content = generate_cash_report_html_email(report_data, ai_analysis)
         
         # Generate subject line with today's date in MM/DD/YY format
-        from datetime import datetime
         today = datetime.now().strftime('%m/%d/%y')
         subject = f"FTG Builders Weekly Cash Report: {today}"
         
@@ -747,182 +1035,12 @@ def api_email_cash_report():
         return jsonify({'success': True, 'messageId': result.get('id')})
         
     except Exception as e:
-        import traceback
         print(f"Cash Report email error: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-def generate_cash_report_html_email(report_data, ai_analysis=''):
-    """Generate HTML email content for Cash Report with Outlook-compatible styling"""
-    import re
-    from datetime import datetime
-    
-    summary = report_data.get('summary', {})
-    safety = report_data.get('safetyCheck', {})
-    deposits = report_data.get('topDeposits', [])
-    withdrawals = report_data.get('topWithdrawals', [])
-    daily_balances = report_data.get('dailyBalances', [])
-    
-    # Format AI analysis - replace "safety check" with "Cash Safety Buffer"
-    formatted_analysis = ai_analysis.replace('Safety check', 'Cash Safety Buffer').replace('safety check', 'Cash safety buffer')
-    if formatted_analysis:
-        # Only color the first dollar amount (the net change) - green for increase, red for decrease
-        # Match "increased $XXX" or "decreased $XXX" at the start of the analysis
-        formatted_analysis = re.sub(
-            r'\b(increased)\s+(\$[\d,\.]+[KMB]?)',
-            r'\1 <span style="color:#16a34a;font-weight:700;">\2</span>',
-            formatted_analysis, count=1, flags=re.IGNORECASE
-        )
-        formatted_analysis = re.sub(
-            r'\b(decreased)\s+(\$[\d,\.]+[KMB]?)',
-            r'\1 <span style="color:#dc2626;font-weight:700;">\2</span>',
-            formatted_analysis, count=1, flags=re.IGNORECASE
-        )
-    
-    # Determine net change color and sign using numeric value when available
-    net_change_raw = summary.get('netChange', '--')
-    net_change_numeric = summary.get('netChangeNumeric', None)
-    
-    # Handle net change formatting with proper sign and color
-    if net_change_numeric is not None and net_change_numeric != 0:
-        sign = '+' if net_change_numeric > 0 else '-'
-        net_change_color = '#16a34a' if net_change_numeric > 0 else '#dc2626'
-        abs_val = abs(net_change_numeric)
-        net_change_raw = sign + '${:,.0f}'.format(abs_val)
-    elif net_change_numeric == 0:
-        net_change_color = '#1e293b'
-        net_change_raw = '$0'
-    elif net_change_raw and net_change_raw != '--':
-        if net_change_raw.startswith('-'):
-            net_change_color = '#dc2626'
-        elif net_change_raw.startswith('+'):
-            net_change_color = '#16a34a'
-        else:
-            net_change_color = '#16a34a'
-            if not net_change_raw.startswith('$'):
-                net_change_raw = '+' + net_change_raw
-            else:
-                net_change_raw = '+' + net_change_raw
-    else:
-        net_change_color = '#1e293b'
-    
-    # Build deposits table rows with Outlook-compatible styling
-    deposits_rows = ''
-    for d in deposits[:5]:
-        deposits_rows += '<tr>'
-        deposits_rows += '<td style="padding:12px 8px;font-size:14px;color:#64748b;border-bottom:1px solid #e2e8f0;">' + d.get("date", "") + '</td>'
-        desc = d.get("description", "")[:40]
-        deposits_rows += '<td style="padding:12px 8px;font-size:14px;color:#1e293b;border-bottom:1px solid #e2e8f0;">' + desc + '</td>'
-        deposits_rows += '<td style="padding:12px 8px;font-size:14px;color:#16a34a;font-weight:600;text-align:right;border-bottom:1px solid #e2e8f0;">' + d.get("amount", "") + '</td>'
-        deposits_rows += '</tr>'
-        if d.get('attribution'):
-            deposits_rows += '<tr><td colspan="3" bgcolor="#f8fafc" style="background-color:#f8fafc;padding:4px 8px 12px 24px;font-size:12px;color:#3b82f6;">&#8226; ' + d.get("attribution", "") + '</td></tr>'
-    
-    # Build withdrawals table rows with Outlook-compatible styling
-    withdrawals_rows = ''
-    for w in withdrawals[:5]:
-        withdrawals_rows += '<tr>'
-        withdrawals_rows += '<td style="padding:12px 8px;font-size:14px;color:#64748b;border-bottom:1px solid #e2e8f0;">' + w.get("date", "") + '</td>'
-        desc = w.get("description", "")[:40]
-        withdrawals_rows += '<td style="padding:12px 8px;font-size:14px;color:#1e293b;border-bottom:1px solid #e2e8f0;">' + desc + '</td>'
-        withdrawals_rows += '<td style="padding:12px 8px;font-size:14px;color:#dc2626;font-weight:600;text-align:right;border-bottom:1px solid #e2e8f0;">' + w.get("amount", "") + '</td>'
-        withdrawals_rows += '</tr>'
-        if w.get('attribution'):
-            withdrawals_rows += '<tr><td colspan="3" bgcolor="#f8fafc" style="background-color:#f8fafc;padding:4px 8px 12px 24px;font-size:12px;color:#3b82f6;">&#8226; ' + w.get("attribution", "") + '</td></tr>'
-    
-    # Build weekly balances vertical bar chart with Outlook-compatible table cells
-    daily_chart_html = ''
-    if daily_balances and len(daily_balances) > 0:
-        balances = [b.get('balance', 0) for b in daily_balances]
-        max_balance = max(balances) if balances else 1
-        min_balance = min(balances) if balances else 0
-        
-        range_buffer = (max_balance - min_balance) * 0.15
-        y_min = min_balance - range_buffer
-        y_max = max_balance + range_buffer
-        y_range = y_max - y_min if y_max > y_min else 1
-        
-        chart_height = 120
-        bar_color = '#3b82f6'
-        
-        # Build vertical bars using nested tables for Outlook compatibility
-        bars_html = ''
-        for db in daily_balances:
-            bal = db.get('balance', 0)
-            bar_height_pct = max(5, ((bal - y_min) / y_range) * 100)
-            bar_px = int((bar_height_pct / 100) * chart_height)
-            spacer_px = chart_height - bar_px
-            
-            bars_html += '<td style="vertical-align:bottom;text-align:center;padding:0 3px;width:' + str(100 // len(daily_balances)) + '%;">'
-            bars_html += '<table width="100%" cellpadding="0" cellspacing="0" border="0"><tr><td style="text-align:center;font-size:10px;color:#475569;padding-bottom:4px;font-weight:600;">' + db.get('formatted', '') + '</td></tr>'
-            if spacer_px > 0:
-                bars_html += '<tr><td height="' + str(spacer_px) + '" style="font-size:1px;line-height:' + str(spacer_px) + 'px;">&nbsp;</td></tr>'
-            bars_html += '<tr><td height="' + str(bar_px) + '" bgcolor="' + bar_color + '" style="background-color:' + bar_color + ';font-size:1px;line-height:' + str(bar_px) + 'px;">&nbsp;</td></tr></table>'
-            bars_html += '</td>'
-        
-        # Build date labels row
-        dates_html = ''
-        for db in daily_balances:
-            dates_html += '<td style="text-align:center;padding:8px 2px 0;font-size:11px;color:#64748b;">' + db.get('date', '') + '</td>'
-        
-        daily_chart_html = '''<table width="100%" cellpadding="0" cellspacing="0" border="0">
-            <tr><td bgcolor="#ffffff" style="background-color:#ffffff;padding:20px 24px;border-left:1px solid #e2e8f0;border-right:1px solid #e2e8f0;">
-                <table width="100%" cellpadding="0" cellspacing="0" border="0">
-                    <tr><td style="font-size:14px;font-weight:600;color:#1e293b;padding-bottom:16px;">Weekly Cash Balance</td></tr>
-                    <tr><td>
-                        <table width="100%" cellpadding="0" cellspacing="0" border="0">
-                            <tr>''' + bars_html + '''</tr>
-                            <tr>''' + dates_html + '''</tr>
-                        </table>
-                    </td></tr>
-                </table>
-            </td></tr>
-        </table>'''
-    
-    # AI summary section with Outlook-compatible styling
-    ai_section = ''
-    if formatted_analysis:
-        sentences = re.split(r'(?<=[.!?])\s+', formatted_analysis.strip())
-        first_sentence = sentences[0] if sentences else ''
-        remaining_sentences = sentences[1:] if len(sentences) > 1 else []
-        
-        bullets_html = ''
-        if remaining_sentences:
-            for sentence in remaining_sentences:
-                if sentence.strip():
-                    bullets_html += '<tr><td style="padding:0 0 6px 0;font-size:14px;line-height:1.6;color:#1e293b;">&#8226; ' + sentence.strip() + '</td></tr>'
-        
-        ai_section = '''<table width="100%" cellpadding="0" cellspacing="0" border="0">
-            <tr><td bgcolor="#f0f9ff" style="background-color:#f0f9ff;padding:20px 24px;border:1px solid #bae6fd;border-top:none;">
-                <table width="100%" cellpadding="0" cellspacing="0" border="0">
-                    <tr><td style="font-size:11px;font-weight:600;color:#64748b;text-transform:uppercase;padding-bottom:8px;">AI SUMMARY</td></tr>
-                    <tr><td style="font-size:15px;line-height:1.6;color:#1e293b;padding-bottom:12px;">''' + first_sentence + '''</td></tr>
-                    ''' + bullets_html + '''
-                </table>
-            </td></tr>
-        </table>'''
-    
-    deposits_content = deposits_rows if deposits_rows else '<tr><td colspan="3" style="padding:16px;text-align:center;color:#64748b;">No deposits</td></tr>'
-    withdrawals_content = withdrawals_rows if withdrawals_rows else '<tr><td colspan="3" style="padding:16px;text-align:center;color:#64748b;">No withdrawals</td></tr>'
-    
-    # Safety total with color
-    safety_total = safety.get('total', '--')
-    safety_color = '#16a34a' if safety_total and not safety_total.startswith('-') else '#dc2626'
-    
-    period_label = summary.get('periodLabel', 'Weekly Cash Report')
-    report_date = datetime.now().strftime('%B %d, %Y')
-    current_balance = summary.get('currentBalance', '--')
-    deposits_val = summary.get('deposits', '--')
-    withdrawals_val = summary.get('withdrawals', '--')
-    safety_cash = safety.get('cash', '--')
-    safety_ar = safety.get('ar', '--')
-    safety_ap = safety.get('ap', '--')
-    safety_oub = safety.get('oub', '--')
-    safety_opexp = safety.get('opExp', '--')
-    gen_date = datetime.now().strftime('%B %d, %Y at %I:%M %p')
-    
-    # Outlook-compatible HTML email with VML support for backgrounds
-    html = '''<!DOCTYPE html>
+# Outlook-compatible HTML email with VML support for backgrounds
+CASH_REPORT_EMAIL_TEMPLATE = Template("""<!DOCTYPE html>
 <html xmlns:v="urn:schemas-microsoft-com:vml" xmlns:o="urn:schemas-microsoft-com:office:office">
 <head>
     <meta charset="utf-8">
@@ -954,8 +1072,8 @@ def generate_cash_report_html_email(report_data, ai_analysis=''):
                                     <td align="center" style="padding:24px;">
                                         <table cellpadding="0" cellspacing="0" border="0">
                                             <tr><td align="center" style="font-size:24px;font-weight:bold;color:#ffffff;font-family:Arial,Helvetica,sans-serif;">FTG Builders Cash Report</td></tr>
-                                            <tr><td align="center" style="font-size:14px;color:#d1d5db;padding-top:8px;font-family:Arial,Helvetica,sans-serif;">''' + period_label + '''</td></tr>
-                                            <tr><td align="center" style="font-size:13px;color:#9ca3af;padding-top:4px;font-family:Arial,Helvetica,sans-serif;">''' + report_date + '''</td></tr>
+                                            <tr><td align="center" style="font-size:14px;color:#d1d5db;padding-top:8px;font-family:Arial,Helvetica,sans-serif;">${period_label}</td></tr>
+                                            <tr><td align="center" style="font-size:13px;color:#9ca3af;padding-top:4px;font-family:Arial,Helvetica,sans-serif;">${report_date}</td></tr>
                                         </table>
                                     </td>
                                 </tr>
@@ -968,10 +1086,10 @@ def generate_cash_report_html_email(report_data, ai_analysis=''):
                     </tr>
                     
                     <!-- AI Summary -->
-                    ''' + ai_section + '''
+                    ${ai_section}
                     
                     <!-- Weekly Chart -->
-                    ''' + daily_chart_html + '''
+                    ${daily_chart_html}
                     
                     <!-- Key Metrics -->
                     <tr>
@@ -981,25 +1099,25 @@ def generate_cash_report_html_email(report_data, ai_analysis=''):
                                     <td width="25%" align="center" style="padding:20px 10px;border-right:1px solid #e2e8f0;">
                                         <table cellpadding="0" cellspacing="0" border="0">
                                             <tr><td align="center" style="font-size:11px;font-weight:600;color:#64748b;text-transform:uppercase;padding-bottom:8px;">CURRENT BALANCE</td></tr>
-                                            <tr><td align="center" style="font-size:22px;font-weight:bold;color:#1e293b;">''' + current_balance + '''</td></tr>
+                                            <tr><td align="center" style="font-size:22px;font-weight:bold;color:#1e293b;">${current_balance}</td></tr>
                                         </table>
                                     </td>
                                     <td width="25%" align="center" style="padding:20px 10px;border-right:1px solid #e2e8f0;">
                                         <table cellpadding="0" cellspacing="0" border="0">
                                             <tr><td align="center" style="font-size:11px;font-weight:600;color:#64748b;text-transform:uppercase;padding-bottom:8px;">DEPOSITS</td></tr>
-                                            <tr><td align="center" style="font-size:22px;font-weight:bold;color:#16a34a;">''' + deposits_val + '''</td></tr>
+                                            <tr><td align="center" style="font-size:22px;font-weight:bold;color:#16a34a;">${deposits_val}</td></tr>
                                         </table>
                                     </td>
                                     <td width="25%" align="center" style="padding:20px 10px;border-right:1px solid #e2e8f0;">
                                         <table cellpadding="0" cellspacing="0" border="0">
                                             <tr><td align="center" style="font-size:11px;font-weight:600;color:#64748b;text-transform:uppercase;padding-bottom:8px;">WITHDRAWALS</td></tr>
-                                            <tr><td align="center" style="font-size:22px;font-weight:bold;color:#dc2626;">''' + withdrawals_val + '''</td></tr>
+                                            <tr><td align="center" style="font-size:22px;font-weight:bold;color:#dc2626;">${withdrawals_val}</td></tr>
                                         </table>
                                     </td>
                                     <td width="25%" align="center" style="padding:20px 10px;">
                                         <table cellpadding="0" cellspacing="0" border="0">
                                             <tr><td align="center" style="font-size:11px;font-weight:600;color:#64748b;text-transform:uppercase;padding-bottom:8px;">NET CHANGE</td></tr>
-                                            <tr><td align="center" style="font-size:22px;font-weight:bold;color:''' + net_change_color + ''';">''' + net_change_raw + '''</td></tr>
+                                            <tr><td align="center" style="font-size:22px;font-weight:bold;color:${net_change_color};">${net_change_raw}</td></tr>
                                         </table>
                                     </td>
                                 </tr>
@@ -1019,17 +1137,17 @@ def generate_cash_report_html_email(report_data, ai_analysis=''):
                                                 <td>
                                                     <table width="100%" cellpadding="0" cellspacing="0" border="0">
                                                         <tr>
-                                                            <td align="center" style="padding:8px;"><span style="font-size:10px;color:#64748b;">CASH</span><br/><span style="font-size:14px;font-weight:bold;">''' + safety_cash + '''</span></td>
+                                                            <td align="center" style="padding:8px;"><span style="font-size:10px;color:#64748b;">CASH</span><br/><span style="font-size:14px;font-weight:bold;">${safety_cash}</span></td>
                                                             <td align="center" style="padding:8px;font-size:16px;color:#64748b;">+</td>
-                                                            <td align="center" style="padding:8px;"><span style="font-size:10px;color:#64748b;">AR</span><br/><span style="font-size:14px;font-weight:bold;color:#16a34a;">''' + safety_ar + '''</span></td>
+                                                            <td align="center" style="padding:8px;"><span style="font-size:10px;color:#64748b;">AR</span><br/><span style="font-size:14px;font-weight:bold;color:#16a34a;">${safety_ar}</span></td>
                                                             <td align="center" style="padding:8px;font-size:16px;color:#64748b;">-</td>
-                                                            <td align="center" style="padding:8px;"><span style="font-size:10px;color:#64748b;">AP</span><br/><span style="font-size:14px;font-weight:bold;color:#dc2626;">''' + safety_ap + '''</span></td>
+                                                            <td align="center" style="padding:8px;"><span style="font-size:10px;color:#64748b;">AP</span><br/><span style="font-size:14px;font-weight:bold;color:#dc2626;">${safety_ap}</span></td>
                                                             <td align="center" style="padding:8px;font-size:16px;color:#64748b;">-</td>
-                                                            <td align="center" style="padding:8px;"><span style="font-size:10px;color:#64748b;">O/U Bill</span><br/><span style="font-size:14px;font-weight:bold;">''' + safety_oub + '''</span></td>
+                                                            <td align="center" style="padding:8px;"><span style="font-size:10px;color:#64748b;">O/U Bill</span><br/><span style="font-size:14px;font-weight:bold;">${safety_oub}</span></td>
                                                             <td align="center" style="padding:8px;font-size:16px;color:#64748b;">-</td>
-                                                            <td align="center" style="padding:8px;"><span style="font-size:10px;color:#64748b;">RESERVE</span><br/><span style="font-size:14px;font-weight:bold;color:#dc2626;">''' + safety_opexp + '''</span></td>
+                                                            <td align="center" style="padding:8px;"><span style="font-size:10px;color:#64748b;">RESERVE</span><br/><span style="font-size:14px;font-weight:bold;color:#dc2626;">${safety_opexp}</span></td>
                                                             <td align="center" style="padding:8px;font-size:16px;color:#64748b;">=</td>
-                                                            <td align="center" bgcolor="#e0f2fe" style="background-color:#e0f2fe;padding:12px;"><span style="font-size:10px;color:#64748b;">BUFFER</span><br/><span style="font-size:16px;font-weight:bold;color:''' + safety_color + ''';">''' + safety_total + '''</span></td>
+                                                            <td align="center" bgcolor="#e0f2fe" style="background-color:#e0f2fe;padding:12px;"><span style="font-size:10px;color:#64748b;">BUFFER</span><br/><span style="font-size:16px;font-weight:bold;color:${safety_color};">${safety_total}</span></td>
                                                         </tr>
                                                     </table>
                                                 </td>
@@ -1057,7 +1175,7 @@ def generate_cash_report_html_email(report_data, ai_analysis=''):
                                                             <th align="left" style="padding:10px 8px;font-size:11px;font-weight:600;color:#64748b;text-transform:uppercase;border-bottom:2px solid #e2e8f0;">Description</th>
                                                             <th align="right" style="padding:10px 8px;font-size:11px;font-weight:600;color:#64748b;text-transform:uppercase;border-bottom:2px solid #e2e8f0;">Amount</th>
                                                         </tr>
-                                                        ''' + deposits_content + '''
+                                                        ${deposits_content}
                                                     </table>
                                                 </td>
                                             </tr>
@@ -1084,7 +1202,7 @@ def generate_cash_report_html_email(report_data, ai_analysis=''):
                                                             <th align="left" style="padding:10px 8px;font-size:11px;font-weight:600;color:#64748b;text-transform:uppercase;border-bottom:2px solid #e2e8f0;">Description</th>
                                                             <th align="right" style="padding:10px 8px;font-size:11px;font-weight:600;color:#64748b;text-transform:uppercase;border-bottom:2px solid #e2e8f0;">Amount</th>
                                                         </tr>
-                                                        ''' + withdrawals_content + '''
+                                                        ${withdrawals_content}
                                                     </table>
                                                 </td>
                                             </tr>
@@ -1099,7 +1217,7 @@ def generate_cash_report_html_email(report_data, ai_analysis=''):
                     <tr>
                         <td align="center" style="padding:24px;">
                             <table cellpadding="0" cellspacing="0" border="0">
-                                <tr><td align="center" style="font-size:12px;color:#64748b;padding-bottom:8px;">Generated by FTG Dashboard on ''' + gen_date + '''</td></tr>
+                                <tr><td align="center" style="font-size:12px;color:#64748b;padding-bottom:8px;">Generated by FTG Dashboard on ${gen_date}</td></tr>
                                 <tr><td align="center"><a href="https://ftg-dashboard.replit.app/" style="font-size:12px;color:#3b82f6;text-decoration:none;">Visit FTG Dashboard for additional detail</a></td></tr>
                             </table>
                         </td>
@@ -1109,9 +1227,212 @@ def generate_cash_report_html_email(report_data, ai_analysis=''):
         </tr>
     </table>
 </body>
-</html>'''
+</html>""")
+
+# Cash report email: color the first "increased/decreased $X" amount, split summary sentences
+_CASH_INCREASE_RE = re.compile(r'\b(increased)\s+(\$[\d,\.]+[KMB]?)', re.IGNORECASE)
+_CASH_DECREASE_RE = re.compile(r'\b(decreased)\s+(\$[\d,\.]+[KMB]?)', re.IGNORECASE)
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+# Strips currency formatting ($, commas, K/M suffixes) before float() in the email bar charts
+_NON_NUMERIC_RE = re.compile(r'[^0-9.-]')
+
+# Top 5 Deposits / Withdrawals table rows; amount_td carries the green/red amount color
+_CASH_ROW_TEMPLATE = (
+    '<tr>'
+    '<td style="padding:12px 8px;font-size:14px;color:#64748b;border-bottom:1px solid #e2e8f0;">{date}</td>'
+    '<td style="padding:12px 8px;font-size:14px;color:#1e293b;border-bottom:1px solid #e2e8f0;">{description}</td>'
+    '{amount_td}{amount}</td>'
+    '</tr>'
+)
+_CASH_ROW_AMOUNT_TD = '<td style="padding:12px 8px;font-size:14px;color:{color};font-weight:600;text-align:right;border-bottom:1px solid #e2e8f0;">'
+_CASH_ROW_ATTRIBUTION_TEMPLATE = '<tr><td colspan="3" bgcolor="#f8fafc" style="background-color:#f8fafc;padding:4px 8px 12px 24px;font-size:12px;color:#3b82f6;">&#8226; {attribution}</td></tr>'
+
+def cash_report_table_rows(items, amount_color):
+    """Build the top 5 deposit/withdrawal rows with Outlook-compatible styling"""
+    amount_td = _CASH_ROW_AMOUNT_TD.format(color=amount_color)
+    parts = []
+    for item in items[:5]:
+        get = item.get
+        # Transaction text comes from the bank feed; escape it before inlining
+        parts.append(_CASH_ROW_TEMPLATE.format(
+            date=html_escape(str(get("date", ""))),
+            description=html_escape(str(get("description", ""))[:40]),
+            amount_td=amount_td,
+            amount=html_escape(str(get("amount", "")))
+        ))
+        attribution = get('attribution')
+        if attribution:
+            parts.append(_CASH_ROW_ATTRIBUTION_TEMPLATE.format(attribution=html_escape(str(attribution))))
+    return ''.join(parts)
+
+def generate_cash_report_html_email(report_data, ai_analysis=''):
+    """Generate HTML email content for Cash Report with Outlook-compatible styling"""
     
-    return html
+    summary = report_data.get('summary', {})
+    safety = report_data.get('safetyCheck', {})
+    deposits = report_data.get('topDeposits', [])
+    withdrawals = report_data.get('topWithdrawals', [])
+    daily_balances = report_data.get('dailyBalances', [])
+    
+    # Format AI analysis - replace "safety check" with "Cash Safety Buffer"
+    formatted_analysis = ai_analysis.replace('Safety check', 'Cash Safety Buffer').replace('safety check', 'Cash safety buffer')
+    if formatted_analysis:
+        # Only color the first dollar amount (the net change) - green for increase, red for decrease
+        # Match "increased $XXX" or "decreased $XXX" at the start of the analysis
+        formatted_analysis = _CASH_INCREASE_RE.sub(
+            r'\1 <span style="color:#16a34a;font-weight:700;">\2</span>',
+            formatted_analysis, count=1
+        )
+        formatted_analysis = _CASH_DECREASE_RE.sub(
+            r'\1 <span style="color:#dc2626;font-weight:700;">\2</span>',
+            formatted_analysis, count=1
+        )
+    
+    # Determine net change color and sign using numeric value when available
+    net_change_raw = summary.get('netChange', '--')
+    net_change_numeric = summary.get('netChangeNumeric', None)
+    
+    # Handle net change formatting with proper sign and color
+    if net_change_numeric is not None and net_change_numeric != 0:
+        sign = '+' if net_change_numeric > 0 else '-'
+        net_change_color = '#16a34a' if net_change_numeric > 0 else '#dc2626'
+        abs_val = abs(net_change_numeric)
+        net_change_raw = sign + '${:,.0f}'.format(abs_val)
+    elif net_change_numeric == 0:
+        net_change_color = '#1e293b'
+        net_change_raw = '$0'
+    elif net_change_raw and net_change_raw != '--':
+        if net_change_raw.startswith('-'):
+            net_change_color = '#dc2626'
+        elif net_change_raw.startswith('+'):
+            net_change_color = '#16a34a'
+        else:
+            net_change_color = '#16a34a'
+            if not net_change_raw.startswith('$'):
+                net_change_raw = '+' + net_change_raw
+            else:
+                net_change_raw = '+' + net_change_raw
+    else:
+        net_change_color = '#1e293b'
+    
+    # Build deposits table rows with Outlook-compatible styling
+    deposits_rows = cash_report_table_rows(deposits, '#16a34a')
+    
+    # Build withdrawals table rows with Outlook-compatible styling
+    withdrawals_rows = cash_report_table_rows(withdrawals, '#dc2626')
+    
+    # Build weekly balances vertical bar chart with Outlook-compatible table cells
+    daily_chart_html = ''
+    if daily_balances and len(daily_balances) > 0:
+        balances = [b.get('balance', 0) for b in daily_balances]
+        max_balance = max(balances) if balances else 1
+        min_balance = min(balances) if balances else 0
+        
+        range_buffer = (max_balance - min_balance) * 0.15
+        y_min = min_balance - range_buffer
+        y_max = max_balance + range_buffer
+        y_range = y_max - y_min if y_max > y_min else 1
+        
+        chart_height = 120
+        bar_color = '#3b82f6'
+        
+        # Build vertical bars using nested tables for Outlook compatibility
+        bar_cell_open = '<td style="vertical-align:bottom;text-align:center;padding:0 3px;width:' + str(100 // len(daily_balances)) + '%;">'
+        bar_parts = []
+        for db, bal in zip(daily_balances, balances):
+            bar_height_pct = max(5, ((bal - y_min) / y_range) * 100)
+            bar_px = int((bar_height_pct / 100) * chart_height)
+            spacer_px = chart_height - bar_px
+            
+            bar_parts += (bar_cell_open, '<table width="100%" cellpadding="0" cellspacing="0" border="0"><tr><td style="text-align:center;font-size:10px;color:#475569;padding-bottom:4px;font-weight:600;">', db.get('formatted', ''), '</td></tr>')
+            if spacer_px > 0:
+                bar_parts.append(f'<tr><td height="{spacer_px}" style="font-size:1px;line-height:{spacer_px}px;">&nbsp;</td></tr>')
+            bar_parts += (f'<tr><td height="{bar_px}" bgcolor="{bar_color}" style="background-color:{bar_color};font-size:1px;line-height:{bar_px}px;">&nbsp;</td></tr></table>', '</td>')
+        bars_html = ''.join(bar_parts)
+        
+        # Build date labels row
+        dates_html = ''.join(
+            '<td style="text-align:center;padding:8px 2px 0;font-size:11px;color:#64748b;">' + db.get('date', '') + '</td>'
+            for db in daily_balances
+        )
+        
+        daily_chart_html = '''<table width="100%" cellpadding="0" cellspacing="0" border="0">
+            <tr><td bgcolor="#ffffff" style="background-color:#ffffff;padding:20px 24px;border-left:1px solid #e2e8f0;border-right:1px solid #e2e8f0;">
+                <table width="100%" cellpadding="0" cellspacing="0" border="0">
+                    <tr><td style="font-size:14px;font-weight:600;color:#1e293b;padding-bottom:16px;">Weekly Cash Balance</td></tr>
+                    <tr><td>
+                        <table width="100%" cellpadding="0" cellspacing="0" border="0">
+                            <tr>''' + bars_html + '''</tr>
+                            <tr>''' + dates_html + '''</tr>
+                        </table>
+                    </td></tr>
+                </table>
+            </td></tr>
+        </table>'''
+    
+    # AI summary section with Outlook-compatible styling
+    ai_section = ''
+    if formatted_analysis:
+        sentences = _SENTENCE_SPLIT_RE.split(formatted_analysis.strip())
+        first_sentence = sentences[0] if sentences else ''
+        remaining_sentences = sentences[1:] if len(sentences) > 1 else []
+        
+        bullets_html = ''.join(
+            '<tr><td style="padding:0 0 6px 0;font-size:14px;line-height:1.6;color:#1e293b;">&#8226; ' + sentence.strip() + '</td></tr>'
+            for sentence in remaining_sentences if sentence.strip()
+        )
+        
+        ai_section = '''<table width="100%" cellpadding="0" cellspacing="0" border="0">
+            <tr><td bgcolor="#f0f9ff" style="background-color:#f0f9ff;padding:20px 24px;border:1px solid #bae6fd;border-top:none;">
+                <table width="100%" cellpadding="0" cellspacing="0" border="0">
+                    <tr><td style="font-size:11px;font-weight:600;color:#64748b;text-transform:uppercase;padding-bottom:8px;">AI SUMMARY</td></tr>
+                    <tr><td style="font-size:15px;line-height:1.6;color:#1e293b;padding-bottom:12px;">''' + first_sentence + '''</td></tr>
+                    ''' + bullets_html + '''
+                </table>
+            </td></tr>
+        </table>'''
+    
+    deposits_content = deposits_rows if deposits_rows else '<tr><td colspan="3" style="padding:16px;text-align:center;color:#64748b;">No deposits</td></tr>'
+    withdrawals_content = withdrawals_rows if withdrawals_rows else '<tr><td colspan="3" style="padding:16px;text-align:center;color:#64748b;">No withdrawals</td></tr>'
+    
+    # Safety total with color
+    safety_total = safety.get('total', '--')
+    safety_color = '#16a34a' if safety_total and not safety_total.startswith('-') else '#dc2626'
+    
+    period_label = summary.get('periodLabel', 'Weekly Cash Report')
+    now = datetime.now()
+    report_date = now.strftime('%B %d, %Y')
+    current_balance = summary.get('currentBalance', '--')
+    deposits_val = summary.get('deposits', '--')
+    withdrawals_val = summary.get('withdrawals', '--')
+    safety_cash = safety.get('cash', '--')
+    safety_ar = safety.get('ar', '--')
+    safety_ap = safety.get('ap', '--')
+    safety_oub = safety.get('oub', '--')
+    safety_opexp = safety.get('opExp', '--')
+    gen_date = now.strftime('%B %d, %Y at %I:%M %p')
+    
+    return CASH_REPORT_EMAIL_TEMPLATE.substitute(
+        period_label=period_label,
+        report_date=report_date,
+        ai_section=ai_section,
+        daily_chart_html=daily_chart_html,
+        current_balance=current_balance,
+        deposits_val=deposits_val,
+        withdrawals_val=withdrawals_val,
+        net_change_color=net_change_color,
+        net_change_raw=net_change_raw,
+        safety_cash=safety_cash,
+        safety_ar=safety_ar,
+        safety_ap=safety_ap,
+        safety_oub=safety_oub,
+        safety_opexp=safety_opexp,
+        safety_color=safety_color,
+        safety_total=safety_total,
+        deposits_content=deposits_content,
+        withdrawals_content=withdrawals_content,
+        gen_date=gen_date,
+    )
 
 
 # ============================================================
@@ -1142,7 +1463,6 @@ def api_email_ap_aging():
         html_content = generate_ap_aging_html_email(report_data)
         
         # Generate subject line with today's date
-        from datetime import datetime
         today = datetime.now().strftime('%m/%d/%y')
         subject = f"FTG Builders AP Aging Report: {today}"
         
@@ -1152,14 +1472,12 @@ def api_email_ap_aging():
         return jsonify({'success': True, 'messageId': result.get('id')})
         
     except Exception as e:
-        import traceback
         print(f"AP Aging email error: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 def generate_ap_aging_html_email(report_data):
     """Generate HTML email content for AP Aging Report with Outlook-compatible styling"""
-    from datetime import datetime
     
     summary = report_data.get('summary', {})
     vendors = report_data.get('vendors', [])
@@ -1174,16 +1492,16 @@ def generate_ap_aging_html_email(report_data):
     data_as_of = summary.get('dataAsOf', '--')
     vendor_count = summary.get('vendorCount', 0)
     
-    report_date = datetime.now().strftime('%B %d, %Y')
-    gen_date = datetime.now().strftime('%B %d, %Y at %I:%M %p')
+    now = datetime.now()
+    report_date = now.strftime('%B %d, %Y')
+    gen_date = now.strftime('%B %d, %Y at %I:%M %p')
     
     # Parse numeric values for bar chart (handle formatted currency strings)
-    import re as re_mod
     def parse_currency(val):
         if isinstance(val, (int, float)):
             return float(val)
         if isinstance(val, str):
-            cleaned = re_mod.sub(r'[^0-9.-]', '', val.replace('(', '-').replace(')', ''))
+            cleaned = _NON_NUMERIC_RE.sub('', val.replace('(', '-').replace(')', ''))
             try:
                 return float(cleaned) if cleaned else 0
             except:
@@ -1439,7 +1757,6 @@ def api_email_balance_sheet():
         
         html_content = generate_balance_sheet_html_email(report_data, ai_analysis)
         
-        from datetime import datetime
         today = datetime.now().strftime('%m/%d/%y')
         subject = f"FTG Builders Balance Sheet: {today}"
         
@@ -1447,20 +1764,19 @@ def api_email_balance_sheet():
         return jsonify({'success': True, 'messageId': result.get('id')})
         
     except Exception as e:
-        import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 def generate_balance_sheet_html_email(report_data, ai_analysis=''):
     """Generate HTML email content for Balance Sheet - Outlook compatible"""
-    from datetime import datetime
     
     period = report_data.get('period', '--')
     summary = report_data.get('summary', {})
     line_items = report_data.get('lineItems', [])
     
-    report_date = datetime.now().strftime('%B %d, %Y')
-    gen_date = datetime.now().strftime('%B %d, %Y at %I:%M %p')
+    now = datetime.now()
+    report_date = now.strftime('%B %d, %Y')
+    gen_date = now.strftime('%B %d, %Y at %I:%M %p')
     
     total_assets = summary.get('totalAssets', '--')
     total_liabilities = summary.get('totalLiabilities', '--')
@@ -1546,7 +1862,6 @@ def api_email_cash_flow():
         
         html_content = generate_cash_flow_html_email(report_data, ai_analysis)
         
-        from datetime import datetime
         today = datetime.now().strftime('%m/%d/%y')
         subject = f"FTG Builders Cash Flow Statement: {today}"
         
@@ -1554,20 +1869,19 @@ def api_email_cash_flow():
         return jsonify({'success': True, 'messageId': result.get('id')})
         
     except Exception as e:
-        import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 def generate_cash_flow_html_email(report_data, ai_analysis=''):
     """Generate HTML email content for Cash Flow Statement - Outlook compatible"""
-    from datetime import datetime
     
     period = report_data.get('period', '--')
     summary = report_data.get('summary', {})
     line_items = report_data.get('lineItems', [])
     
-    report_date = datetime.now().strftime('%B %d, %Y')
-    gen_date = datetime.now().strftime('%B %d, %Y at %I:%M %p')
+    now = datetime.now()
+    report_date = now.strftime('%B %d, %Y')
+    gen_date = now.strftime('%B %d, %Y at %I:%M %p')
     
     operating = summary.get('operating', '--')
     investing = summary.get('investing', '--')
@@ -1661,7 +1975,6 @@ def api_email_job_budgets():
         
         html_content = generate_job_budgets_html_email(report_data, ai_analysis)
         
-        from datetime import datetime
         today = datetime.now().strftime('%m/%d/%y')
         subject = f"FTG Builders Job Budgets Report: {today}"
         
@@ -1669,20 +1982,19 @@ def api_email_job_budgets():
         return jsonify({'success': True, 'messageId': result.get('id')})
         
     except Exception as e:
-        import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 def generate_job_budgets_html_email(report_data, ai_analysis=''):
     """Generate HTML email content for Job Budgets - Outlook compatible"""
-    from datetime import datetime
     
     summary = report_data.get('summary', {})
     jobs = report_data.get('jobs', [])
     pm_filter = report_data.get('pmFilter', 'All')
     
-    report_date = datetime.now().strftime('%B %d, %Y')
-    gen_date = datetime.now().strftime('%B %d, %Y at %I:%M %p')
+    now = datetime.now()
+    report_date = now.strftime('%B %d, %Y')
+    gen_date = now.strftime('%B %d, %Y at %I:%M %p')
     
     total_budget = summary.get('totalBudget', '--')
     total_actual = summary.get('totalActual', '--')
@@ -1772,7 +2084,6 @@ def api_email_job_actuals():
         
         html_content = generate_job_actuals_html_email(report_data, ai_analysis)
         
-        from datetime import datetime
         today = datetime.now().strftime('%m/%d/%y')
         subject = f"FTG Builders Job Actuals Report: {today}"
         
@@ -1780,20 +2091,19 @@ def api_email_job_actuals():
         return jsonify({'success': True, 'messageId': result.get('id')})
         
     except Exception as e:
-        import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 def generate_job_actuals_html_email(report_data, ai_analysis=''):
     """Generate HTML email content for Job Actuals - Outlook compatible"""
-    from datetime import datetime
     
     summary = report_data.get('summary', {})
     jobs = report_data.get('jobs', [])
     pm_filter = report_data.get('pmFilter', 'All')
     
-    report_date = datetime.now().strftime('%B %d, %Y')
-    gen_date = datetime.now().strftime('%B %d, %Y at %I:%M %p')
+    now = datetime.now()
+    report_date = now.strftime('%B %d, %Y')
+    gen_date = now.strftime('%B %d, %Y at %I:%M %p')
     
     total_actual = summary.get('totalActual', '--')
     job_count = summary.get('jobCount', 0)
@@ -1875,7 +2185,6 @@ def api_email_job_overview():
         
         html_content = generate_job_overview_html_email(report_data, ai_analysis)
         
-        from datetime import datetime
         today = datetime.now().strftime('%m/%d/%y')
         subject = f"FTG Builders Job Overview: {today}"
         
@@ -1883,20 +2192,19 @@ def api_email_job_overview():
         return jsonify({'success': True, 'messageId': result.get('id')})
         
     except Exception as e:
-        import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 def generate_job_overview_html_email(report_data, ai_analysis=''):
     """Generate HTML email content for Job Overview - Outlook compatible"""
-    from datetime import datetime
     
     summary = report_data.get('summary', {})
     jobs = report_data.get('jobs', [])
     pm_filter = report_data.get('pmFilter', 'All')
     
-    report_date = datetime.now().strftime('%B %d, %Y')
-    gen_date = datetime.now().strftime('%B %d, %Y at %I:%M %p')
+    now = datetime.now()
+    report_date = now.strftime('%B %d, %Y')
+    gen_date = now.strftime('%B %d, %Y at %I:%M %p')
     
     total_contract = summary.get('totalContract', '--')
     total_billed = summary.get('totalBilled', '--')
@@ -1985,7 +2293,6 @@ def api_email_income_statement():
         
         html_content = generate_income_statement_html_email(report_data, ai_analysis)
         
-        from datetime import datetime
         today = datetime.now().strftime('%m/%d/%y')
         period = report_data.get('period', '')
         subject = f"FTG Builders Income Statement ({period}): {today}"
@@ -1995,21 +2302,20 @@ def api_email_income_statement():
         return jsonify({'success': True, 'messageId': result.get('id')})
         
     except Exception as e:
-        import traceback
         print(f"Income Statement email error: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 def generate_income_statement_html_email(report_data, ai_analysis=''):
     """Generate HTML email content for Income Statement - Outlook compatible"""
-    from datetime import datetime
     
     period = report_data.get('period', '--')
     summary = report_data.get('summary', {})
     line_items = report_data.get('lineItems', [])
     
-    report_date = datetime.now().strftime('%B %d, %Y')
-    gen_date = datetime.now().strftime('%B %d, %Y at %I:%M %p')
+    now = datetime.now()
+    report_date = now.strftime('%B %d, %Y')
+    gen_date = now.strftime('%B %d, %Y at %I:%M %p')
     
     revenue = summary.get('revenue', '--')
     gross_profit = summary.get('grossProfit', '--')
@@ -2107,7 +2413,6 @@ def api_email_overview():
         
         html_content = generate_overview_html_email(report_data, ai_analysis)
         
-        from datetime import datetime
         today = datetime.now().strftime('%m/%d/%y')
         subject = f"FTG Builders Executive Overview: {today}"
         
@@ -2116,20 +2421,19 @@ def api_email_overview():
         return jsonify({'success': True, 'messageId': result.get('id')})
         
     except Exception as e:
-        import traceback
         print(f"Overview email error: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 def generate_overview_html_email(report_data, ai_analysis=''):
     """Generate HTML email content for Executive Overview - Outlook compatible with VML backgrounds"""
-    from datetime import datetime
     
     tiles = report_data.get('tiles', [])
     data_as_of = report_data.get('dataAsOf', '--')
     
-    report_date = datetime.now().strftime('%B %d, %Y')
-    gen_date = datetime.now().strftime('%B %d, %Y at %I:%M %p')
+    now = datetime.now()
+    report_date = now.strftime('%B %d, %Y')
+    gen_date = now.strftime('%B %d, %Y at %I:%M %p')
     
     # Build metric tiles - each tile becomes a professional card
     tiles_html = ''
@@ -2311,7 +2615,6 @@ def api_email_ar_aging():
         html_content = generate_ar_aging_html_email(report_data)
         
         # Generate subject line with today's date
-        from datetime import datetime
         today = datetime.now().strftime('%m/%d/%y')
         subject = f"FTG Builders AR Aging Report: {today}"
         
@@ -2321,14 +2624,12 @@ def api_email_ar_aging():
         return jsonify({'success': True, 'messageId': result.get('id')})
         
     except Exception as e:
-        import traceback
         print(f"AR Aging email error: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 def generate_ar_aging_html_email(report_data):
     """Generate HTML email content for AR Aging Report with Outlook-compatible styling"""
-    from datetime import datetime
     
     summary = report_data.get('summary', {})
     customers = report_data.get('customers', [])
@@ -2344,16 +2645,16 @@ def generate_ar_aging_html_email(report_data):
     data_as_of = summary.get('dataAsOf', '--')
     customer_count = summary.get('customerCount', 0)
     
-    report_date = datetime.now().strftime('%B %d, %Y')
-    gen_date = datetime.now().strftime('%B %d, %Y at %I:%M %p')
+    now = datetime.now()
+    report_date = now.strftime('%B %d, %Y')
+    gen_date = now.strftime('%B %d, %Y at %I:%M %p')
     
     # Parse numeric values for bar chart (handle formatted currency strings)
-    import re as re_mod
     def parse_currency(val):
         if isinstance(val, (int, float)):
             return float(val)
         if isinstance(val, str):
-            cleaned = re_mod.sub(r'[^0-9.-]', '', val.replace('(', '-').replace(')', ''))
+            cleaned = _NON_NUMERIC_RE.sub('', val.replace('(', '-').replace(')', ''))
             try:
                 return float(cleaned) if cleaned else 0
             except:
@@ -2686,11 +2987,52 @@ Write a 3-4 sentence summary paragraph following the format specified."""
         return jsonify({'success': True, 'analysis': analysis})
         
     except Exception as e:
-        import traceback
         print(f"Cash Report AI Analysis error: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+def build_analysis_system_prompt(title, focus):
+    """Four-section CFO analysis prompt for a dashboard page"""
+    return f"""You are a CFO analyzing a construction company's {title}.
+
+You must respond with ONLY a valid JSON object containing exactly these 4 arrays:
+{{
+  "key_observations": ["observation 1", "observation 2", "observation 3"],
+  "positive_indicators": ["indicator 1", "indicator 2", "indicator 3"],
+  "areas_of_concern": ["concern 1", "concern 2", "concern 3"],
+  "recommendations": ["recommendation 1", "recommendation 2", "recommendation 3"]
+}}
+
+STRICT RULES:
+- Return ONLY the JSON object, no other text before or after
+- Each array must have exactly 3-4 items
+- Each item is one concise sentence with specific dollar amounts
+- Round all dollar amounts to whole numbers - use $3.8M not $3.84M, use $150K not $150,234
+- Focus on {focus}
+- DO NOT add any other fields or sections"""
+
+# /api/analyze-* path -> (title, system prompt), formatted once at import
+ANALYSIS_ENDPOINT_PROMPTS = {
+    path: (title, build_analysis_system_prompt(title, focus))
+    for path, (title, focus) in {
+        '/api/analyze-ai-insights': ("Comprehensive Business Analysis", """strategic business intelligence including:
+- Job portfolio health: margin performance, workload distribution across PMs, and completion status
+- Cash position: AR collection efficiency, AP management, and working capital
+- PM performance: compare margins and workload balance, identify top performers and those needing support
+- Risk factors: concentration risk, underperforming segments, and collection concerns
+- Actionable next steps with specific dollar impact where possible"""),
+        '/api/analyze-overview': ("Executive Overview", "P&L and balance sheet metrics"),
+        '/api/analyze-revenue': ("Revenue Analysis", "revenue trends and performance"),
+        '/api/analyze-account': ("GL Account", "account details and trends"),
+        '/api/analyze-pm-report': ("PM Report", "project manager performance, job portfolio, over/under billing, missing budgets, and client relationships"),
+        '/api/analyze-jobs': ("Job Overview", "job performance, contract values, billing status, and profit margins by project manager and client"),
+        '/api/analyze-balance-sheet': ("Balance Sheet", "asset, liability, and equity positions"),
+    }.items()
+}
+
+# Optional ```json ... ``` fence around a model's JSON answer; group 1 is the payload
+_CODE_FENCE_RE = re.compile(r'^\s*(?:```(?:json)?)?\s*(.*?)\s*(?:```)?\s*\Z', re.S)
+
 @app.route('/api/analyze-overview', methods=['POST', 'OPTIONS'])
 @app.route('/api/analyze-revenue', methods=['POST', 'OPTIONS'])
 @app.route('/api/analyze-account', methods=['POST', 'OPTIONS'])
@@ -2768,50 +3110,7 @@ STRICT RULES:
             return jsonify({'error': 'Missing data'}), 400
         
         client = get_anthropic_client()
-        if 'ai-insights' in endpoint:
-            title = "Comprehensive Business Analysis"
-            focus = """strategic business intelligence including:
-- Job portfolio health: margin performance, workload distribution across PMs, and completion status
-- Cash position: AR collection efficiency, AP management, and working capital
-- PM performance: compare margins and workload balance, identify top performers and those needing support
-- Risk factors: concentration risk, underperforming segments, and collection concerns
-- Actionable next steps with specific dollar impact where possible"""
-        elif 'overview' in endpoint:
-            title = "Executive Overview"
-            focus = "P&L and balance sheet metrics"
-        elif 'revenue' in endpoint:
-            title = "Revenue Analysis"
-            focus = "revenue trends and performance"
-        elif 'account' in endpoint:
-            title = "GL Account"
-            focus = "account details and trends"
-        elif 'pm-report' in endpoint:
-            title = "PM Report"
-            focus = "project manager performance, job portfolio, over/under billing, missing budgets, and client relationships"
-        elif 'jobs' in endpoint:
-            title = "Job Overview"
-            focus = "job performance, contract values, billing status, and profit margins by project manager and client"
-        else:
-            title = "Balance Sheet"
-            focus = "asset, liability, and equity positions"
-        
-        system_prompt = f"""You are a CFO analyzing a construction company's {title}.
-
-You must respond with ONLY a valid JSON object containing exactly these 4 arrays:
-{{
-  "key_observations": ["observation 1", "observation 2", "observation 3"],
-  "positive_indicators": ["indicator 1", "indicator 2", "indicator 3"],
-  "areas_of_concern": ["concern 1", "concern 2", "concern 3"],
-  "recommendations": ["recommendation 1", "recommendation 2", "recommendation 3"]
-}}
-
-STRICT RULES:
-- Return ONLY the JSON object, no other text before or after
-- Each array must have exactly 3-4 items
-- Each item is one concise sentence with specific dollar amounts
-- Round all dollar amounts to whole numbers - use $3.8M not $3.84M, use $150K not $150,234
-- Focus on {focus}
-- DO NOT add any other fields or sections"""
+        title, system_prompt = ANALYSIS_ENDPOINT_PROMPTS.get(endpoint, ANALYSIS_ENDPOINT_PROMPTS['/api/analyze-balance-sheet'])
 
         user_prompt = f"""Analyze this {title} for FTG Builders:
 
@@ -2828,7 +3127,6 @@ Period: {period_info}
             ]
         )
         
-        import json
         
         # Handle potential empty or malformed response
         if not response.content or len(response.content) == 0:
@@ -2843,43 +3141,26 @@ Period: {period_info}
             return jsonify({'error': 'AI returned empty analysis. Please try again.'}), 500
         
         # Clean up potential markdown code blocks
-        cleaned_content = raw_content.strip()
-        if cleaned_content.startswith('```json'):
-            cleaned_content = cleaned_content[7:]
-        if cleaned_content.startswith('```'):
-            cleaned_content = cleaned_content[3:]
-        if cleaned_content.endswith('```'):
-            cleaned_content = cleaned_content[:-3]
-        cleaned_content = cleaned_content.strip()
+        cleaned_content = _CODE_FENCE_RE.match(raw_content).group(1)
         
         try:
-            result = json.loads(cleaned_content)
+            result = _json_loads(cleaned_content)
         except json.JSONDecodeError as je:
             print(f"JSON decode error: {str(je)}")
             print(f"Raw content received: {raw_content[:500]}...")
             return jsonify({'error': f'Failed to parse AI response. Please try again.'}), 500
         
-        analysis = "## Key Observations\n"
-        for item in result.get("key_observations", [])[:4]:
-            analysis += f"- {item}\n"
-        analysis += "\n## Positive Indicators\n"
-        for item in result.get("positive_indicators", [])[:4]:
-            analysis += f"- {item}\n"
-        analysis += "\n## Areas of Concern\n"
-        for item in result.get("areas_of_concern", [])[:4]:
-            analysis += f"- {item}\n"
-        analysis += "\n## Recommendations\n"
-        for item in result.get("recommendations", [])[:4]:
-            analysis += f"- {item}\n"
-        
-        return jsonify({'success': True, 'analysis': analysis})
+        return jsonify({'success': True, 'analysis': build_statement_analysis(result)})
         
     except Exception as e:
-        import traceback
         print(f"AI Analysis error: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+# (jobs file mtime, encoded response), swapped as one tuple so concurrent
+# requests never pair a body with another file version's mtime
+pm_list_cache = {'entry': (None, None)}
+
 @app.route('/api/pm-list', methods=['GET', 'OPTIONS'])
 def api_pm_list():
     """Lightweight endpoint to get PM names quickly for the PM Report dropdown"""
@@ -2887,36 +3168,23 @@ def api_pm_list():
         return jsonify({'status': 'ok'})
     
     try:
-        import os
-        import json
-        
-        jobs_path = os.path.join(os.path.dirname(__file__), 'data', 'financials_jobs.json')
-        
-        if not os.path.exists(jobs_path):
+        if not os.path.exists(FINANCIALS_JOBS_PATH):
             return jsonify({'success': False, 'pms': [], 'error': 'Jobs data not found'}), 404
         
-        with open(jobs_path, 'r', encoding='utf-8-sig') as f:
-            data = json.load(f)
-        
-        jobs = data.get('job_budgets', [])
-        generated_at = data.get('generated_at', '')
-        
-        # Extract unique PM names from active jobs only (job_status = 'A')
-        pms = set()
-        for job in jobs:
-            if job.get('job_status', '') == 'A':
-                pm = job.get('project_manager_name', '')
-                if pm and pm.strip():
-                    pms.add(pm.strip())
-        
-        sorted_pms = sorted(list(pms))
+        # PM names from active jobs only (job_status = 'A'); reuse the encoded
+        # response until the jobs file changes
+        sorted_pms, generated_at, mtime = get_active_job_pms()
+        cached_mtime, body = pm_list_cache['entry']
+        if cached_mtime != mtime:
+            body = _json_dumps({
+                'success': True,
+                'pms': sorted_pms,
+                'count': len(sorted_pms),
+                'generated_at': generated_at
+            })
+            pm_list_cache['entry'] = (mtime, body)
         
-        return jsonify({
-            'success': True,
-            'pms': sorted_pms,
-            'count': len(sorted_pms),
-            'generated_at': generated_at
-        })
+        return Response(body, mimetype='application/json')
         
     except Exception as e:
         print(f"[PM-LIST] Error: {e}")
@@ -3006,7 +3274,6 @@ IMPORTANT: Disregard Josh Angelo's numbers from your analysis and commentary. Do
         return jsonify({'success': True, 'analysis': analysis})
         
     except Exception as e:
-        import traceback
         error_msg = str(e)
         print(f"AI Analysis error: {error_msg}")
         traceback.print_exc()
@@ -3020,18 +3287,13 @@ def api_get_sheet_data(spreadsheet_id, sheet_name=None):
         return jsonify({'status': 'ok'})
     
     try:
-        access_token = get_sheets_access_token()
-        
         # Default to first sheet if no name specified
         range_param = sheet_name if sheet_name else 'Sheet1'
         
         # Fetch sheet data using Google Sheets API
-        response = requests.get(
-            f'https://sheets.googleapis.com/v4/spreadsheets/{spreadsheet_id}/values/{range_param}',
-            headers={
-                'Authorization': f'Bearer {access_token}',
-                'Accept': 'application/json'
-            }
+        response = google_api_request(
+            'GET', f'https://sheets.googleapis.com/v4/spreadsheets/{spreadsheet_id}/values/{range_param}',
+            get_sheets_access_token, headers={'Accept': 'application/json'}
         )
         
         if response.status_code != 200:
@@ -3067,7 +3329,6 @@ def api_get_sheet_data(spreadsheet_id, sheet_name=None):
             })
         
     except Exception as e:
-        import traceback
         print(f"Google Sheets error: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
@@ -3095,16 +3356,16 @@ def api_get_cash_data():
         
         print("Fetching fresh cash data from Google Sheets...")
         try:
-            access_token = get_sheets_access_token()
+            get_sheets_access_token()
         except Exception as token_error:
             print(f"Token error: {str(token_error)}")
             return jsonify({'error': f'Google Sheets authentication failed: {str(token_error)}'}), 500
         spreadsheet_id = '1Nkcn2Obvipqn30b-QEfKud0d8G9WTuWicUX07b76wXY'
         
         # Fetch Accounts sheet (columns A=name, B=balance, D=last update)
-        accounts_resp = requests.get(
-            f'https://sheets.googleapis.com/v4/spreadsheets/{spreadsheet_id}/values/Accounts',
-            headers={'Authorization': f'Bearer {access_token}', 'Accept': 'application/json'}
+        accounts_resp = google_api_request(
+            'GET', f'https://sheets.googleapis.com/v4/spreadsheets/{spreadsheet_id}/values/Accounts',
+            get_sheets_access_token, headers={'Accept': 'application/json'}
         )
         
         if accounts_resp.status_code != 200:
@@ -3113,9 +3374,9 @@ def api_get_cash_data():
         accounts_data = accounts_resp.json().get('values', [])
         
         # Fetch Transactions sheet (columns A=date, B=account, C=amount)
-        txn_resp = requests.get(
-            f'https://sheets.googleapis.com/v4/spreadsheets/{spreadsheet_id}/values/Transactions',
-            headers={'Authorization': f'Bearer {access_token}', 'Accept': 'application/json'}
+        txn_resp = google_api_request(
+            'GET', f'https://sheets.googleapis.com/v4/spreadsheets/{spreadsheet_id}/values/Transactions',
+            get_sheets_access_token, headers={'Accept': 'application/json'}
         )
         
         if txn_resp.status_code != 200:
@@ -3193,7 +3454,6 @@ def api_get_cash_data():
         return jsonify(result)
         
     except Exception as e:
-        import traceback
         print(f"Cash data error: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
@@ -3205,14 +3465,9 @@ def api_get_sheet_info(spreadsheet_id):
         return jsonify({'status': 'ok'})
     
     try:
-        access_token = get_sheets_access_token()
-        
-        response = requests.get(
-            f'https://sheets.googleapis.com/v4/spreadsheets/{spreadsheet_id}?fields=properties.title,sheets.properties',
-            headers={
-                'Authorization': f'Bearer {access_token}',
-                'Accept': 'application/json'
-            }
+        response = google_api_request(
+            'GET', f'https://sheets.googleapis.com/v4/spreadsheets/{spreadsheet_id}?fields=properties.title,sheets.properties',
+            get_sheets_access_token, headers={'Accept': 'application/json'}
         )
         
         if response.status_code != 200:
@@ -3239,7 +3494,6 @@ def api_get_sheet_info(spreadsheet_id):
         })
         
     except Exception as e:
-        import traceback
         print(f"Google Sheets info error: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
@@ -3300,7 +3554,6 @@ def log_audit(user_id, action, target_type=None, target_id=None, details=None, r
         user_agent = None
         session_token = None
         try:
-            from flask import has_request_context
             if has_request_context():
                 ip_address = get_client_ip()
                 user_agent = request.headers.get('User-Agent', '')[:500]
@@ -3319,42 +3572,193 @@ def log_audit(user_id, action, target_type=None, target_id=None, details=None, r
             log_msg += f" | result={result}"
         print(log_msg)
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO audit_log (user_id, action, target_type, target_id, details, ip_address, category, severity, user_agent, session_id, result)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
+        # Request details are captured above; the INSERT is batched by the
+        # audit writer thread
+        event = (
             user_id, action, target_type, target_id,
             json.dumps(details) if details else None,
             ip_address, category, severity, user_agent, session_token, result
-        ))
-        conn.commit()
-        cur.close()
-        conn.close()
+        )
+        try:
+            _audit_queue.put_nowait(event)
+        except queue.Full:
+            run_in_background(_write_audit_events, [event])
     except Exception as e:
         print(f"[AUDIT] Error logging event: {e}")
-        import traceback
         traceback.print_exc()
 
-def get_user_permissions(user_id):
-    """Get list of page_keys the user has access to"""
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT p.page_key FROM permissions p
-            JOIN role_permissions rp ON p.id = rp.permission_id
-            JOIN users u ON u.role_id = rp.role_id
-            WHERE u.id = %s
-        """, (user_id,))
-        perms = [row['page_key'] for row in cur.fetchall()]
-        cur.close()
-        conn.close()
+# Audit events queued by log_audit and written in batches by a single thread
+AUDIT_QUEUE_MAX_SIZE = 10000
+AUDIT_BATCH_SIZE = 500
+AUDIT_BATCH_WINDOW = 0.25  # seconds
+_audit_queue = queue.Queue(maxsize=AUDIT_QUEUE_MAX_SIZE)
+
+def _insert_audit_events(events):
+    with db_cursor() as (conn, cur):
+        execute_values(cur, """
+            INSERT INTO audit_log (user_id, action, target_type, target_id, details, ip_address, category, severity, user_agent, session_id, result)
+            VALUES %s
+        """, events)
+        conn.commit()
+
+def _write_audit_events(events):
+    """Insert a batch of audit events; if the batch fails, retry row by row so
+    one bad row (e.g. an FK violation for a deleted user) loses only itself"""
+    try:
+        _insert_audit_events(events)
+        return
+    except Exception as e:
+        if len(events) == 1:
+            print(f"[AUDIT] Error writing event {events[0][1]} for user_id={events[0][0]}: {e}")
+            return
+        print(f"[AUDIT] Error writing batch of {len(events)} events, retrying individually: {e}")
+    for event in events:
+        try:
+            _insert_audit_events([event])
+        except Exception as e:
+            print(f"[AUDIT] Error writing event {event[1]} for user_id={event[0]}: {e}")
+
+def _audit_writer():
+    """Drain the audit queue, inserting whatever arrives within a short window together"""
+    while True:
+        events = [_audit_queue.get()]
+        deadline = time.monotonic() + AUDIT_BATCH_WINDOW
+        while len(events) < AUDIT_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                events.append(_audit_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            _write_audit_events(events)
+        except Exception as e:
+            print(f"[AUDIT] Error writing {len(events)} events: {e}")
+            traceback.print_exc()
+
+def _flush_audit_queue():
+    """Write any events still queued when the worker exits"""
+    while True:
+        events = []
+        while len(events) < AUDIT_BATCH_SIZE:
+            try:
+                events.append(_audit_queue.get_nowait())
+            except queue.Empty:
+                break
+        if not events:
+            return
+        try:
+            _write_audit_events(events)
+        except Exception as e:
+            print(f"[AUDIT] Error flushing {len(events)} events at exit: {e}")
+            return
+
+if DATABASE_URL:
+    threading.Thread(target=_audit_writer, daemon=True, name='audit-writer').start()
+    atexit.register(_flush_audit_queue)
+
+def get_user_permissions(user_id):
+    """Get list of page_keys the user has access to"""
+    try:
+        with db_cursor() as (conn, cur):
+            cur.execute("""
+                SELECT p.page_key FROM permissions p
+                JOIN role_permissions rp ON p.id = rp.permission_id
+                JOIN users u ON u.role_id = rp.role_id
+                WHERE u.id = %s
+            """, (user_id,))
+            perms = [row['page_key'] for row in cur.fetchall()]
         return perms
     except:
         return []
 
+# Permissions change only when a role is edited, so they are cached per role
+# rather than per user. Role edits invalidate this worker's copy directly; the
+# TTL bounds staleness in the other workers.
+ROLE_PERMISSIONS_CACHE_TTL = 60  # seconds
+_role_permissions_cache = {}
+_role_permissions_cache_lock = threading.Lock()
+
+def get_role_permissions(role_id):
+    """Get list of page_keys granted to a role, cached per role"""
+    if role_id is None:
+        return []
+    now = time.monotonic()
+    cached = _role_permissions_cache.get(role_id)
+    if cached and cached[1] > now:
+        return cached[0]
+    try:
+        with db_cursor() as (conn, cur):
+            cur.execute("""
+                SELECT p.page_key FROM permissions p
+                JOIN role_permissions rp ON p.id = rp.permission_id
+                WHERE rp.role_id = %s
+            """, (role_id,))
+            perms = [row['page_key'] for row in cur.fetchall()]
+    except:
+        return []
+    with _role_permissions_cache_lock:
+        _role_permissions_cache[role_id] = (perms, now + ROLE_PERMISSIONS_CACHE_TTL)
+    return perms
+
+def invalidate_role_permissions_cache(role_id):
+    """Drop the cached permissions for a role"""
+    with _role_permissions_cache_lock:
+        _role_permissions_cache.pop(role_id, None)
+
+# Cache for session lookups. Each gunicorn worker keeps its own copy, so the
+# TTL is kept short to bound how long a revoked session can linger elsewhere.
+SESSION_CACHE_TTL = 30  # seconds
+SESSION_CACHE_MAX_ENTRIES = 1000
+_session_cache = {}
+_session_cache_lock = threading.Lock()
+
+def _session_cache_key(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def invalidate_session_cache(token=None, user_id=None):
+    """Drop cached sessions for a token, for a user, or everything when neither is given"""
+    with _session_cache_lock:
+        if token:
+            _session_cache.pop(_session_cache_key(token), None)
+        elif user_id is not None:
+            for key in [k for k, (user, _) in _session_cache.items() if user['id'] == user_id]:
+                del _session_cache[key]
+        else:
+            _session_cache.clear()
+
+# Session tokens are signed so forged or expired tokens can be rejected without
+# touching the database. The sessions table stays authoritative for revocation.
+SESSION_MAX_AGE = 30 * 24 * 3600  # seconds
+
+def get_session_secret():
+    """Signing key for session tokens: SESSION_SECRET, else a key derived from
+    the TOTP key with HKDF so the Fernet key itself never signs tokens"""
+    secret = os.environ.get('SESSION_SECRET')
+    if secret:
+        return secret.encode()
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b'ftg-session-token').derive(ENCRYPTION_KEY)
+
+_session_signer = URLSafeTimedSerializer(get_session_secret(), salt='session-token')
+
+def generate_session_token():
+    """Create a new signed session token"""
+    return _session_signer.dumps(uuid.uuid4().hex)
+
+def session_token_signature_valid(token):
+    """Check a session token's signature and age without a database lookup"""
+    try:
+        _session_signer.loads(token, max_age=SESSION_MAX_AGE)
+        return True
+    except BadData:
+        pass
+    # Unsigned uuid tokens issued before signing was introduced
+    try:
+        return str(uuid.UUID(token)) == token
+    except ValueError:
+        return False
+
 def verify_session(token):
     """Verify session token and return user info or None"""
     if not token:
@@ -3362,20 +3766,37 @@ def verify_session(token):
     # Don't accept 2FA challenge tokens as valid sessions
     if token.startswith('2fa_'):
         return None
+    if not session_token_signature_valid(token):
+        return None
+
+    cache_key = _session_cache_key(token)
+    now = time.monotonic()
+    cached = _session_cache.get(cache_key)
+    if cached and cached[1] > now:
+        return cached[0]
+
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT u.id, u.email, u.display_name, u.is_active, u.two_factor_enabled, r.name as role_name
-            FROM sessions s
-            JOIN users u ON s.user_id = u.id
-            LEFT JOIN roles r ON u.role_id = r.id
-            WHERE s.token = %s AND s.expires_at > NOW()
-        """, (token,))
-        user = cur.fetchone()
-        cur.close()
-        conn.close()
+        with db_cursor() as (conn, cur):
+            cur.execute("""
+                SELECT u.id, u.email, u.display_name, u.is_active, u.two_factor_enabled, u.role_id, r.name as role_name,
+                       EXTRACT(EPOCH FROM (s.expires_at - NOW())) as expires_in
+                FROM sessions s
+                JOIN users u ON s.user_id = u.id
+                LEFT JOIN roles r ON u.role_id = r.id
+                WHERE s.token = %s AND s.expires_at > NOW()
+            """, (token,))
+            user = cur.fetchone()
         if user and user['is_active']:
+            user = dict(user)
+            # Never cache a session past its own expiry
+            ttl = min(SESSION_CACHE_TTL, float(user.pop('expires_in')))
+            with _session_cache_lock:
+                if len(_session_cache) >= SESSION_CACHE_MAX_ENTRIES:
+                    for key in [k for k, (_, exp) in _session_cache.items() if exp <= now]:
+                        del _session_cache[key]
+                    if len(_session_cache) >= SESSION_CACHE_MAX_ENTRIES:
+                        _session_cache.clear()
+                _session_cache[cache_key] = (user, now + ttl)
             return user
         return None
     except:
@@ -3383,7 +3804,6 @@ def verify_session(token):
 
 def require_auth(f):
     """Decorator to require authentication"""
-    from functools import wraps
     @wraps(f)
     def decorated(*args, **kwargs):
         token = request.headers.get('Authorization', '').replace('Bearer ', '')
@@ -3396,7 +3816,6 @@ def require_auth(f):
 
 def require_admin(f):
     """Decorator to require admin role"""
-    from functools import wraps
     @wraps(f)
     def decorated(*args, **kwargs):
         token = request.headers.get('Authorization', '').replace('Bearer ', '')
@@ -3425,83 +3844,71 @@ def api_login():
         if not email or not password:
             return jsonify({'error': 'Email and password are required'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Find user by email with role info and 2FA status
-        cur.execute("""
-            SELECT u.id, u.email, u.display_name, u.password_hash, u.is_active, 
-                   u.two_factor_enabled, u.two_factor_secret, r.name as role_name
-            FROM users u
-            LEFT JOIN roles r ON u.role_id = r.id
-            WHERE u.email = %s
-        """, (email,))
-        user = cur.fetchone()
-        
-        if not user:
-            cur.close()
-            conn.close()
-            log_audit(None, 'login_failed', 'user', None, {'email': email, 'reason': 'invalid_email'}, result='failure')
-            return jsonify({'error': 'Invalid email address'}), 401
-        
-        if not user['is_active']:
-            cur.close()
-            conn.close()
-            log_audit(user['id'], 'login_failed', 'user', user['id'], {'email': email, 'reason': 'account_disabled'}, result='failure')
-            return jsonify({'error': 'Account is disabled. Contact your administrator.'}), 401
-        
-        # Check password using bcrypt (with SHA-256 fallback for legacy)
-        password_valid, needs_rehash = verify_password_with_rehash(password, user['password_hash'])
-        if not password_valid:
-            cur.close()
-            conn.close()
-            log_audit(user['id'], 'login_failed', 'user', user['id'], {'email': email, 'reason': 'invalid_password'}, result='failure')
-            return jsonify({'error': 'Incorrect password'}), 401
-        
-        # Upgrade legacy SHA-256 hash to bcrypt if needed
-        if needs_rehash:
-            new_hash = hash_password(password)
-            cur.execute("UPDATE users SET password_hash = %s WHERE id = %s", (new_hash, user['id']))
-            conn.commit()
+        with db_cursor() as (conn, cur):
+            # Find user by email with role info and 2FA status
+            cur.execute("""
+                SELECT u.id, u.email, u.display_name, u.password_hash, u.is_active, 
+                       u.two_factor_enabled, u.two_factor_secret, r.name as role_name
+                FROM users u
+                LEFT JOIN roles r ON u.role_id = r.id
+                WHERE u.email = %s
+            """, (email,))
+            user = cur.fetchone()
+        
+            if not user:
+                log_audit(None, 'login_failed', 'user', None, {'email': email, 'reason': 'invalid_email'}, result='failure')
+                return jsonify({'error': 'Invalid email address'}), 401
+        
+            if not user['is_active']:
+                log_audit(user['id'], 'login_failed', 'user', user['id'], {'email': email, 'reason': 'account_disabled'}, result='failure')
+                return jsonify({'error': 'Account is disabled. Contact your administrator.'}), 401
+        
+            # Check password using bcrypt (with SHA-256 fallback for legacy)
+            password_valid, needs_rehash = verify_password_with_rehash(password, user['password_hash'])
+            if not password_valid:
+                log_audit(user['id'], 'login_failed', 'user', user['id'], {'email': email, 'reason': 'invalid_password'}, result='failure')
+                return jsonify({'error': 'Incorrect password'}), 401
+        
+            # Upgrade legacy SHA-256 hash to bcrypt if needed
+            if needs_rehash:
+                new_hash = hash_password(password)
+                cur.execute("UPDATE users SET password_hash = %s WHERE id = %s", (new_hash, user['id']))
+                conn.commit()
+        
+            # Check if 2FA is enabled
+            if user.get('two_factor_enabled'):
+                # Generate a temporary 2FA challenge token
+                twofa_token = str(uuid.uuid4())
+                # Store in sessions with a short expiry (10 minutes) and special marker
+                expires_at = datetime.now() + timedelta(minutes=10)
+                client_ip = get_client_ip()
+                cur.execute("""
+                    INSERT INTO sessions (user_id, token, expires_at, ip_address)
+                    VALUES (%s, %s, %s, %s)
+                """, (user['id'], f"2fa_{twofa_token}", expires_at, client_ip))
+                conn.commit()
+            
+                return jsonify({
+                    'success': True,
+                    'requires_2fa': True,
+                    'twofa_token': twofa_token,
+                    'email': user['email']
+                })
         
-        # Check if 2FA is enabled
-        if user.get('two_factor_enabled'):
-            # Generate a temporary 2FA challenge token
-            twofa_token = str(uuid.uuid4())
-            # Store in sessions with a short expiry (10 minutes) and special marker
-            expires_at = datetime.now() + timedelta(minutes=10)
+            # Create session token with IP
+            token = generate_session_token()
+            expires_at = datetime.now() + timedelta(days=30)
             client_ip = get_client_ip()
+        
             cur.execute("""
                 INSERT INTO sessions (user_id, token, expires_at, ip_address)
                 VALUES (%s, %s, %s, %s)
-            """, (user['id'], f"2fa_{twofa_token}", expires_at, client_ip))
-            conn.commit()
-            cur.close()
-            conn.close()
-            
-            return jsonify({
-                'success': True,
-                'requires_2fa': True,
-                'twofa_token': twofa_token,
-                'email': user['email']
-            })
+            """, (user['id'], token, expires_at, client_ip))
         
-        # Create session token with IP
-        token = str(uuid.uuid4())
-        expires_at = datetime.now() + timedelta(days=30)
-        client_ip = get_client_ip()
+            # Update last_login
+            cur.execute("UPDATE users SET last_login = NOW() WHERE id = %s", (user['id'],))
         
-        cur.execute("""
-            INSERT INTO sessions (user_id, token, expires_at, ip_address)
-            VALUES (%s, %s, %s, %s)
-        """, (user['id'], token, expires_at, client_ip))
-        
-        # Update last_login
-        cur.execute("UPDATE users SET last_login = NOW() WHERE id = %s", (user['id'],))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
         
         # Get user permissions
         permissions = get_user_permissions(user['id'])
@@ -3539,58 +3946,48 @@ def api_login_2fa():
         if not twofa_token or not code:
             return jsonify({'error': 'Token and code are required'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with db_cursor() as (conn, cur):
+            # Find the 2FA challenge session
+            cur.execute("""
+                SELECT s.id, s.user_id, u.email, u.display_name, u.two_factor_secret, r.name as role_name
+                FROM sessions s
+                JOIN users u ON s.user_id = u.id
+                LEFT JOIN roles r ON u.role_id = r.id
+                WHERE s.token = %s AND s.expires_at > NOW()
+            """, (f"2fa_{twofa_token}",))
+            session = cur.fetchone()
         
-        # Find the 2FA challenge session
-        cur.execute("""
-            SELECT s.id, s.user_id, u.email, u.display_name, u.two_factor_secret, r.name as role_name
-            FROM sessions s
-            JOIN users u ON s.user_id = u.id
-            LEFT JOIN roles r ON u.role_id = r.id
-            WHERE s.token = %s AND s.expires_at > NOW()
-        """, (f"2fa_{twofa_token}",))
-        session = cur.fetchone()
-        
-        if not session:
-            cur.close()
-            conn.close()
-            return jsonify({'error': '2FA session expired. Please log in again.'}), 401
+            if not session:
+                return jsonify({'error': '2FA session expired. Please log in again.'}), 401
         
-        # Verify the TOTP code (decrypt first)
-        decrypted_secret = decrypt_totp_secret(session['two_factor_secret'])
-        if not decrypted_secret:
-            cur.close()
-            conn.close()
-            return jsonify({'error': '2FA configuration error. Please re-enable 2FA.'}), 500
-        totp = pyotp.TOTP(decrypted_secret)
-        is_valid = totp.verify(code, valid_window=1)
+            # Verify the TOTP code (decrypt first)
+            decrypted_secret = decrypt_totp_secret(session['two_factor_secret'])
+            if not decrypted_secret:
+                return jsonify({'error': '2FA configuration error. Please re-enable 2FA.'}), 500
+            totp = pyotp.TOTP(decrypted_secret)
+            is_valid = totp.verify(code, valid_window=1)
         
-        if not is_valid:
-            cur.close()
-            conn.close()
-            log_audit(session['user_id'], 'login_failed', 'user', session['user_id'], {'email': session['email'], 'reason': 'invalid_2fa_code'}, result='failure')
-            return jsonify({'error': 'Invalid verification code'}), 401
+            if not is_valid:
+                log_audit(session['user_id'], 'login_failed', 'user', session['user_id'], {'email': session['email'], 'reason': 'invalid_2fa_code'}, result='failure')
+                return jsonify({'error': 'Invalid verification code'}), 401
         
-        # Delete the 2FA challenge session
-        cur.execute("DELETE FROM sessions WHERE id = %s", (session['id'],))
+            # Delete the 2FA challenge session
+            cur.execute("DELETE FROM sessions WHERE id = %s", (session['id'],))
         
-        # Create a full session
-        token = str(uuid.uuid4())
-        expires_at = datetime.now() + timedelta(days=30)
-        client_ip = get_client_ip()
+            # Create a full session
+            token = generate_session_token()
+            expires_at = datetime.now() + timedelta(days=30)
+            client_ip = get_client_ip()
         
-        cur.execute("""
-            INSERT INTO sessions (user_id, token, expires_at, ip_address)
-            VALUES (%s, %s, %s, %s)
-        """, (session['user_id'], token, expires_at, client_ip))
+            cur.execute("""
+                INSERT INTO sessions (user_id, token, expires_at, ip_address)
+                VALUES (%s, %s, %s, %s)
+            """, (session['user_id'], token, expires_at, client_ip))
         
-        # Update last_login
-        cur.execute("UPDATE users SET last_login = NOW() WHERE id = %s", (session['user_id'],))
+            # Update last_login
+            cur.execute("UPDATE users SET last_login = NOW() WHERE id = %s", (session['user_id'],))
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
         
         # Get user permissions
         permissions = get_user_permissions(session['user_id'])
@@ -3609,7 +4006,6 @@ def api_login_2fa():
         
     except Exception as e:
         print(f"2FA login error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
@@ -3632,14 +4028,12 @@ def api_2fa_setup():
         
         # Encrypt and store the secret (not confirmed yet)
         encrypted_secret = encrypt_totp_secret(secret)
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE users SET two_factor_secret = %s WHERE id = %s
-        """, (encrypted_secret, user['id']))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_cursor() as (conn, cur):
+            cur.execute("""
+                UPDATE users SET two_factor_secret = %s WHERE id = %s
+            """, (encrypted_secret, user['id']))
+            conn.commit()
+        decrypt_totp_secret.cache_clear()
         
         # Generate QR code
         totp = pyotp.TOTP(secret)
@@ -3668,7 +4062,6 @@ def api_2fa_setup():
         
     except Exception as e:
         print(f"2FA setup error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
@@ -3690,39 +4083,30 @@ def api_2fa_confirm():
         
         user = request.current_user
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Get the pending secret
-        cur.execute("SELECT two_factor_secret FROM users WHERE id = %s", (user['id'],))
-        row = cur.fetchone()
+        with db_cursor() as (conn, cur):
+            # Get the pending secret
+            cur.execute("SELECT two_factor_secret FROM users WHERE id = %s", (user['id'],))
+            row = cur.fetchone()
         
-        if not row or not row['two_factor_secret']:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'No 2FA setup in progress'}), 400
+            if not row or not row['two_factor_secret']:
+                return jsonify({'error': 'No 2FA setup in progress'}), 400
         
-        # Decrypt and verify the code
-        decrypted_secret = decrypt_totp_secret(row['two_factor_secret'])
-        if not decrypted_secret:
-            cur.close()
-            conn.close()
-            return jsonify({'error': '2FA configuration error'}), 500
-        totp = pyotp.TOTP(decrypted_secret)
-        if not totp.verify(code, valid_window=1):
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Invalid verification code'}), 400
+            # Decrypt and verify the code
+            decrypted_secret = decrypt_totp_secret(row['two_factor_secret'])
+            if not decrypted_secret:
+                return jsonify({'error': '2FA configuration error'}), 500
+            totp = pyotp.TOTP(decrypted_secret)
+            if not totp.verify(code, valid_window=1):
+                return jsonify({'error': 'Invalid verification code'}), 400
         
-        # Enable 2FA
-        cur.execute("""
-            UPDATE users SET two_factor_enabled = TRUE, two_factor_confirmed_at = NOW()
-            WHERE id = %s
-        """, (user['id'],))
+            # Enable 2FA
+            cur.execute("""
+                UPDATE users SET two_factor_enabled = TRUE, two_factor_confirmed_at = NOW()
+                WHERE id = %s
+            """, (user['id'],))
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+        invalidate_session_cache(user_id=user['id'])
         
         # Log the action
         log_audit(user['id'], '2fa_enabled', 'user', user['id'], {})
@@ -3734,7 +4118,6 @@ def api_2fa_confirm():
         
     except Exception as e:
         print(f"2FA confirm error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
@@ -3756,35 +4139,29 @@ def api_2fa_disable():
         
         user = request.current_user
         
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with db_cursor() as (conn, cur):
+            # Get current password hash
+            cur.execute("SELECT password_hash FROM users WHERE id = %s", (user['id'],))
+            row = cur.fetchone()
         
-        # Get current password hash
-        cur.execute("SELECT password_hash FROM users WHERE id = %s", (user['id'],))
-        row = cur.fetchone()
+            if not row:
+                return jsonify({'error': 'User not found'}), 404
         
-        if not row:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'User not found'}), 404
+            if not verify_password(password, row['password_hash']):
+                return jsonify({'error': 'Incorrect password'}), 401
         
-        if not verify_password(password, row['password_hash']):
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Incorrect password'}), 401
-        
-        # Disable 2FA
-        cur.execute("""
-            UPDATE users SET 
-                two_factor_enabled = FALSE, 
-                two_factor_secret = NULL,
-                two_factor_confirmed_at = NULL
-            WHERE id = %s
-        """, (user['id'],))
+            # Disable 2FA
+            cur.execute("""
+                UPDATE users SET 
+                    two_factor_enabled = FALSE, 
+                    two_factor_secret = NULL,
+                    two_factor_confirmed_at = NULL
+                WHERE id = %s
+            """, (user['id'],))
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+        invalidate_session_cache(user_id=user['id'])
+        decrypt_totp_secret.cache_clear()
         
         # Log the action
         log_audit(user['id'], '2fa_disabled', 'user', user['id'], {})
@@ -3796,7 +4173,6 @@ def api_2fa_disable():
         
     except Exception as e:
         print(f"2FA disable error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
@@ -3810,17 +4186,13 @@ def api_2fa_status():
     try:
         user = request.current_user
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        cur.execute("""
-            SELECT two_factor_enabled, two_factor_confirmed_at
-            FROM users WHERE id = %s
-        """, (user['id'],))
-        row = cur.fetchone()
+        with db_cursor() as (conn, cur):
+            cur.execute("""
+                SELECT two_factor_enabled, two_factor_confirmed_at
+                FROM users WHERE id = %s
+            """, (user['id'],))
+            row = cur.fetchone()
         
-        cur.close()
-        conn.close()
         
         if not row:
             return jsonify({'error': 'User not found'}), 404
@@ -3855,49 +4227,42 @@ def api_change_password():
         if len(new_password) < 6:
             return jsonify({'error': 'New password must be at least 6 characters'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with db_cursor() as (conn, cur):
+            # Find session and user
+            cur.execute("""
+                SELECT s.user_id, u.password_hash, u.email
+                FROM sessions s
+                JOIN users u ON s.user_id = u.id
+                WHERE s.token = %s AND s.expires_at > NOW()
+            """, (token,))
+            session = cur.fetchone()
         
-        # Find session and user
-        cur.execute("""
-            SELECT s.user_id, u.password_hash, u.email
-            FROM sessions s
-            JOIN users u ON s.user_id = u.id
-            WHERE s.token = %s AND s.expires_at > NOW()
-        """, (token,))
-        session = cur.fetchone()
-        
-        if not session:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Invalid or expired session. Please log in again.'}), 401
+            if not session:
+                return jsonify({'error': 'Invalid or expired session. Please log in again.'}), 401
         
-        # Verify current password
-        if not verify_password(current_password, session['password_hash']):
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Current password is incorrect'}), 401
+            # Verify current password
+            if not verify_password(current_password, session['password_hash']):
+                return jsonify({'error': 'Current password is incorrect'}), 401
         
-        # Update password
-        new_hash = hash_password(new_password)
-        cur.execute("""
-            UPDATE users SET password_hash = %s, updated_at = NOW()
-            WHERE id = %s
-        """, (new_hash, session['user_id']))
+            # Update password
+            new_hash = hash_password(new_password)
+            cur.execute("""
+                UPDATE users SET password_hash = %s, updated_at = NOW()
+                WHERE id = %s
+            """, (new_hash, session['user_id']))
         
-        # Invalidate old sessions and create new one
-        cur.execute("DELETE FROM sessions WHERE user_id = %s", (session['user_id'],))
+            # Invalidate old sessions and create new one
+            cur.execute("DELETE FROM sessions WHERE user_id = %s", (session['user_id'],))
         
-        new_token = str(uuid.uuid4())
-        expires_at = datetime.now() + timedelta(days=30)
-        cur.execute("""
-            INSERT INTO sessions (user_id, token, expires_at)
-            VALUES (%s, %s, %s)
-        """, (session['user_id'], new_token, expires_at))
+            new_token = generate_session_token()
+            expires_at = datetime.now() + timedelta(days=30)
+            cur.execute("""
+                INSERT INTO sessions (user_id, token, expires_at)
+                VALUES (%s, %s, %s)
+            """, (session['user_id'], new_token, expires_at))
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+        invalidate_session_cache(user_id=session['user_id'])
         
         return jsonify({
             'success': True,
@@ -3917,17 +4282,15 @@ def api_logout():
     try:
         token = request.headers.get('Authorization', '').replace('Bearer ', '')
         if token:
-            conn = get_db_connection()
-            cur = conn.cursor()
-            # Get user_id before deleting session for audit log
-            cur.execute("SELECT user_id FROM sessions WHERE token = %s", (token,))
-            session = cur.fetchone()
-            user_id = session['user_id'] if session else None
+            with db_cursor() as (conn, cur):
+                # Get user_id before deleting session for audit log
+                cur.execute("SELECT user_id FROM sessions WHERE token = %s", (token,))
+                session = cur.fetchone()
+                user_id = session['user_id'] if session else None
             
-            cur.execute("DELETE FROM sessions WHERE token = %s", (token,))
-            conn.commit()
-            cur.close()
-            conn.close()
+                cur.execute("DELETE FROM sessions WHERE token = %s", (token,))
+                conn.commit()
+            invalidate_session_cache(token=token)
             
             if user_id:
                 log_audit(user_id, 'logout', 'user', user_id)
@@ -3943,7 +4306,7 @@ def api_verify_session():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     user = verify_session(token)
     if user:
-        permissions = get_user_permissions(user['id'])
+        permissions = get_role_permissions(user['role_id'])
         return jsonify({
             'success': True,
             'user': {
@@ -3963,35 +4326,28 @@ def api_get_users():
         return jsonify({'status': 'ok'})
     
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT u.id, u.email, u.display_name, u.is_active, u.last_login, u.created_at,
-                   r.id as role_id, r.name as role_name,
-                   creator.display_name as created_by_name
-            FROM users u
-            LEFT JOIN roles r ON u.role_id = r.id
-            LEFT JOIN users creator ON u.created_by = creator.id
-            ORDER BY u.display_name
-        """)
-        users = cur.fetchall()
-        cur.close()
-        conn.close()
+        with db_cursor() as (conn, cur):
+            # Shape the rows into the response JSON in Postgres so the list is
+            # passed through as text instead of being rebuilt and re-serialized
+            cur.execute("""
+                SELECT COALESCE(json_agg(json_build_object(
+                           'id', u.id,
+                           'email', u.email,
+                           'displayName', u.display_name,
+                           'isActive', u.is_active,
+                           'lastLogin', u.last_login,
+                           'createdAt', u.created_at,
+                           'roleId', r.id,
+                           'roleName', r.name,
+                           'createdBy', creator.display_name
+                       ) ORDER BY u.display_name), '[]')::text as users
+                FROM users u
+                LEFT JOIN roles r ON u.role_id = r.id
+                LEFT JOIN users creator ON u.created_by = creator.id
+            """)
+            users_json = cur.fetchone()['users']
         
-        return jsonify({
-            'success': True,
-            'users': [{
-                'id': u['id'],
-                'email': u['email'],
-                'displayName': u['display_name'],
-                'isActive': u['is_active'],
-                'lastLogin': u['last_login'].isoformat() if u['last_login'] else None,
-                'createdAt': u['created_at'].isoformat() if u['created_at'] else None,
-                'roleId': u['role_id'],
-                'roleName': u['role_name'],
-                'createdBy': u['created_by_name']
-            } for u in users]
-        })
+        return Response('{"success": true, "users": ' + users_json + '}', mimetype='application/json')
     except Exception as e:
         print(f"Get users error: {e}")
         return jsonify({'error': str(e)}), 500
@@ -4015,29 +4371,23 @@ def api_create_user():
         if not password or len(password) < 6:
             return jsonify({'error': 'Password must be at least 6 characters'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Check if email already exists
-        cur.execute("SELECT id FROM users WHERE email = %s", (email,))
-        if cur.fetchone():
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Email already exists'}), 400
-        
-        password_hash = hash_password(password)
-        admin_id = request.current_user['id']
-        
-        cur.execute("""
-            INSERT INTO users (email, display_name, password_hash, role_id, is_active, created_by)
-            VALUES (%s, %s, %s, %s, TRUE, %s)
-            RETURNING id
-        """, (email, display_name, password_hash, role_id, admin_id))
+        with db_cursor() as (conn, cur):
+            password_hash = hash_password(password)
+            admin_id = request.current_user['id']
         
-        new_user_id = cur.fetchone()['id']
-        conn.commit()
-        cur.close()
-        conn.close()
+            # The unique email constraint rejects duplicates in the same statement
+            cur.execute("""
+                INSERT INTO users (email, display_name, password_hash, role_id, is_active, created_by)
+                VALUES (%s, %s, %s, %s, TRUE, %s)
+                ON CONFLICT (email) DO NOTHING
+                RETURNING id
+            """, (email, display_name, password_hash, role_id, admin_id))
+        
+            new_user = cur.fetchone()
+            if not new_user:
+                return jsonify({'error': 'Email already exists'}), 400
+            new_user_id = new_user['id']
+            conn.commit()
         
         log_audit(admin_id, 'create_user', 'user', new_user_id, {'email': email, 'displayName': display_name})
         
@@ -4057,54 +4407,45 @@ def api_update_user(user_id):
         if not data:
             return jsonify({'error': 'Invalid JSON data'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with db_cursor() as (conn, cur):
+            updates = []
+            params = []
         
-        updates = []
-        params = []
+            if 'displayName' in data:
+                updates.append("display_name = %s")
+                params.append(data['displayName'])
         
-        if 'displayName' in data:
-            updates.append("display_name = %s")
-            params.append(data['displayName'])
+            if 'email' in data:
+                updates.append("email = %s")
+                params.append(data['email'].lower().strip())
         
-        if 'email' in data:
-            updates.append("email = %s")
-            params.append(data['email'].lower().strip())
+            if 'roleId' in data:
+                updates.append("role_id = %s")
+                params.append(data['roleId'])
         
-        if 'roleId' in data:
-            updates.append("role_id = %s")
-            params.append(data['roleId'])
+            if 'isActive' in data:
+                updates.append("is_active = %s")
+                params.append(data['isActive'])
         
-        if 'isActive' in data:
-            updates.append("is_active = %s")
-            params.append(data['isActive'])
+            if 'password' in data and data['password']:
+                if len(data['password']) < 6:
+                    return jsonify({'error': 'Password must be at least 6 characters'}), 400
+                updates.append("password_hash = %s")
+                params.append(hash_password(data['password']))
         
-        if 'password' in data and data['password']:
-            if len(data['password']) < 6:
-                cur.close()
-                conn.close()
-                return jsonify({'error': 'Password must be at least 6 characters'}), 400
-            updates.append("password_hash = %s")
-            params.append(hash_password(data['password']))
+            if not updates:
+                return jsonify({'error': 'No fields to update'}), 400
         
-        if not updates:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'No fields to update'}), 400
-        
-        updates.append("updated_at = NOW()")
-        params.append(user_id)
+            updates.append("updated_at = NOW()")
+            params.append(user_id)
         
-        cur.execute(f"UPDATE users SET {', '.join(updates)} WHERE id = %s", params)
+            cur.execute(f"UPDATE users SET {', '.join(updates)} WHERE id = %s", params)
         
-        if cur.rowcount == 0:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'User not found'}), 404
+            if cur.rowcount == 0:
+                return jsonify({'error': 'User not found'}), 404
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+        invalidate_session_cache(user_id=user_id)
         
         log_audit(request.current_user['id'], 'update_user', 'user', user_id, data)
         
@@ -4122,23 +4463,18 @@ def api_delete_user(user_id):
         if user_id == admin_id:
             return jsonify({'error': 'Cannot delete your own account'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Soft delete - just disable the account
-        cur.execute("UPDATE users SET is_active = FALSE, updated_at = NOW() WHERE id = %s", (user_id,))
+        with db_cursor() as (conn, cur):
+            # Soft delete - just disable the account
+            cur.execute("UPDATE users SET is_active = FALSE, updated_at = NOW() WHERE id = %s", (user_id,))
         
-        if cur.rowcount == 0:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'User not found'}), 404
+            if cur.rowcount == 0:
+                return jsonify({'error': 'User not found'}), 404
         
-        # Delete all sessions for this user
-        cur.execute("DELETE FROM sessions WHERE user_id = %s", (user_id,))
+            # Delete all sessions for this user
+            cur.execute("DELETE FROM sessions WHERE user_id = %s", (user_id,))
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+        invalidate_session_cache(user_id=user_id)
         
         log_audit(admin_id, 'disable_user', 'user', user_id, None)
         
@@ -4157,50 +4493,30 @@ def api_permanent_delete_user(user_id):
         if user_id == admin_id:
             return jsonify({'error': 'Cannot delete your own account'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Get user info for audit log
-        cur.execute("SELECT email, display_name FROM users WHERE id = %s", (user_id,))
-        user = cur.fetchone()
-        
-        if not user:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'User not found'}), 404
-        
-        user_email = user['email']
-        user_name = user['display_name']
-        
-        # Delete related records first (foreign key constraints)
-        cur.execute("DELETE FROM sessions WHERE user_id = %s", (user_id,))
-        
-        # Try to delete from tables that may not exist in older installations
-        try:
-            cur.execute("DELETE FROM backup_codes WHERE user_id = %s", (user_id,))
-        except Exception:
-            pass
-        
-        try:
-            cur.execute("DELETE FROM password_reset_tokens WHERE user_id = %s", (user_id,))
-        except Exception:
-            pass
-        
-        # Delete scheduled reports for this user
-        cur.execute("DELETE FROM scheduled_reports WHERE user_id = %s", (user_id,))
-        
-        # Update audit logs to remove user reference (keep for history)
-        cur.execute("UPDATE audit_log SET user_id = NULL WHERE user_id = %s", (user_id,))
+        with db_cursor() as (conn, cur):
+            # Detach history rows and delete the user in one round-trip. Sessions,
+            # backup codes, reset tokens and scheduled reports go with the user via
+            # ON DELETE CASCADE; audit history and created_by links are kept but
+            # unlinked. RETURNING supplies the details for the audit log.
+            cur.execute("""
+                WITH unlinked_audit AS (
+                    UPDATE audit_log SET user_id = NULL WHERE user_id = %s
+                ), unlinked_created AS (
+                    UPDATE users SET created_by = NULL WHERE created_by = %s
+                )
+                DELETE FROM users WHERE id = %s
+                RETURNING email, display_name
+            """, (user_id, user_id, user_id))
+            user = cur.fetchone()
         
-        # Update users created by this user
-        cur.execute("UPDATE users SET created_by = NULL WHERE created_by = %s", (user_id,))
+            if not user:
+                return jsonify({'error': 'User not found'}), 404
         
-        # Finally delete the user
-        cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
+            user_email = user['email']
+            user_name = user['display_name']
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+        invalidate_session_cache(user_id=user_id)
         
         log_audit(admin_id, 'permanent_delete_user', 'user', None, {'deleted_email': user_email, 'deleted_name': user_name})
         
@@ -4209,6 +4525,34 @@ def api_permanent_delete_user(user_id):
         print(f"Permanent delete user error: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Password email bodies, built once at import rather than per request
+ADMIN_RESET_EMAIL_TEMPLATE = Template("""
+<html>
+<body style="font-family: Arial, sans-serif; padding: 20px;">
+    <h2>Password Reset - FTG Dashboard</h2>
+    <p>Hello $name,</p>
+    <p>Your password has been reset by an administrator.</p>
+    <p>Your new temporary password is: <strong>$password</strong></p>
+    <p>Please log in and change your password immediately.</p>
+    <br>
+    <p>If you did not expect this, please contact your administrator.</p>
+</body>
+</html>
+""")
+
+RESET_REQUEST_EMAIL_TEMPLATE = Template("""
+<html>
+<body style="font-family: Arial, sans-serif; padding: 20px;">
+    <h2>Password Reset Request - FTG Dashboard</h2>
+    <p>Hello $name,</p>
+    <p>You have requested to reset your password. Click the link below to proceed:</p>
+    <p><a href="$link" style="background-color: #3b82f6; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">Reset Password</a></p>
+    <p>This link will expire in 1 hour.</p>
+    <p>If you did not request this, please ignore this email.</p>
+</body>
+</html>
+""")
+
 @app.route('/api/admin/users/<int:user_id>/reset-password', methods=['POST', 'OPTIONS'])
 @require_admin
 def api_admin_reset_password(user_id):
@@ -4224,30 +4568,25 @@ def api_admin_reset_password(user_id):
         new_password = data.get('new_password') or secrets.token_urlsafe(12)
         send_email = data.get('send_email', False)
         
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with db_cursor() as (conn, cur):
+            # Get user email
+            cur.execute("SELECT email, display_name FROM users WHERE id = %s", (user_id,))
+            user = cur.fetchone()
         
-        # Get user email
-        cur.execute("SELECT email, display_name FROM users WHERE id = %s", (user_id,))
-        user = cur.fetchone()
+            if not user:
+                return jsonify({'error': 'User not found'}), 404
         
-        if not user:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'User not found'}), 404
-        
-        # Update password
-        new_hash = hash_password(new_password)
-        cur.execute("""
-            UPDATE users SET password_hash = %s, updated_at = NOW() WHERE id = %s
-        """, (new_hash, user_id))
+            # Update password
+            new_hash = hash_password(new_password)
+            cur.execute("""
+                UPDATE users SET password_hash = %s, updated_at = NOW() WHERE id = %s
+            """, (new_hash, user_id))
         
-        # Invalidate all sessions for this user
-        cur.execute("DELETE FROM sessions WHERE user_id = %s", (user_id,))
+            # Invalidate all sessions for this user
+            cur.execute("DELETE FROM sessions WHERE user_id = %s", (user_id,))
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+        invalidate_session_cache(user_id=user_id)
         
         # Log the action
         log_audit(admin_id, 'admin_password_reset', 'user', user_id, {'email': user['email']})
@@ -4255,20 +4594,11 @@ def api_admin_reset_password(user_id):
         # Optionally send email with new password
         if send_email:
             try:
-                html_content = f"""
-                <html>
-                <body style="font-family: Arial, sans-serif; padding: 20px;">
-                    <h2>Password Reset - FTG Dashboard</h2>
-                    <p>Hello {user['display_name']},</p>
-                    <p>Your password has been reset by an administrator.</p>
-                    <p>Your new temporary password is: <strong>{new_password}</strong></p>
-                    <p>Please log in and change your password immediately.</p>
-                    <br>
-                    <p>If you did not expect this, please contact your administrator.</p>
-                </body>
-                </html>
-                """
-                send_gmail(user['email'], 'Password Reset - FTG Dashboard', html_content)
+                html_content = ADMIN_RESET_EMAIL_TEMPLATE.substitute(
+                    name=html_escape(user['display_name'] or ''),
+                    password=html_escape(new_password)
+                )
+                run_in_background(send_gmail, user['email'], 'Password Reset - FTG Dashboard', html_content)
             except Exception as e:
                 print(f"Failed to send password reset email: {e}")
         
@@ -4280,10 +4610,18 @@ def api_admin_reset_password(user_id):
         
     except Exception as e:
         print(f"Admin reset password error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+# secrets.token_urlsafe(32) always yields 43 characters, so anything else can
+# be rejected before hashing or querying
+RESET_TOKEN_BYTES = 32
+RESET_TOKEN_LENGTH = 43
+
+def hash_reset_token(reset_token):
+    """Hash a password reset token for storage and lookup"""
+    return hashlib.sha256(reset_token.encode()).hexdigest()
+
 @app.route('/api/request-password-reset', methods=['POST', 'OPTIONS'])
 def api_request_password_reset():
     """Request a password reset email"""
@@ -4300,38 +4638,32 @@ def api_request_password_reset():
         if not email:
             return jsonify({'error': 'Email is required'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Find user by email
-        cur.execute("SELECT id, email, display_name FROM users WHERE email = %s AND is_active = TRUE", (email,))
-        user = cur.fetchone()
+        with db_cursor() as (conn, cur):
+            # Find user by email
+            cur.execute("SELECT id, email, display_name FROM users WHERE email = %s AND is_active = TRUE", (email,))
+            user = cur.fetchone()
         
-        # Always return success to prevent email enumeration
-        if not user:
-            cur.close()
-            conn.close()
-            return jsonify({
-                'success': True,
-                'message': 'If this email is registered, you will receive a password reset link.'
-            })
+            # Always return success to prevent email enumeration
+            if not user:
+                return jsonify({
+                    'success': True,
+                    'message': 'If this email is registered, you will receive a password reset link.'
+                })
         
-        # Generate reset token
-        reset_token = secrets.token_urlsafe(32)
-        reset_token_hash = hashlib.sha256(reset_token.encode()).hexdigest()
-        expires_at = datetime.now() + timedelta(hours=1)
+            # Generate reset token
+            reset_token = secrets.token_urlsafe(RESET_TOKEN_BYTES)
+            reset_token_hash = hash_reset_token(reset_token)
+            expires_at = datetime.now() + timedelta(hours=1)
         
-        # Store hashed token
-        cur.execute("""
-            UPDATE users SET 
-                password_reset_token = %s,
-                password_reset_expires = %s
-            WHERE id = %s
-        """, (reset_token_hash, expires_at, user['id']))
+            # Store hashed token
+            cur.execute("""
+                UPDATE users SET 
+                    password_reset_token = %s,
+                    password_reset_expires = %s
+                WHERE id = %s
+            """, (reset_token_hash, expires_at, user['id']))
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
         
         # Send email with reset link
         try:
@@ -4341,24 +4673,15 @@ def api_request_password_reset():
                 base_url = f'https://{base_url}'
             reset_link = f"{base_url}/?reset_token={reset_token}"
             
-            html_content = f"""
-            <html>
-            <body style="font-family: Arial, sans-serif; padding: 20px;">
-                <h2>Password Reset Request - FTG Dashboard</h2>
-                <p>Hello {user['display_name']},</p>
-                <p>You have requested to reset your password. Click the link below to proceed:</p>
-                <p><a href="{reset_link}" style="background-color: #3b82f6; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">Reset Password</a></p>
-                <p>This link will expire in 1 hour.</p>
-                <p>If you did not request this, please ignore this email.</p>
-            </body>
-            </html>
-            """
-            send_gmail(user['email'], 'Password Reset Request - FTG Dashboard', html_content)
+            html_content = RESET_REQUEST_EMAIL_TEMPLATE.substitute(
+                name=html_escape(user['display_name'] or ''),
+                link=html_escape(reset_link)
+            )
+            run_in_background(send_gmail, user['email'], 'Password Reset Request - FTG Dashboard', html_content)
             
             log_audit(user['id'], 'password_reset_requested', 'user', user['id'], {'email': email})
         except Exception as e:
             print(f"Failed to send password reset email: {e}")
-            import traceback
             traceback.print_exc()
             # Don't reveal the error to the user
         
@@ -4391,43 +4714,41 @@ def api_complete_password_reset():
         if len(new_password) < 6:
             return jsonify({'error': 'Password must be at least 6 characters'}), 400
         
-        # Hash the token to compare with stored hash
-        token_hash = hashlib.sha256(reset_token.encode()).hexdigest()
-        
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Find user with valid token
-        cur.execute("""
-            SELECT id, email FROM users 
-            WHERE password_reset_token = %s 
-            AND password_reset_expires > NOW()
-            AND is_active = TRUE
-        """, (token_hash,))
-        user = cur.fetchone()
-        
-        if not user:
-            cur.close()
-            conn.close()
+        if len(reset_token) != RESET_TOKEN_LENGTH:
             return jsonify({'error': 'Invalid or expired reset token'}), 400
         
-        # Update password and clear reset token
-        new_hash = hash_password(new_password)
-        cur.execute("""
-            UPDATE users SET 
-                password_hash = %s,
-                password_reset_token = NULL,
-                password_reset_expires = NULL,
-                updated_at = NOW()
-            WHERE id = %s
-        """, (new_hash, user['id']))
+        # Hash the token to compare with stored hash
+        token_hash = hash_reset_token(reset_token)
         
-        # Invalidate all existing sessions
-        cur.execute("DELETE FROM sessions WHERE user_id = %s", (user['id'],))
+        with db_cursor() as (conn, cur):
+            # Find user with valid token
+            cur.execute("""
+                SELECT id, email FROM users 
+                WHERE password_reset_token = %s 
+                AND password_reset_expires > NOW()
+                AND is_active = TRUE
+            """, (token_hash,))
+            user = cur.fetchone()
+        
+            if not user:
+                return jsonify({'error': 'Invalid or expired reset token'}), 400
+        
+            # Update password and clear reset token
+            new_hash = hash_password(new_password)
+            cur.execute("""
+                UPDATE users SET 
+                    password_hash = %s,
+                    password_reset_token = NULL,
+                    password_reset_expires = NULL,
+                    updated_at = NOW()
+                WHERE id = %s
+            """, (new_hash, user['id']))
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            # Invalidate all existing sessions
+            cur.execute("DELETE FROM sessions WHERE user_id = %s", (user['id'],))
+        
+            conn.commit()
+        invalidate_session_cache(user_id=user['id'])
         
         log_audit(user['id'], 'password_reset_completed', 'user', user['id'], {'email': user['email']})
         
@@ -4447,12 +4768,9 @@ def api_get_roles():
         return jsonify({'status': 'ok'})
     
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT id, name, description FROM roles ORDER BY id")
-        roles = cur.fetchall()
-        cur.close()
-        conn.close()
+        with db_cursor() as (conn, cur):
+            cur.execute("SELECT id, name, description FROM roles ORDER BY id")
+            roles = cur.fetchall()
         
         return jsonify({
             'success': True,
@@ -4480,34 +4798,27 @@ def api_create_role():
         if not name:
             return jsonify({'error': 'Role name is required'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Check for duplicate name
-        cur.execute("SELECT id FROM roles WHERE LOWER(name) = LOWER(%s)", (name,))
-        if cur.fetchone():
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'A role with this name already exists'}), 400
-        
-        # Create the role
-        cur.execute("""
-            INSERT INTO roles (name, description, created_at)
-            VALUES (%s, %s, NOW())
-            RETURNING id
-        """, (name, description))
-        role_id = cur.fetchone()['id']
-        
-        # Add permissions
-        for page_key in permissions:
+        with db_cursor() as (conn, cur):
+            # Create the role; a case-insensitive duplicate name inserts nothing
             cur.execute("""
-                INSERT INTO role_permissions (role_id, permission_id)
-                SELECT %s, id FROM permissions WHERE page_key = %s
-            """, (role_id, page_key))
+                INSERT INTO roles (name, description, created_at)
+                VALUES (%s, %s, NOW())
+                ON CONFLICT (LOWER(name)) DO NOTHING
+                RETURNING id
+            """, (name, description))
+            role = cur.fetchone()
+            if not role:
+                return jsonify({'error': 'A role with this name already exists'}), 400
+            role_id = role['id']
+        
+            # Add permissions
+            if permissions:
+                cur.execute("""
+                    INSERT INTO role_permissions (role_id, permission_id)
+                    SELECT %s, id FROM permissions WHERE page_key = ANY(%s)
+                """, (role_id, list(permissions)))
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
         
         log_audit(request.current_user['id'], 'create_role', 'role', role_id, {'name': name, 'permissions': permissions})
         
@@ -4531,40 +4842,41 @@ def api_update_role(role_id):
         if not name:
             return jsonify({'error': 'Role name is required'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Check if role exists
-        cur.execute("SELECT id, name FROM roles WHERE id = %s", (role_id,))
-        role = cur.fetchone()
-        if not role:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Role not found'}), 404
+        with db_cursor() as (conn, cur):
+            # Check if role exists
+            cur.execute("SELECT id, name FROM roles WHERE id = %s", (role_id,))
+            role = cur.fetchone()
+            if not role:
+                return jsonify({'error': 'Role not found'}), 404
         
-        # Check for duplicate name (excluding current role)
-        cur.execute("SELECT id FROM roles WHERE LOWER(name) = LOWER(%s) AND id != %s", (name, role_id))
-        if cur.fetchone():
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'A role with this name already exists'}), 400
+            # Check for duplicate name (excluding current role)
+            cur.execute("SELECT id FROM roles WHERE LOWER(name) = LOWER(%s) AND id != %s", (name, role_id))
+            if cur.fetchone():
+                return jsonify({'error': 'A role with this name already exists'}), 400
         
-        # Update role details
-        cur.execute("""
-            UPDATE roles SET name = %s, description = %s WHERE id = %s
-        """, (name, description, role_id))
+            # Update role details
+            cur.execute("""
+                UPDATE roles SET name = %s, description = %s WHERE id = %s
+            """, (name, description, role_id))
         
-        # Update permissions
-        cur.execute("DELETE FROM role_permissions WHERE role_id = %s", (role_id,))
-        for page_key in permissions:
+            # Update permissions: only rows that actually change are touched,
+            # so unchanged grants are neither deleted nor re-inserted
             cur.execute("""
-                INSERT INTO role_permissions (role_id, permission_id)
-                SELECT %s, id FROM permissions WHERE page_key = %s
-            """, (role_id, page_key))
+                DELETE FROM role_permissions rp
+                USING permissions p
+                WHERE rp.permission_id = p.id AND rp.role_id = %s
+                AND NOT (p.page_key = ANY(%s))
+            """, (role_id, list(permissions)))
+            if permissions:
+                cur.execute("""
+                    INSERT INTO role_permissions (role_id, permission_id)
+                    SELECT %s, id FROM permissions WHERE page_key = ANY(%s)
+                    ON CONFLICT DO NOTHING
+                """, (role_id, list(permissions)))
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+        invalidate_session_cache()
+        invalidate_role_permissions_cache(role_id)
         
         log_audit(request.current_user['id'], 'update_role', 'role', role_id, {'name': name, 'permissions': permissions})
         
@@ -4577,47 +4889,42 @@ def api_update_role(role_id):
 @require_admin
 def api_delete_role(role_id):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Check if role exists
-        cur.execute("SELECT id, name FROM roles WHERE id = %s", (role_id,))
-        role = cur.fetchone()
-        if not role:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Role not found'}), 404
-        
-        # Prevent deleting admin role
-        if role['name'].lower() == 'admin':
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Cannot delete the admin role'}), 400
-        
-        # Check if any users are assigned to this role
-        cur.execute("SELECT id, display_name FROM users WHERE role_id = %s", (role_id,))
-        assigned_users = cur.fetchall()
-        if len(assigned_users) > 0:
-            # Get available roles for reassignment (exclude the role being deleted and admin)
-            cur.execute("SELECT id, name FROM roles WHERE id != %s ORDER BY name", (role_id,))
-            available_roles = cur.fetchall()
-            cur.close()
-            conn.close()
-            return jsonify({
-                'error': 'users_assigned',
-                'users': [{'id': u['id'], 'username': u['display_name']} for u in assigned_users],
-                'availableRoles': [{'id': r['id'], 'name': r['name']} for r in available_roles]
-            }), 400
-        
-        # Delete role permissions first
-        cur.execute("DELETE FROM role_permissions WHERE role_id = %s", (role_id,))
-        
-        # Delete the role
-        cur.execute("DELETE FROM roles WHERE id = %s", (role_id,))
+        with db_cursor() as (conn, cur):
+            # Fetch the role with its assigned users and the reassignment
+            # options in one round trip
+            cur.execute("""
+                SELECT r.id, r.name,
+                       (SELECT json_agg(json_build_object('id', u.id, 'username', u.display_name))
+                        FROM users u WHERE u.role_id = r.id) as assigned_users,
+                       (SELECT json_agg(json_build_object('id', o.id, 'name', o.name) ORDER BY o.name)
+                        FROM roles o WHERE o.id != r.id) as available_roles
+                FROM roles r
+                WHERE r.id = %s
+            """, (role_id,))
+            role = cur.fetchone()
+            if not role:
+                return jsonify({'error': 'Role not found'}), 404
+        
+            # Prevent deleting admin role
+            if role['name'].lower() == 'admin':
+                return jsonify({'error': 'Cannot delete the admin role'}), 400
+        
+            # Users still assigned must be moved to another role first
+            if role['assigned_users']:
+                return jsonify({
+                    'error': 'users_assigned',
+                    'users': role['assigned_users'],
+                    'availableRoles': role['available_roles'] or []
+                }), 400
+        
+            # Delete role permissions first
+            cur.execute("DELETE FROM role_permissions WHERE role_id = %s", (role_id,))
+        
+            # Delete the role
+            cur.execute("DELETE FROM roles WHERE id = %s", (role_id,))
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+        invalidate_role_permissions_cache(role_id)
         
         log_audit(request.current_user['id'], 'delete_role', 'role', role_id, {'name': role['name']})
         
@@ -4639,47 +4946,39 @@ def api_reassign_and_delete_role(role_id):
         if not new_role_id:
             return jsonify({'error': 'New role ID is required'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Check if role to delete exists
-        cur.execute("SELECT id, name FROM roles WHERE id = %s", (role_id,))
-        role = cur.fetchone()
-        if not role:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Role not found'}), 404
+        with db_cursor() as (conn, cur):
+            # Check if role to delete exists
+            cur.execute("SELECT id, name FROM roles WHERE id = %s", (role_id,))
+            role = cur.fetchone()
+            if not role:
+                return jsonify({'error': 'Role not found'}), 404
         
-        # Prevent deleting admin role
-        if role['name'].lower() == 'admin':
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Cannot delete the admin role'}), 400
+            # Prevent deleting admin role
+            if role['name'].lower() == 'admin':
+                return jsonify({'error': 'Cannot delete the admin role'}), 400
         
-        # Check if new role exists
-        cur.execute("SELECT id, name FROM roles WHERE id = %s", (new_role_id,))
-        new_role = cur.fetchone()
-        if not new_role:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'New role not found'}), 404
+            # Check if new role exists
+            cur.execute("SELECT id, name FROM roles WHERE id = %s", (new_role_id,))
+            new_role = cur.fetchone()
+            if not new_role:
+                return jsonify({'error': 'New role not found'}), 404
         
-        # Get users being reassigned for audit log
-        cur.execute("SELECT id, display_name FROM users WHERE role_id = %s", (role_id,))
-        reassigned_users = cur.fetchall()
+            # Get users being reassigned for audit log
+            cur.execute("SELECT id, display_name FROM users WHERE role_id = %s", (role_id,))
+            reassigned_users = cur.fetchall()
         
-        # Reassign all users to the new role
-        cur.execute("UPDATE users SET role_id = %s WHERE role_id = %s", (new_role_id, role_id))
+            # Reassign all users to the new role
+            cur.execute("UPDATE users SET role_id = %s WHERE role_id = %s", (new_role_id, role_id))
         
-        # Delete role permissions
-        cur.execute("DELETE FROM role_permissions WHERE role_id = %s", (role_id,))
+            # Delete role permissions
+            cur.execute("DELETE FROM role_permissions WHERE role_id = %s", (role_id,))
         
-        # Delete the role
-        cur.execute("DELETE FROM roles WHERE id = %s", (role_id,))
+            # Delete the role
+            cur.execute("DELETE FROM roles WHERE id = %s", (role_id,))
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+        invalidate_session_cache()
+        invalidate_role_permissions_cache(role_id)
         
         # Log the reassignment and deletion
         log_audit(request.current_user['id'], 'reassign_users_and_delete_role', 'role', role_id, {
@@ -4700,12 +4999,9 @@ def api_get_permissions():
         return jsonify({'status': 'ok'})
     
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT id, page_key, page_name, description FROM permissions ORDER BY id")
-        permissions = cur.fetchall()
-        cur.close()
-        conn.close()
+        with db_cursor() as (conn, cur):
+            cur.execute("SELECT id, page_key, page_name, description FROM permissions ORDER BY id")
+            permissions = cur.fetchall()
         
         return jsonify({
             'success': True,
@@ -4726,16 +5022,13 @@ def api_get_role_permissions(role_id):
         return jsonify({'status': 'ok'})
     
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT p.page_key FROM permissions p
-            JOIN role_permissions rp ON p.id = rp.permission_id
-            WHERE rp.role_id = %s
-        """, (role_id,))
-        perms = [row['page_key'] for row in cur.fetchall()]
-        cur.close()
-        conn.close()
+        with db_cursor() as (conn, cur):
+            cur.execute("""
+                SELECT p.page_key FROM permissions p
+                JOIN role_permissions rp ON p.id = rp.permission_id
+                WHERE rp.role_id = %s
+            """, (role_id,))
+            perms = [row['page_key'] for row in cur.fetchall()]
         
         return jsonify({'success': True, 'permissions': perms})
     except Exception as e:
@@ -4751,22 +5044,23 @@ def api_update_role_permissions(role_id):
         
         page_keys = data.get('permissions', [])
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Delete existing permissions for this role
-        cur.execute("DELETE FROM role_permissions WHERE role_id = %s", (role_id,))
-        
-        # Add new permissions
-        for page_key in page_keys:
+        with db_cursor() as (conn, cur):
+            # Drop permissions no longer granted, then add the new ones in one statement
             cur.execute("""
-                INSERT INTO role_permissions (role_id, permission_id)
-                SELECT %s, id FROM permissions WHERE page_key = %s
-            """, (role_id, page_key))
+                DELETE FROM role_permissions rp
+                USING permissions p
+                WHERE rp.permission_id = p.id AND rp.role_id = %s
+                AND NOT (p.page_key = ANY(%s))
+            """, (role_id, list(page_keys)))
+            if page_keys:
+                cur.execute("""
+                    INSERT INTO role_permissions (role_id, permission_id)
+                    SELECT %s, id FROM permissions WHERE page_key = ANY(%s)
+                    ON CONFLICT DO NOTHING
+                """, (role_id, list(page_keys)))
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+        invalidate_role_permissions_cache(role_id)
         
         log_audit(request.current_user['id'], 'update_role_permissions', 'role', role_id, {'permissions': page_keys})
         
@@ -4775,6 +5069,49 @@ def api_update_role_permissions(role_id):
         print(f"Update role permissions error: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Distinct audit log categories/actions for the filter dropdowns. These need
+# a scan of audit_log but change rarely, so they are cached briefly.
+audit_filters_cache = {
+    'data': None,
+    'timestamp': None
+}
+AUDIT_FILTERS_CACHE_TTL = 60  # seconds
+
+def get_audit_log_filter_values(cur):
+    """Return (categories, actions) present in audit_log, cached for a minute"""
+    now = datetime.now()
+    if (audit_filters_cache['data'] and audit_filters_cache['timestamp'] and
+        (now - audit_filters_cache['timestamp']).total_seconds() < AUDIT_FILTERS_CACHE_TTL):
+        return audit_filters_cache['data']
+    
+    cur.execute("""
+        SELECT DISTINCT category FROM audit_log WHERE category IS NOT NULL ORDER BY category
+    """)
+    categories = [r['category'] for r in cur.fetchall()]
+    
+    cur.execute("""
+        SELECT DISTINCT action FROM audit_log ORDER BY action
+    """)
+    actions = [r['action'] for r in cur.fetchall()]
+    
+    audit_filters_cache['data'] = (categories, actions)
+    audit_filters_cache['timestamp'] = now
+    return categories, actions
+
+AUDIT_LOG_MAX_PAGE_SIZE = 500
+
+# Characters with meaning in tsquery syntax; user search text is split on them
+# so e.g. '2001:db8' becomes the '2001' and 'db8' lexemes to_tsvector produces
+_TSQUERY_SPECIAL_CHARS = "&|!():*'\\<>"
+_TSQUERY_SPECIAL_TO_SPACE = str.maketrans(_TSQUERY_SPECIAL_CHARS, ' ' * len(_TSQUERY_SPECIAL_CHARS))
+
+def build_prefix_tsquery(search):
+    """Turn free text into a tsquery matching every word as a prefix, or None"""
+    terms = search.lower().translate(_TSQUERY_SPECIAL_TO_SPACE).split()
+    if not terms:
+        return None
+    return ' & '.join(f"'{t}':*" for t in terms)
+
 @app.route('/api/admin/audit-log', methods=['GET', 'OPTIONS'])
 @require_admin
 def api_get_audit_log():
@@ -4782,7 +5119,13 @@ def api_get_audit_log():
         return jsonify({'status': 'ok'})
     
     try:
-        limit = request.args.get('limit', 100, type=int)
+        # Bounded so one request can't pull the whole table into memory;
+        # deeper history is reached through the keyset cursor
+        limit = max(1, min(request.args.get('limit', 100, type=int), AUDIT_LOG_MAX_PAGE_SIZE))
+        # Keyset cursor from the previous page's nextCursor; offset is still
+        # accepted for older clients but gets slower the deeper it pages
+        before_created_at = request.args.get('before_created_at')
+        before_id = request.args.get('before_id', type=int)
         offset = request.args.get('offset', 0, type=int)
         category = request.args.get('category')
         severity = request.args.get('severity')
@@ -4792,169 +5135,163 @@ def api_get_audit_log():
         end_date = request.args.get('end_date')
         search = request.args.get('search', '').strip()
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        where_clauses = []
-        params = []
-        
-        if category:
-            where_clauses.append("a.category = %s")
-            params.append(category)
-        if severity:
-            where_clauses.append("a.severity = %s")
-            params.append(severity)
-        if action:
-            where_clauses.append("a.action = %s")
-            params.append(action)
-        if user_id:
-            where_clauses.append("a.user_id = %s")
-            params.append(user_id)
-        if start_date:
-            where_clauses.append("a.created_at >= %s")
-            params.append(start_date)
-        if end_date:
-            where_clauses.append("a.created_at <= %s")
-            params.append(end_date + ' 23:59:59')
-        if search:
-            where_clauses.append("(a.action ILIKE %s OR u.display_name ILIKE %s OR u.email ILIKE %s OR a.ip_address ILIKE %s)")
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param, search_param, search_param])
-        
-        where_sql = ""
-        if where_clauses:
-            where_sql = "WHERE " + " AND ".join(where_clauses)
-        
-        query = f"""
-            SELECT a.id, a.action, a.target_type, a.target_id, a.details, a.ip_address, a.created_at,
-                   u.display_name as user_name, u.email as user_email,
-                   COALESCE(a.category, 'general') as category,
-                   COALESCE(a.severity, 'info') as severity,
-                   COALESCE(a.result, 'success') as result
-            FROM audit_log a
-            LEFT JOIN users u ON a.user_id = u.id
-            {where_sql}
-            ORDER BY a.created_at DESC
-            LIMIT %s OFFSET %s
-        """
-        params.extend([limit, offset])
-        cur.execute(query, params)
-        logs = cur.fetchall()
-        
-        count_query = f"SELECT COUNT(*) as count FROM audit_log a LEFT JOIN users u ON a.user_id = u.id {where_sql}"
-        cur.execute(count_query, params[:-2] if params else [])
-        total = cur.fetchone()['count']
-        
-        cur.execute("""
-            SELECT DISTINCT category FROM audit_log WHERE category IS NOT NULL ORDER BY category
-        """)
-        categories = [r['category'] for r in cur.fetchall()]
+        with db_cursor() as (conn, cur):
+            where_clauses = []
+            params = []
+        
+            if category:
+                where_clauses.append("a.category = %s")
+                params.append(category)
+            if severity:
+                where_clauses.append("a.severity = %s")
+                params.append(severity)
+            if action:
+                where_clauses.append("a.action = %s")
+                params.append(action)
+            if user_id:
+                where_clauses.append("a.user_id = %s")
+                params.append(user_id)
+            if start_date:
+                where_clauses.append("a.created_at >= %s")
+                params.append(start_date)
+            if end_date:
+                where_clauses.append("a.created_at <= %s")
+                params.append(end_date + ' 23:59:59')
+            search_query = build_prefix_tsquery(search) if search else None
+            if search_query:
+                # Action/IP go through the GIN-indexed search_text column; the
+                # small users table is matched separately so the join isn't scanned
+                where_clauses.append("""(a.search_text @@ to_tsquery('simple', %s)
+                    OR a.user_id IN (SELECT id FROM users WHERE display_name ILIKE %s OR email ILIKE %s))""")
+                search_param = f"%{search}%"
+                params.extend([search_query, search_param, search_param])
+        
+            where_sql = ""
+            if where_clauses:
+                where_sql = "WHERE " + " AND ".join(where_clauses)
+            filter_params = list(params)
+        
+            # Total for the filtered set comes from a window count on the page
+            # query. A cursor narrows the page, so cursor pages count separately.
+            total_sql = ", COUNT(*) OVER() as total_count"
+            page_total_sql = ", MAX(p.total_count) as total_count"
+            page_sql = where_sql
+            if before_created_at and before_id:
+                total_sql = page_total_sql = ""
+                page_sql = "WHERE " + " AND ".join(where_clauses + ["(a.created_at, a.id) < (%s, %s)"])
+                params.extend([before_created_at, before_id])
+                offset = 0
+        
+            # The whole page is aggregated into one JSON array in Postgres,
+            # along with the size and last row needed for the next cursor
+            query = f"""
+                SELECT COALESCE(json_agg(p.log ORDER BY p.created_at DESC, p.id DESC), '[]')::text as logs_json,
+                       COUNT(*) as page_count,
+                       (array_agg(p.id ORDER BY p.created_at, p.id))[1] as last_id,
+                       (array_agg(p.created_at ORDER BY p.created_at, p.id))[1] as last_created_at
+                       {page_total_sql}
+                FROM (
+                    SELECT a.id, a.created_at,
+                           json_build_object(
+                               'id', a.id,
+                               'action', a.action,
+                               'targetType', a.target_type,
+                               'targetId', a.target_id,
+                               'details', a.details,
+                               'ipAddress', a.ip_address,
+                               'createdAt', a.created_at,
+                               'userName', u.display_name,
+                               'userEmail', u.email,
+                               'category', COALESCE(a.category, 'general'),
+                               'severity', COALESCE(a.severity, 'info'),
+                               'result', COALESCE(a.result, 'success')
+                           ) as log
+                           {total_sql}
+                    FROM audit_log a
+                    LEFT JOIN users u ON a.user_id = u.id
+                    {page_sql}
+                    ORDER BY a.created_at DESC, a.id DESC
+                    LIMIT %s OFFSET %s
+                ) p
+            """
+            params.extend([limit, offset])
+            cur.execute(query, params)
+            page = cur.fetchone()
         
-        cur.execute("""
-            SELECT DISTINCT action FROM audit_log ORDER BY action
-        """)
-        actions = [r['action'] for r in cur.fetchall()]
+            if page['page_count'] and page_total_sql:
+                total = page['total_count']
+            else:
+                count_query = f"SELECT COUNT(*) as count FROM audit_log a LEFT JOIN users u ON a.user_id = u.id {where_sql}"
+                cur.execute(count_query, filter_params)
+                total = cur.fetchone()['count']
+        
+        next_cursor = None
+        if page['page_count'] == limit and page['last_created_at']:
+            next_cursor = {
+                'beforeCreatedAt': page['last_created_at'].isoformat(),
+                'beforeId': page['last_id']
+            }
         
-        cur.close()
-        conn.close()
+        # The logs array arrives as JSON text from Postgres (details stays JSONB
+        # the whole way) and is spliced into the envelope without re-encoding
+        envelope = json.dumps({
+            'success': True,
+            'total': total,
+            'nextCursor': next_cursor
+        })
+        body = envelope[:-1] + ', "logs": ' + page['logs_json'] + '}'
+        return Response(body, mimetype='application/json')
+    except Exception as e:
+        print(f"Get audit log error: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/audit-log/meta', methods=['GET', 'OPTIONS'])
+@require_admin
+def api_get_audit_log_meta():
+    """Filter options for the audit log; fetched once rather than with every page"""
+    if request.method == 'OPTIONS':
+        return jsonify({'status': 'ok'})
+    
+    try:
+        with db_cursor() as (conn, cur):
+            categories, actions = get_audit_log_filter_values(cur)
         
         return jsonify({
             'success': True,
-            'total': total,
             'filters': {
                 'categories': categories,
                 'actions': actions,
                 'severities': ['info', 'warning', 'critical']
-            },
-            'logs': [{
-                'id': log['id'],
-                'action': log['action'],
-                'targetType': log['target_type'],
-                'targetId': log['target_id'],
-                'details': log['details'],
-                'ipAddress': log['ip_address'],
-                'createdAt': log['created_at'].isoformat() if log['created_at'] else None,
-                'userName': log['user_name'],
-                'userEmail': log['user_email'],
-                'category': log['category'],
-                'severity': log['severity'],
-                'result': log['result']
-            } for log in logs]
+            }
         })
     except Exception as e:
-        print(f"Get audit log error: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"Get audit log meta error: {e}")
         return jsonify({'error': str(e)}), 500
 
 # ============== SCHEDULED REPORTS API ==============
 
-def calculate_next_send(frequency, day_of_week, day_of_month, send_time):
-    """Calculate the next scheduled send time based on frequency"""
-    from datetime import date, time
-    now = datetime.now()
-    send_hour, send_minute = send_time.hour, send_time.minute
-    
-    if frequency == 'daily':
-        next_send = now.replace(hour=send_hour, minute=send_minute, second=0, microsecond=0)
-        if next_send <= now:
-            next_send += timedelta(days=1)
-    elif frequency == 'weekly':
-        days_ahead = day_of_week - now.weekday()
-        if days_ahead < 0 or (days_ahead == 0 and now.hour >= send_hour):
-            days_ahead += 7
-        next_send = now.replace(hour=send_hour, minute=send_minute, second=0, microsecond=0) + timedelta(days=days_ahead)
-    elif frequency == 'monthly':
-        next_send = now.replace(day=min(day_of_month, 28), hour=send_hour, minute=send_minute, second=0, microsecond=0)
-        if next_send <= now:
-            if now.month == 12:
-                next_send = next_send.replace(year=now.year + 1, month=1)
-            else:
-                next_send = next_send.replace(month=now.month + 1)
-    else:
-        next_send = now + timedelta(days=1)
-    
-    return next_send
-
 @app.route('/api/scheduled-reports', methods=['GET', 'OPTIONS'])
+@require_auth
 def api_get_scheduled_reports():
     """Get all scheduled reports for the current user"""
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'})
     
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    if not token:
-        return jsonify({'error': 'Authentication required'}), 401
-    
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+        user_id = request.current_user['id']
         
-        cur.execute("""
-            SELECT user_id FROM sessions 
-            WHERE token = %s AND expires_at > NOW()
-        """, (token,))
-        session = cur.fetchone()
-        
-        if not session:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Invalid session'}), 401
-        
-        user_id = session['user_id']
+        with db_cursor() as (conn, cur):
+            cur.execute("""
+                SELECT id, report_type, report_name, view_config, recipients, 
+                       frequency, day_of_week, day_of_month, send_time, 
+                       is_active, last_sent_at, next_send_at, created_at
+                FROM scheduled_reports
+                WHERE user_id = %s
+                ORDER BY created_at DESC
+            """, (user_id,))
         
-        cur.execute("""
-            SELECT id, report_type, report_name, view_config, recipients, 
-                   frequency, day_of_week, day_of_month, send_time, 
-                   is_active, last_sent_at, next_send_at, created_at
-            FROM scheduled_reports
-            WHERE user_id = %s
-            ORDER BY created_at DESC
-        """, (user_id,))
-        
-        reports = cur.fetchall()
-        cur.close()
-        conn.close()
+            reports = cur.fetchall()
         
         return jsonify({
             'success': True,
@@ -4979,173 +5316,139 @@ def api_get_scheduled_reports():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/scheduled-reports', methods=['POST'])
+@require_auth
 def api_create_scheduled_report():
-    """Create a new scheduled report"""
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    if not token:
-        return jsonify({'error': 'Authentication required'}), 401
-    
+    """Create a new scheduled report"""
     try:
         data = request.get_json(force=True, silent=True)
         if not data:
             return jsonify({'error': 'Invalid JSON data'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        cur.execute("""
-            SELECT user_id FROM sessions 
-            WHERE token = %s AND expires_at > NOW()
-        """, (token,))
-        session = cur.fetchone()
-        
-        if not session:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Invalid session'}), 401
-        
-        user_id = session['user_id']
+        user_id = request.current_user['id']
         
-        report_type = data.get('reportType')
-        report_name = data.get('reportName')
-        view_config = data.get('viewConfig', {})
-        recipients = data.get('recipients', [])
-        frequency = data.get('frequency', 'weekly')
-        day_of_week = data.get('dayOfWeek', 1)
-        day_of_month = data.get('dayOfMonth', 1)
-        send_time_str = data.get('sendTime', '08:00')
+        with db_cursor() as (conn, cur):
+            report_type = data.get('reportType')
+            report_name = data.get('reportName')
+            view_config = data.get('viewConfig', {})
+            recipients = data.get('recipients', [])
+            frequency = data.get('frequency', 'weekly')
+            day_of_week = data.get('dayOfWeek', 1)
+            day_of_month = data.get('dayOfMonth', 1)
+            send_time_str = data.get('sendTime', '08:00')
         
-        if not report_type or not report_name or not recipients:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Missing required fields: reportType, reportName, recipients'}), 400
-        
-        from datetime import time
-        hour, minute = map(int, send_time_str.split(':'))
-        send_time = time(hour, minute)
+            if not report_type or not report_name or not recipients:
+                return jsonify({'error': 'Missing required fields: reportType, reportName, recipients'}), 400
         
-        next_send = calculate_next_send(frequency, day_of_week, day_of_month, send_time)
+            from datetime import time
+            hour, minute = map(int, send_time_str.split(':'))
+            send_time = time(hour, minute)
         
-        cur.execute("""
-            INSERT INTO scheduled_reports 
-            (user_id, report_type, report_name, view_config, recipients, 
-             frequency, day_of_week, day_of_month, send_time, next_send_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """, (user_id, report_type, report_name, json.dumps(view_config), 
-              recipients, frequency, day_of_week, day_of_month, send_time, next_send))
-        
-        new_id = cur.fetchone()['id']
-        conn.commit()
-        cur.close()
-        conn.close()
+            cur.execute("""
+                INSERT INTO scheduled_reports 
+                (user_id, report_type, report_name, view_config, recipients, 
+                 frequency, day_of_week, day_of_month, send_time, next_send_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, compute_next_send(%s, %s, %s, %s))
+                RETURNING id, next_send_at
+            """, (user_id, report_type, report_name, json.dumps(view_config), 
+                  recipients, frequency, day_of_week, day_of_month, send_time,
+                  frequency, day_of_week, day_of_month, send_time))
+        
+            new_report = cur.fetchone()
+            conn.commit()
         
         return jsonify({
             'success': True,
-            'id': new_id,
-            'nextSendAt': next_send.isoformat()
+            'id': new_report['id'],
+            'nextSendAt': new_report['next_send_at'].isoformat()
         })
     except Exception as e:
         print(f"Create scheduled report error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/scheduled-reports/<int:report_id>', methods=['PUT', 'OPTIONS'])
+@require_auth
 def api_update_scheduled_report(report_id):
     """Update a scheduled report"""
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'})
     
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    if not token:
-        return jsonify({'error': 'Authentication required'}), 401
-    
     try:
         data = request.get_json(force=True, silent=True)
         if not data:
             return jsonify({'error': 'Invalid JSON data'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        cur.execute("""
-            SELECT user_id FROM sessions 
-            WHERE token = %s AND expires_at > NOW()
-        """, (token,))
-        session = cur.fetchone()
-        
-        if not session:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Invalid session'}), 401
-        
-        user_id = session['user_id']
-        
-        cur.execute("""
-            SELECT id FROM scheduled_reports WHERE id = %s AND user_id = %s
-        """, (report_id, user_id))
-        
-        if not cur.fetchone():
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Report not found'}), 404
-        
-        report_name = data.get('reportName')
-        view_config = data.get('viewConfig')
-        recipients = data.get('recipients')
-        frequency = data.get('frequency')
-        day_of_week = data.get('dayOfWeek')
-        day_of_month = data.get('dayOfMonth')
-        send_time_str = data.get('sendTime')
-        is_active = data.get('isActive')
-        
-        updates = []
-        params = []
-        
-        if report_name is not None:
-            updates.append("report_name = %s")
-            params.append(report_name)
-        if view_config is not None:
-            updates.append("view_config = %s")
-            params.append(json.dumps(view_config))
-        if recipients is not None:
-            updates.append("recipients = %s")
-            params.append(recipients)
-        if frequency is not None:
-            updates.append("frequency = %s")
-            params.append(frequency)
-        if day_of_week is not None:
-            updates.append("day_of_week = %s")
-            params.append(day_of_week)
-        if day_of_month is not None:
-            updates.append("day_of_month = %s")
-            params.append(day_of_month)
-        if send_time_str is not None:
-            from datetime import time
-            hour, minute = map(int, send_time_str.split(':'))
-            updates.append("send_time = %s")
-            params.append(time(hour, minute))
-        if is_active is not None:
-            updates.append("is_active = %s")
-            params.append(is_active)
-        
-        if updates:
-            updates.append("updated_at = NOW()")
-            query = f"UPDATE scheduled_reports SET {', '.join(updates)} WHERE id = %s"
-            params.append(report_id)
-            cur.execute(query, params)
-            
-            if frequency or day_of_week or day_of_month or send_time_str:
-                cur.execute("SELECT frequency, day_of_week, day_of_month, send_time FROM scheduled_reports WHERE id = %s", (report_id,))
-                row = cur.fetchone()
+        user_id = request.current_user['id']
+        
+        with db_cursor() as (conn, cur):
+            report_name = data.get('reportName')
+            view_config = data.get('viewConfig')
+            recipients = data.get('recipients')
+            frequency = data.get('frequency')
+            day_of_week = data.get('dayOfWeek')
+            day_of_month = data.get('dayOfMonth')
+            send_time_str = data.get('sendTime')
+            is_active = data.get('isActive')
+        
+            updates = []
+            params = []
+        
+            if report_name is not None:
+                updates.append("report_name = %s")
+                params.append(report_name)
+            if view_config is not None:
+                updates.append("view_config = %s")
+                params.append(json.dumps(view_config))
+            if recipients is not None:
+                updates.append("recipients = %s")
+                params.append(recipients)
+            if frequency is not None:
+                updates.append("frequency = %s")
+                params.append(frequency)
+            if day_of_week is not None:
+                updates.append("day_of_week = %s")
+                params.append(day_of_week)
+            if day_of_month is not None:
+                updates.append("day_of_month = %s")
+                params.append(day_of_month)
+            send_time = None
+            if send_time_str is not None:
                 from datetime import time
-                next_send = calculate_next_send(row['frequency'], row['day_of_week'], row['day_of_month'], row['send_time'])
-                cur.execute("UPDATE scheduled_reports SET next_send_at = %s WHERE id = %s", (next_send, report_id))
+                hour, minute = map(int, send_time_str.split(':'))
+                send_time = time(hour, minute)
+                updates.append("send_time = %s")
+                params.append(send_time)
+            if is_active is not None:
+                updates.append("is_active = %s")
+                params.append(is_active)
+        
+            schedule = [('frequency', frequency), ('day_of_week', day_of_week),
+                        ('day_of_month', day_of_month), ('send_time', send_time)]
+            if any(value is not None for _, value in schedule):
+                # SET expressions see the old row, so pass new schedule values
+                # directly and fall back to the stored column for the rest
+                schedule_args = []
+                for column, value in schedule:
+                    if value is None:
+                        schedule_args.append(column)
+                    else:
+                        schedule_args.append("%s")
+                        params.append(value)
+                updates.append(f"next_send_at = compute_next_send({', '.join(schedule_args)})")
+        
+            # Ownership check, field updates and rescheduling in one statement
+            if updates:
+                updates.append("updated_at = NOW()")
+                query = f"UPDATE scheduled_reports SET {', '.join(updates)} WHERE id = %s AND user_id = %s RETURNING id"
+            else:
+                query = "SELECT id FROM scheduled_reports WHERE id = %s AND user_id = %s"
+            params.extend([report_id, user_id])
+            cur.execute(query, params)
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            if not cur.fetchone():
+                return jsonify({'error': 'Report not found'}), 404
+        
+            conn.commit()
         
         return jsonify({'success': True})
     except Exception as e:
@@ -5153,41 +5456,21 @@ def api_update_scheduled_report(report_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/scheduled-reports/<int:report_id>', methods=['DELETE'])
+@require_auth
 def api_delete_scheduled_report(report_id):
     """Delete a scheduled report"""
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    if not token:
-        return jsonify({'error': 'Authentication required'}), 401
-    
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        cur.execute("""
-            SELECT user_id FROM sessions 
-            WHERE token = %s AND expires_at > NOW()
-        """, (token,))
-        session = cur.fetchone()
-        
-        if not session:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Invalid session'}), 401
-        
-        user_id = session['user_id']
+        user_id = request.current_user['id']
         
-        cur.execute("""
-            DELETE FROM scheduled_reports WHERE id = %s AND user_id = %s
-        """, (report_id, user_id))
+        with db_cursor() as (conn, cur):
+            cur.execute("""
+                DELETE FROM scheduled_reports WHERE id = %s AND user_id = %s
+            """, (report_id, user_id))
         
-        if cur.rowcount == 0:
-            cur.close()
-            conn.close()
-            return jsonify({'error': 'Report not found'}), 404
+            if cur.rowcount == 0:
+                return jsonify({'error': 'Report not found'}), 404
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
         
         return jsonify({'success': True})
     except Exception as e:
@@ -5201,71 +5484,67 @@ def api_process_scheduled_reports():
         return jsonify({'status': 'ok'})
     
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        cur.execute("""
-            SELECT sr.*, u.email as user_email, u.display_name as user_name
-            FROM scheduled_reports sr
-            JOIN users u ON sr.user_id = u.id
-            WHERE sr.is_active = TRUE 
-              AND sr.next_send_at <= NOW()
-        """)
+        with db_cursor() as (conn, cur):
+            cur.execute("""
+                SELECT sr.*, u.email as user_email, u.display_name as user_name
+                FROM scheduled_reports sr
+                JOIN users u ON sr.user_id = u.id
+                WHERE sr.is_active = TRUE 
+                  AND sr.next_send_at <= NOW()
+            """)
         
-        due_reports = cur.fetchall()
-        sent_count = 0
-        errors = []
+            due_reports = cur.fetchall()
+            sent_ids = []
+            errors = []
+            email_futures = {}
         
-        for report in due_reports:
-            try:
-                subject = f"FTG Dashboard: {report['report_name']}"
+            for report in due_reports:
+                try:
+                    subject = f"FTG Dashboard: {report['report_name']}"
                 
-                html_content = f"""
-                <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-                    <h2 style="color: #1e3a5f;">Scheduled Report: {report['report_name']}</h2>
-                    <p>This is your scheduled {report['frequency']} report from FTG Dashboard.</p>
-                    <p><strong>Report Type:</strong> {report['report_type'].replace('_', ' ').title()}</p>
-                    <p><strong>Configuration:</strong></p>
-                    <pre style="background: #f5f5f5; padding: 10px; border-radius: 4px;">{json.dumps(report['view_config'], indent=2)}</pre>
-                    <p style="margin-top: 20px;">
-                        <a href="https://ftg-dashboard.replit.app" style="background: #3b82f6; color: white; padding: 10px 20px; text-decoration: none; border-radius: 4px;">
-                            View Full Report
-                        </a>
-                    </p>
-                    <p style="color: #666; font-size: 12px; margin-top: 30px;">
-                        This automated report was scheduled by {report['user_name']} ({report['user_email']}).
-                    </p>
-                </div>
-                """
+                    html_content = f"""
+                    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+                        <h2 style="color: #1e3a5f;">Scheduled Report: {report['report_name']}</h2>
+                        <p>This is your scheduled {report['frequency']} report from FTG Dashboard.</p>
+                        <p><strong>Report Type:</strong> {report['report_type'].replace('_', ' ').title()}</p>
+                        <p><strong>Configuration:</strong></p>
+                        <pre style="background: #f5f5f5; padding: 10px; border-radius: 4px;">{json.dumps(report['view_config'], indent=2)}</pre>
+                        <p style="margin-top: 20px;">
+                            <a href="https://ftg-dashboard.replit.app" style="background: #3b82f6; color: white; padding: 10px 20px; text-decoration: none; border-radius: 4px;">
+                                View Full Report
+                            </a>
+                        </p>
+                        <p style="color: #666; font-size: 12px; margin-top: 30px;">
+                            This automated report was scheduled by {report['user_name']} ({report['user_email']}).
+                        </p>
+                    </div>
+                    """
                 
-                for recipient in report['recipients']:
-                    try:
-                        send_gmail(recipient, subject, html_content)
-                    except Exception as email_err:
-                        errors.append(f"Failed to send to {recipient}: {str(email_err)}")
+                    for recipient in report['recipients']:
+                        email_futures[_email_executor.submit(send_gmail, recipient, subject, html_content)] = recipient
                 
-                from datetime import time
-                next_send = calculate_next_send(
-                    report['frequency'], 
-                    report['day_of_week'], 
-                    report['day_of_month'], 
-                    report['send_time']
-                )
+                    sent_ids.append(report['id'])
                 
+                except Exception as report_err:
+                    errors.append(f"Report {report['id']}: {str(report_err)}")
+        
+            # Sends for all due reports run concurrently; collect their failures
+            for future in as_completed(email_futures):
+                try:
+                    future.result()
+                except Exception as email_err:
+                    errors.append(f"Failed to send to {email_futures[future]}: {str(email_err)}")
+        
+            # Reschedule every sent report in one statement
+            if sent_ids:
                 cur.execute("""
                     UPDATE scheduled_reports 
-                    SET last_sent_at = NOW(), next_send_at = %s
-                    WHERE id = %s
-                """, (next_send, report['id']))
-                
-                sent_count += 1
-                
-            except Exception as report_err:
-                errors.append(f"Report {report['id']}: {str(report_err)}")
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+                    SET last_sent_at = NOW(),
+                        next_send_at = compute_next_send(frequency, day_of_week, day_of_month, send_time)
+                    WHERE id = ANY(%s)
+                """, (sent_ids,))
+            sent_count = len(sent_ids)
+            conn.commit()
         
         return jsonify({
             'success': True,
@@ -5275,7 +5554,6 @@ def api_process_scheduled_reports():
         })
     except Exception as e:
         print(f"Process scheduled reports error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
@@ -5285,10 +5563,15 @@ def serve_index():
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
     return response
 
+# Path classes for serve_static, built once rather than per request
+API_PATH_PREFIXES = ('api/', '__api__')
+LONG_CACHE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico', '.svg', '.woff', '.woff2', '.ttf')
+VERSIONED_ASSET_EXTENSIONS = ('.css', '.js')
+
 @app.route('/<path:path>')
 def serve_static(path):
     # Don't serve static files for API routes
-    if path.startswith('api/') or path == 'send-email.json' or path.startswith('__api__'):
+    if path.startswith(API_PATH_PREFIXES) or path == 'send-email.json':
         return jsonify({'error': 'API endpoint not found'}), 404
     # Don't try to serve .py files
     if path.endswith('.py'):
@@ -5299,15 +5582,19 @@ def serve_static(path):
         # Optimized cache control for different file types
         # Static assets that rarely change get long cache (1 year with versioning)
         # Dynamic content gets no-cache
-        if path.endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico', '.svg', '.woff', '.woff2', '.ttf')):
+        if path.endswith(LONG_CACHE_EXTENSIONS):
             # Images and fonts - cache for 1 year (versioned via query string or path)
             response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
         elif path.startswith('data/') and path.endswith('.json'):
             # Data files - cache for 5 minutes (frequently accessed, rarely changed)
             response.headers['Cache-Control'] = 'public, max-age=300'
-        elif path.endswith('.css') or path.endswith('.js'):
-            # CSS/JS with version query strings - cache for 1 day
-            response.headers['Cache-Control'] = 'public, max-age=86400'
+        elif path.endswith(VERSIONED_ASSET_EXTENSIONS):
+            if request.args.get('v'):
+                # index.html bumps ?v= on every release, so a versioned URL never changes
+                response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+            else:
+                # Unversioned CSS/JS - cache for 1 day
+                response.headers['Cache-Control'] = 'public, max-age=86400'
         else:
             # All other files - no cache
             response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
@@ -5331,87 +5618,58 @@ def run_scheduler():
             time.sleep(SCHEDULER_INTERVAL)
             continue
         
-        conn = None
-        cur = None
         try:
-            conn = get_db_connection()
-            cur = conn.cursor()
-            
-            cur.execute("""
-                SELECT sr.*, u.email as user_email, u.display_name as user_name
-                FROM scheduled_reports sr
-                JOIN users u ON sr.user_id = u.id
-                WHERE sr.is_active = TRUE 
-                  AND sr.next_send_at <= NOW()
-            """)
-            
-            due_reports = cur.fetchall()
-            
+            with db_cursor() as (conn, cur):
+                cur.execute("""
+                    SELECT sr.*, u.email as user_email, u.display_name as user_name
+                    FROM scheduled_reports sr
+                    JOIN users u ON sr.user_id = u.id
+                    WHERE sr.is_active = TRUE 
+                      AND sr.next_send_at <= NOW()
+                """)
+                due_reports = cur.fetchall()
         except Exception as e:
             print(f"[{datetime.now().isoformat()}] Scheduler DB query error: {str(e)}")
             due_reports = []
-        finally:
-            if cur:
-                try:
-                    cur.close()
-                except:
-                    pass
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
         
+        email_futures = {}
         for report in due_reports:
-            report_conn = None
-            report_cur = None
             try:
                 subject = f"FTG Dashboard: {report['report_name']}"
                 html_content = generate_report_email(report)
                 
-                email_success = False
                 for recipient in report['recipients']:
-                    try:
-                        send_gmail(recipient, subject, html_content)
-                        print(f"[{datetime.now().isoformat()}] Sent report '{report['report_name']}' to {recipient}")
-                        email_success = True
-                    except Exception as email_err:
-                        print(f"[{datetime.now().isoformat()}] Failed to send to {recipient}: {str(email_err)}")
-                
-                if email_success:
-                    try:
-                        next_send = calculate_next_send(
-                            report['frequency'], 
-                            report['day_of_week'], 
-                            report['day_of_month'], 
-                            report['send_time']
-                        )
-                        
-                        report_conn = get_db_connection()
-                        report_cur = report_conn.cursor()
-                        report_cur.execute("""
-                            UPDATE scheduled_reports 
-                            SET last_sent_at = NOW(), next_send_at = %s
-                            WHERE id = %s
-                        """, (next_send, report['id']))
-                        report_conn.commit()
-                    except Exception as db_err:
-                        print(f"[{datetime.now().isoformat()}] Failed to update report {report['id']}: {str(db_err)}")
-                    finally:
-                        if report_cur:
-                            try:
-                                report_cur.close()
-                            except:
-                                pass
-                        if report_conn:
-                            try:
-                                report_conn.close()
-                            except:
-                                pass
+                    email_futures[_email_executor.submit(send_gmail, recipient, subject, html_content)] = (report, recipient)
                     
             except Exception as report_err:
                 print(f"[{datetime.now().isoformat()}] Report {report['id']} error: {str(report_err)}")
         
+        # A report counts as sent once any of its recipients received it
+        sent_ids = []
+        for future in as_completed(email_futures):
+            report, recipient = email_futures[future]
+            try:
+                future.result()
+                print(f"[{datetime.now().isoformat()}] Sent report '{report['report_name']}' to {recipient}")
+                if report['id'] not in sent_ids:
+                    sent_ids.append(report['id'])
+            except Exception as email_err:
+                print(f"[{datetime.now().isoformat()}] Failed to send to {recipient}: {str(email_err)}")
+        
+        # Reschedule every report that went out in one statement
+        if sent_ids:
+            try:
+                with db_cursor() as (conn, cur):
+                    cur.execute("""
+                        UPDATE scheduled_reports 
+                        SET last_sent_at = NOW(),
+                            next_send_at = compute_next_send(frequency, day_of_week, day_of_month, send_time)
+                        WHERE id = ANY(%s)
+                    """, (sent_ids,))
+                    conn.commit()
+            except Exception as db_err:
+                print(f"[{datetime.now().isoformat()}] Failed to update reports {sent_ids}: {str(db_err)}")
+        
         time.sleep(SCHEDULER_INTERVAL)
 
 def generate_report_email(report):
@@ -5525,7 +5783,7 @@ def generate_report_email(report):
 
 # ============== PAYMENTS API (Optimized) ==============
 
-PAYMENTS_EXCLUDED_VENDORS = {
+PAYMENTS_EXCLUDED_VENDORS = frozenset({
     'Bridge Bank',
     'Payroll4Construction',
     'MISCELLANEOUS VENDOR',
@@ -5547,28 +5805,127 @@ PAYMENTS_EXCLUDED_VENDORS = {
     'DoorDash Food Delivery',
     'Costco Wholesale',
     'Gas/other vehicle expense'
-}
+})
+
+# Exclusion checks compare casefolded names so spelling variants in the exports match
+PAYMENTS_EXCLUDED_VENDORS_CASEFOLDED = frozenset(v.casefold() for v in PAYMENTS_EXCLUDED_VENDORS)
+
+AP_INVOICES_PATH = os.path.join(os.path.dirname(__file__), 'data', 'ap_invoices.json')
+
+def read_json_file(path):
+    """Parse a JSON data file, using orjson when available"""
+    with open(path, 'rb') as f:
+        # Skip a UTF-8 BOM by seeking past it rather than copying the whole buffer
+        if f.read(3) != b'\xef\xbb\xbf':
+            f.seek(0)
+        raw = f.read()
+    return _json_loads(raw)
+
+FINANCIALS_JOBS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'financials_jobs.json')
+_active_pms_cache = {'mtime': None, 'pms': (), 'generated_at': ''}
+_active_pms_lock = threading.Lock()
+
+def get_active_job_pms():
+    """Return (sorted PM names with active jobs, generated_at, mtime) for financials_jobs.json.
+
+    The 30+ MB file is parsed once per mtime and shared by every PM dropdown
+    endpoint; only the names are kept, not the parsed job lists.
+    """
+    mtime = os.stat(FINANCIALS_JOBS_PATH).st_mtime
+    with _active_pms_lock:
+        if _active_pms_cache['mtime'] != mtime:
+            data = read_json_file(FINANCIALS_JOBS_PATH)
+            pms = set()
+            for job in data.get('job_budgets', []):
+                if job.get('job_status', '') == 'A':
+                    pm = job.get('project_manager_name', '')
+                    if pm and pm.strip():
+                        pms.add(pm.strip())
+            _active_pms_cache['pms'] = tuple(sorted(pms))
+            _active_pms_cache['generated_at'] = data.get('generated_at', '')
+            _active_pms_cache['mtime'] = mtime
+        return _active_pms_cache['pms'], _active_pms_cache['generated_at'], _active_pms_cache['mtime']
+
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+@lru_cache(maxsize=16384)
+def excel_serial_to_datetime(serial):
+    """Naive datetime for an Excel serial date - invoices share a few thousand distinct dates"""
+    return EXCEL_EPOCH + timedelta(days=serial)
+
+@lru_cache(maxsize=16384)
+def excel_serial_label(serial):
+    """Display label ('Mar 07, 2015') for an Excel serial date, shared by every row on that date"""
+    return excel_serial_to_datetime(serial).strftime('%b %d, %Y')
+
+def parse_amount(value):
+    """Convert a string amount from the JSON exports to float, treating blanks/garbage as 0"""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+_raw_invoices_cache = None
+_raw_invoices_mtime = 0
+_raw_invoices_lock = threading.Lock()
+
+def get_raw_invoices():
+    """Raw ap_invoices.json invoice list, re-parsed only when the file changes"""
+    global _raw_invoices_cache, _raw_invoices_mtime
+    
+    mtime = os.stat(AP_INVOICES_PATH).st_mtime
+    if _raw_invoices_cache is not None and mtime == _raw_invoices_mtime:
+        return _raw_invoices_cache
+    
+    with _raw_invoices_lock:
+        if _raw_invoices_cache is None or mtime != _raw_invoices_mtime:
+            _raw_invoices_cache = read_json_file(AP_INVOICES_PATH).get('invoices', [])
+            _raw_invoices_mtime = mtime
+        return _raw_invoices_cache
+
+class PaymentRecord(NamedTuple):
+    """One cached AP invoice row; _asdict() gives the /api/payments JSON shape"""
+    vendor: str
+    invoice_no: str
+    invoice_date: str
+    invoice_date_sort: float
+    job_no: str
+    job_description: str
+    project_manager: str
+    non_retention: float
+    retention: float
+    invoice_amount: float
+    paid_to_date: float
+    remaining_balance: float
+    status: str
+
+class PaymentsData(NamedTuple):
+    payments: tuple
+    metrics: MappingProxyType
+    lowered: MappingProxyType  # text column -> tuple of lowercased values, row-aligned with payments
+    filter_values: dict  # column -> encoded /filter-values body, filled on first request
+    metrics_body: bytes  # encoded /metrics body
+    sort_orders: dict  # (sort key, descending) -> (row order, row rank) arrays, filled on first request
 
 _payments_cache = None
 _payments_cache_lock = threading.Lock()
 
 def get_payments_data():
-    """Load and cache AP invoices data - only loads once"""
+    """Load and cache AP invoices as an immutable PaymentsData - only loads once"""
     global _payments_cache
     
-    if _payments_cache is not None:
-        return _payments_cache
+    cached = _payments_cache
+    if cached is not None:
+        return cached
     
     with _payments_cache_lock:
-        if _payments_cache is not None:
-            return _payments_cache
+        cached = _payments_cache
+        if cached is not None:
+            return cached
         
         try:
             # Load AP invoices data
-            invoices_path = os.path.join(os.path.dirname(__file__), 'data', 'ap_invoices.json')
-            
-            with open(invoices_path, 'r', encoding='utf-8-sig') as f:
-                invoices_json = json.load(f)
+            raw_invoices = get_raw_invoices()
             
             # Process invoices - convert dates and calculate fields
             invoices = []
@@ -5578,42 +5935,33 @@ def get_payments_data():
             total_remaining = 0
             unique_vendors = set()
             
-            for inv in invoices_json.get('invoices', []):
-                vendor = inv.get('vendor_name', '')
-                if vendor in PAYMENTS_EXCLUDED_VENDORS:
+            # Hoist hot lookups out of the per-invoice loop
+            append = invoices.append
+            excluded_vendors = PAYMENTS_EXCLUDED_VENDORS_CASEFOLDED
+            date_label = excel_serial_label
+            
+            for inv in raw_invoices:
+                get = inv.get
+                vendor = get('vendor_name', '')
+                if vendor.casefold() in excluded_vendors:
                     continue
                 
                 try:
-                    excel_date = float(inv.get('invoice_date', 0))
+                    excel_date = float(get('invoice_date', 0))
                     if excel_date > 0:
-                        date_obj = datetime.fromtimestamp((excel_date - 25569) * 86400)
-                        date_str = date_obj.strftime('%b %d, %Y')
+                        date_str = date_label(excel_date)
+                        date_sort = (excel_date - 25569) * 86400
                     else:
-                        date_obj = None
+                        date_sort = 0
                         date_str = '-'
                 except:
-                    date_obj = None
+                    date_sort = 0
                     date_str = '-'
                 
-                try:
-                    invoice_amount = float(inv.get('invoice_amount', 0) or 0)
-                except:
-                    invoice_amount = 0
-                
-                try:
-                    retention = float(inv.get('retainage_amount', 0) or 0)
-                except:
-                    retention = 0
-                
-                try:
-                    paid_to_date = float(inv.get('amount_paid_to_date', 0) or 0)
-                except:
-                    paid_to_date = 0
-                
-                try:
-                    remaining = float(inv.get('remaining_balance', 0) or 0)
-                except:
-                    remaining = 0
+                invoice_amount = parse_amount(get('invoice_amount'))
+                retention = parse_amount(get('retainage_amount'))
+                paid_to_date = parse_amount(get('amount_paid_to_date'))
+                remaining = parse_amount(get('remaining_balance'))
                 
                 non_retention = invoice_amount - retention
                 
@@ -5625,44 +5973,68 @@ def get_payments_data():
                 total_paid += paid_to_date
                 total_remaining += remaining
                 
-                invoices.append({
-                    'vendor': vendor,
-                    'invoice_no': inv.get('invoice_no', '').strip(),
-                    'invoice_date': date_str,
-                    'invoice_date_sort': date_obj.timestamp() if date_obj else 0,
-                    'job_no': inv.get('job_no', ''),
-                    'job_description': inv.get('job_description', ''),
-                    'project_manager': inv.get('project_manager_name', ''),
-                    'non_retention': non_retention,
-                    'retention': retention,
-                    'invoice_amount': invoice_amount,
-                    'paid_to_date': paid_to_date,
-                    'remaining_balance': remaining,
-                    'status': inv.get('payment_status', '')
-                })
+                append(PaymentRecord(
+                    vendor,
+                    get('invoice_no', '').strip(),
+                    date_str,
+                    date_sort,
+                    get('job_no', ''),
+                    get('job_description', ''),
+                    get('project_manager_name', ''),
+                    non_retention,
+                    retention,
+                    invoice_amount,
+                    paid_to_date,
+                    remaining,
+                    get('payment_status', '')
+                ))
             
-            _payments_cache = {
-                'payments': invoices,
-                'metrics': {
-                    'totalCount': len(invoices),
-                    'totalInvoiceAmount': total_invoice_amount,
-                    'totalRetention': total_retention,
-                    'totalPaid': total_paid,
-                    'totalRemaining': total_remaining,
-                    'uniqueVendors': len(unique_vendors)
-                }
-            }
+            payments = tuple(invoices)
+            metrics = MappingProxyType({
+                'totalCount': len(payments),
+                'totalInvoiceAmount': total_invoice_amount,
+                'totalRetention': total_retention,
+                'totalPaid': total_paid,
+                'totalRemaining': total_remaining,
+                'uniqueVendors': len(unique_vendors)
+            })
+            
+            lowered = MappingProxyType({
+                col: tuple(str(value).lower() for value in map(attrgetter(col), payments)) for col in PAYMENTS_TEXT_COLUMNS
+            })
+            
+            metrics_body = _json_dumps({'success': True, 'metrics': dict(metrics)})
             
-            print(f"[PAYMENTS] Loaded and cached {len(invoices)} AP invoice records")
-            return _payments_cache
+            cached = PaymentsData(payments, metrics, lowered, {}, metrics_body, {})
+            _payments_cache = cached
+            
+            print(f"[PAYMENTS] Loaded and cached {len(payments)} AP invoice records")
+            return cached
             
         except Exception as e:
             print(f"[PAYMENTS] Error loading data: {e}")
-            import traceback
             traceback.print_exc()
-            return {'payments': [], 'metrics': {'totalCount': 0, 'totalInvoiceAmount': 0, 'totalRetention': 0, 'totalPaid': 0, 'totalRemaining': 0, 'uniqueVendors': 0}}
+            metrics = {'totalCount': 0, 'totalInvoiceAmount': 0, 'totalRetention': 0, 'totalPaid': 0, 'totalRemaining': 0, 'uniqueVendors': 0}
+            return PaymentsData((), MappingProxyType(metrics), MappingProxyType({col: () for col in PAYMENTS_TEXT_COLUMNS}), {}, _json_dumps({'success': True, 'metrics': metrics}), {})
+
+def get_payments_sort_order(data, sort_key, reverse):
+    """Row order and per-row rank for one sort of the cached payments, computed once per key/direction"""
+    cached = data.sort_orders.get((sort_key, reverse))
+    if cached is None:
+        payments = data.payments
+        # Same key and stability as sorting the records themselves, ties keep file order
+        values = list(map(attrgetter(sort_key), payments))
+        order = sorted(range(len(payments)), key=lambda i: (values[i] == '', values[i]), reverse=reverse)
+        rank = array('i', [0]) * len(order)
+        for position, i in enumerate(order):
+            rank[i] = position
+        cached = (array('i', order), rank)
+        data.sort_orders[(sort_key, reverse)] = cached
+    return cached
 
 PAYMENTS_VALID_COLUMNS = {'vendor', 'invoice_no', 'invoice_date', 'job_no', 'job_description', 'project_manager', 'non_retention', 'retention', 'invoice_amount', 'paid_to_date', 'remaining_balance', 'status'}
+PAYMENTS_TOTAL_COLUMNS = ('non_retention', 'retention', 'invoice_amount', 'paid_to_date', 'remaining_balance')
+PAYMENTS_TEXT_COLUMNS = ('vendor', 'invoice_no', 'invoice_date', 'job_no', 'job_description', 'project_manager', 'status')
 
 @app.route('/api/payments', methods=['GET', 'OPTIONS'])
 def api_get_payments():
@@ -5672,7 +6044,8 @@ def api_get_payments():
     
     try:
         data = get_payments_data()
-        payments = list(data['payments'])  # Copy to avoid mutating cache
+        payments = data.payments  # Immutable tuple; filtering and sorting build new lists
+        lowered = data.lowered
         
         # Get query params
         page = request.args.get('page', 1, type=int)
@@ -5697,15 +6070,20 @@ def api_get_payments():
         except:
             column_filters = {}
         
-        # Apply individual search filters
-        if job_filter:
-            payments = [p for p in payments if job_filter in str(p.get('job_no', '')).lower()]
-        if vendor_filter:
-            payments = [p for p in payments if vendor_filter in str(p.get('vendor', '')).lower()]
-        if invoice_filter:
-            payments = [p for p in payments if invoice_filter in str(p.get('invoice_no', '')).lower()]
-        if pm_filter:
-            payments = [p for p in payments if p.get('project_manager', '') == pm_filter]
+        # Filters narrow a list of row indices, matching against the
+        # pre-lowercased cache columns instead of lowering every row per request
+        rows = range(len(payments))
+        
+        # Apply individual search filters in a single pass; inactive ones short-circuit
+        if job_filter or vendor_filter or invoice_filter or pm_filter:
+            job_lc = lowered['job_no']
+            vendor_lc = lowered['vendor']
+            invoice_lc = lowered['invoice_no']
+            rows = [i for i in rows
+                    if (not job_filter or job_filter in job_lc[i])
+                    and (not vendor_filter or vendor_filter in vendor_lc[i])
+                    and (not invoice_filter or invoice_filter in invoice_lc[i])
+                    and (not pm_filter or payments[i].project_manager == pm_filter)]
         
         # Apply column filters (validate column names)
         for col, values in column_filters.items():
@@ -5715,7 +6093,11 @@ def api_get_payments():
                 # Limit filter values to prevent abuse
                 values = values[:1000]
                 value_set = set(str(v).lower() for v in values)
-                payments = [p for p in payments if str(p.get(col, '')).lower() in value_set]
+                col_lc = lowered.get(col)
+                if col_lc is not None:
+                    rows = [i for i in rows if col_lc[i] in value_set]
+                else:
+                    rows = [i for i in rows if str(getattr(payments[i], col)).lower() in value_set]
         
         # Sort using proper numeric/date keys
         sort_key_map = {
@@ -5725,27 +6107,26 @@ def api_get_payments():
         sort_key = sort_key_map.get(sort_column, sort_column)
         reverse = sort_direction == 'desc'
         
-        try:
-            payments = sorted(payments, key=lambda x: (x.get(sort_key) is None or x.get(sort_key) == '', x.get(sort_key, '')), reverse=reverse)
-        except Exception as sort_err:
-            print(f"[PAYMENTS] Sort error: {sort_err}")
+        # Unfiltered requests take the precomputed order as-is; filtered rows
+        # are ordered by their precomputed rank, an int-only C-level sort
+        order, rank = get_payments_sort_order(data, sort_key, reverse)
+        if isinstance(rows, list):
+            rows.sort(key=rank.__getitem__)
+        else:
+            rows = order
+        payments = [payments[i] for i in rows]
         
-        # Calculate totals for all filtered data
-        totals = {
-            'non_retention': sum(p.get('non_retention', 0) for p in payments),
-            'retention': sum(p.get('retention', 0) for p in payments),
-            'invoice_amount': sum(p.get('invoice_amount', 0) for p in payments),
-            'paid_to_date': sum(p.get('paid_to_date', 0) for p in payments),
-            'remaining_balance': sum(p.get('remaining_balance', 0) for p in payments)
-        }
+        # Calculate totals for all filtered data (map/attrgetter keeps the column walk in C)
+        totals = {col: sum(map(attrgetter(col), payments)) for col in PAYMENTS_TOTAL_COLUMNS}
         
         # Paginate
         total = len(payments)
         start_idx = max(0, (page - 1) * page_size)
         end_idx = start_idx + page_size
-        page_data = payments[start_idx:end_idx]
+        page_data = [p._asdict() for p in payments[start_idx:end_idx]]
         
-        return jsonify({
+        # Encode straight to bytes; pages can run to a few hundred KB
+        return Response(_json_dumps({
             'success': True,
             'payments': page_data,
             'total': total,
@@ -5753,11 +6134,10 @@ def api_get_payments():
             'page': page,
             'pageSize': page_size,
             'totalPages': max(1, (total + page_size - 1) // page_size)
-        })
+        }), mimetype='application/json')
         
     except Exception as e:
         print(f"[PAYMENTS] API error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e), 'payments': [], 'total': 0, 'page': 1, 'pageSize': 25, 'totalPages': 1}), 500
 
@@ -5768,14 +6148,13 @@ def api_get_payments_metrics():
         return jsonify({'status': 'ok'})
     
     try:
-        data = get_payments_data()
-        return jsonify({
-            'success': True,
-            'metrics': data['metrics']
-        })
+        return Response(get_payments_data().metrics_body, mimetype='application/json')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# (jobs file mtime, encoded list), swapped as one tuple like pm_list_cache
+payments_pms_cache = {'entry': (None, b'[]')}
+
 @app.route('/api/payments/pms', methods=['GET', 'OPTIONS'])
 def api_get_payments_pms():
     """Get unique project manager values for filter dropdown - only PMs with active jobs"""
@@ -5784,19 +6163,17 @@ def api_get_payments_pms():
     
     try:
         # Get PMs with active jobs from job budgets data
-        jobs_path = os.path.join(os.path.dirname(__file__), 'data', 'financials_jobs.json')
-        active_pms = set()
+        if not os.path.exists(FINANCIALS_JOBS_PATH):
+            return jsonify([])
         
-        if os.path.exists(jobs_path):
-            with open(jobs_path, 'r', encoding='utf-8-sig') as f:
-                jobs_data = json.load(f)
-            for job in jobs_data.get('job_budgets', []):
-                if job.get('job_status', '') == 'A':
-                    pm = job.get('project_manager_name', '')
-                    if pm and pm.strip():
-                        active_pms.add(pm.strip())
+        # Reuse the encoded list until the jobs file changes
+        active_pms, _, mtime = get_active_job_pms()
+        cached_mtime, body = payments_pms_cache['entry']
+        if cached_mtime != mtime:
+            body = _json_dumps(active_pms)
+            payments_pms_cache['entry'] = (mtime, body)
         
-        return jsonify(sorted(list(active_pms)))
+        return Response(body, mimetype='application/json')
     except Exception as e:
         print(f"[PAYMENTS] PMs error: {e}")
         return jsonify([]), 500
@@ -5817,29 +6194,53 @@ def api_get_payments_filter_values():
             return jsonify({'success': False, 'error': 'invalid column', 'values': []}), 400
         
         data = get_payments_data()
-        payments = data['payments']
         
-        # Get unique values for the column
-        values = set()
-        for p in payments:
-            val = p.get(column, '')
-            if val:
-                values.add(str(val))
-        
-        # Sort and limit
-        sorted_values = sorted(list(values))[:500]
+        # Unique values are fixed for the lifetime of the cache, so build the body once per column
+        body = data.filter_values.get(column)
+        if body is None:
+            values = {str(value) for value in map(attrgetter(column), data.payments) if value}
+            body = _json_dumps({
+                'success': True,
+                'values': sorted(values)[:500],
+                'total': len(values),
+                'truncated': len(values) > 500
+            })
+            data.filter_values[column] = body
         
-        return jsonify({
-            'success': True,
-            'values': sorted_values,
-            'total': len(values),
-            'truncated': len(values) > 500
-        })
+        return Response(body, mimetype='application/json')
         
     except Exception as e:
         print(f"[PAYMENTS] Filter values error: {e}")
         return jsonify({'success': False, 'error': str(e), 'values': []}), 500
 
+def get_raw_invoices_version():
+    """Cache key for results derived from ap_invoices.json (its mtime)"""
+    return os.stat(AP_INVOICES_PATH).st_mtime
+
+@lru_cache(maxsize=4)
+def get_invoice_years_body(data_version):
+    """Encoded /years body for ap_invoices.json; data_version only keys the cache"""
+    # Load AP invoices data (same source as top vendors chart)
+    invoices = get_raw_invoices()
+    
+    # Extract unique years from invoice_date (Excel serial dates)
+    years = set()
+    for inv in invoices:
+        date_val = inv.get('invoice_date', '')
+        if date_val:
+            try:
+                # Convert Excel serial date to year
+                excel_date = float(date_val)
+                if excel_date > 0:
+                    year = excel_serial_to_datetime(excel_date).year
+                    if 2000 <= year <= 2100:
+                        years.add(year)
+            except (ValueError, TypeError):
+                pass
+    
+    sorted_years = sorted(years) if years else [2015, 2016, 2017, 2018, 2019, 2020, 2021, 2022, 2023, 2024, 2025]
+    return _json_dumps({'success': True, 'years': sorted_years})
+
 @app.route('/api/payments/years', methods=['GET', 'OPTIONS'])
 def api_get_payments_years():
     """Get available years from AP invoices data (for Top 10 Vendors chart)"""
@@ -5847,43 +6248,66 @@ def api_get_payments_years():
         return jsonify({'status': 'ok'})
     
     try:
-        # Load AP invoices data (same source as top vendors chart)
-        invoices_path = os.path.join(os.path.dirname(__file__), 'data', 'ap_invoices.json')
-        with open(invoices_path, 'r', encoding='utf-8-sig') as f:
-            invoices_json = json.load(f)
-        
-        invoices = invoices_json.get('invoices', [])
-        
-        # Extract unique years from invoice_date (Excel serial dates)
-        years = set()
-        for inv in invoices:
-            date_val = inv.get('invoice_date', '')
-            if date_val:
-                try:
-                    # Convert Excel serial date to year
-                    excel_date = float(date_val)
-                    if excel_date > 0:
-                        from datetime import datetime, timedelta
-                        base_date = datetime(1899, 12, 30)
-                        actual_date = base_date + timedelta(days=excel_date)
-                        year = actual_date.year
-                        if 2000 <= year <= 2100:
-                            years.add(year)
-                except (ValueError, TypeError):
-                    pass
-        
-        # Return sorted years
-        sorted_years = sorted(list(years)) if years else [2015, 2016, 2017, 2018, 2019, 2020, 2021, 2022, 2023, 2024, 2025]
-        
-        return jsonify({
-            'success': True,
-            'years': sorted_years
-        })
+        return Response(get_invoice_years_body(get_raw_invoices_version()), mimetype='application/json')
         
     except Exception as e:
         print(f"[PAYMENTS] Years error: {e}")
         return jsonify({'success': False, 'years': [2015, 2016, 2017, 2018, 2019, 2020, 2021, 2022, 2023, 2024, 2025]}), 500
 
+_vendor_totals_by_year = (None, {})
+
+def get_vendor_totals_by_year():
+    """Invoice totals as {year: Counter(vendor -> amount)}, rebuilt when the raw invoices reload"""
+    global _vendor_totals_by_year
+    
+    invoices = get_raw_invoices()
+    source, totals_by_year = _vendor_totals_by_year
+    if source is invoices:
+        return totals_by_year
+    
+    # Use the same exclusion list as the payments table
+    excluded_vendors = PAYMENTS_EXCLUDED_VENDORS_CASEFOLDED
+    
+    totals_by_year = {}
+    for inv in invoices:
+        date_val = inv.get('invoice_date', '')
+        if date_val:
+            try:
+                # Convert Excel serial date to year
+                excel_date = float(date_val)
+                if excel_date > 0:
+                    year = excel_serial_to_datetime(excel_date).year
+                    vendor = (inv.get('vendor_name', '') or '').strip()
+                    amount = float(inv.get('invoice_amount', 0) or 0)
+                    # Skip empty, dash-only, or excluded vendors
+                    if vendor and vendor.casefold() not in excluded_vendors and vendor not in ('-', '--', '---', 'Unknown'):
+                        year_totals = totals_by_year.get(year)
+                        if year_totals is None:
+                            year_totals = totals_by_year[year] = Counter()
+                        year_totals[vendor] += amount
+            except (ValueError, TypeError):
+                pass
+    
+    _vendor_totals_by_year = (invoices, totals_by_year)
+    return totals_by_year
+
+@lru_cache(maxsize=128)
+def get_top_vendors_body(start_year, end_year, data_version):
+    """Encoded top-10-vendors body for a year range; data_version only keys the cache"""
+    # Sum the per-year vendor totals across the requested range
+    vendor_totals = Counter()
+    for year, year_totals in get_vendor_totals_by_year().items():
+        if start_year <= year <= end_year:
+            vendor_totals.update(year_totals)
+    
+    # Get top 10 by total
+    return _json_dumps({
+        'success': True,
+        'vendors': [{'vendor': v[0], 'total': v[1]} for v in vendor_totals.most_common(10)],
+        'startYear': start_year,
+        'endYear': end_year
+    })
+
 @app.route('/api/payments/top-vendors', methods=['GET', 'OPTIONS'])
 def api_get_top_vendors():
     """Get top 10 vendors by spend within a year range"""
@@ -5894,49 +6318,10 @@ def api_get_top_vendors():
         start_year = int(request.args.get('startYear', 2020))
         end_year = int(request.args.get('endYear', 2025))
         
-        # Load raw invoices data directly for accurate date parsing
-        invoices_path = os.path.join(os.path.dirname(__file__), 'data', 'ap_invoices.json')
-        with open(invoices_path, 'r', encoding='utf-8-sig') as f:
-            invoices_json = json.load(f)
-        
-        invoices = invoices_json.get('invoices', [])
-        
-        # Use the same exclusion list as the payments table
-        excluded_vendors = PAYMENTS_EXCLUDED_VENDORS
-        
-        # Filter by year range and aggregate by vendor
-        vendor_totals = {}
-        for inv in invoices:
-            date_val = inv.get('invoice_date', '')
-            if date_val:
-                try:
-                    # Convert Excel serial date to year
-                    excel_date = float(date_val)
-                    if excel_date > 0:
-                        date_obj = datetime.fromtimestamp((excel_date - 25569) * 86400)
-                        year = date_obj.year
-                        if start_year <= year <= end_year:
-                            vendor = (inv.get('vendor_name', '') or '').strip()
-                            amount = float(inv.get('invoice_amount', 0) or 0)
-                            # Skip empty, dash-only, or excluded vendors
-                            if vendor and vendor not in excluded_vendors and vendor not in ('-', '--', '---', 'Unknown'):
-                                vendor_totals[vendor] = vendor_totals.get(vendor, 0) + amount
-                except (ValueError, TypeError):
-                    pass
-        
-        # Sort by total and get top 10
-        sorted_vendors = sorted(vendor_totals.items(), key=lambda x: x[1], reverse=True)[:10]
-        
-        return jsonify({
-            'success': True,
-            'vendors': [{'vendor': v[0], 'total': v[1]} for v in sorted_vendors],
-            'startYear': start_year,
-            'endYear': end_year
-        })
+        return Response(get_top_vendors_body(start_year, end_year, get_raw_invoices_version()), mimetype='application/json')
         
     except Exception as e:
         print(f"[PAYMENTS] Top vendors error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'success': False, 'vendors': [], 'error': str(e)}), 500
 
@@ -5957,10 +6342,12 @@ def api_get_ap_aging():
         ap_invoices = metrics_cache.ap
         
         # Use same exclusion list as payments
-        excluded_vendors = PAYMENTS_EXCLUDED_VENDORS
+        excluded_vendors = PAYMENTS_EXCLUDED_VENDORS_CASEFOLDED
         
-        # Group by vendor and calculate aging buckets
-        vendor_aging = {}
+        # Group by vendor and calculate aging buckets, one accumulator per column
+        aging_buckets = {bucket: defaultdict(int) for bucket in ('current', 'days_31_60', 'days_61_90', 'days_90_plus')}
+        total_due = defaultdict(int)
+        total_retainage = defaultdict(int)
         
         for inv in ap_invoices:
             # Filter by PM if provided
@@ -5979,20 +6366,9 @@ def api_get_ap_aging():
                 vendor = 'Unknown Vendor'
             
             # Skip excluded vendors
-            if vendor in excluded_vendors:
+            if vendor.casefold() in excluded_vendors:
                 continue
             
-            if vendor not in vendor_aging:
-                vendor_aging[vendor] = {
-                    'vendor_name': vendor,
-                    'total_due': 0,
-                    'current': 0,
-                    'days_31_60': 0,
-                    'days_61_90': 0,
-                    'days_90_plus': 0,
-                    'retainage': 0
-                }
-            
             # Use pre-computed values from metrics cache
             remaining = inv.get('remaining_balance', 0)
             retainage = inv.get('retainage', 0)
@@ -6001,21 +6377,25 @@ def api_get_ap_aging():
             # Amount due excluding retainage
             amount_ex_ret = remaining - retainage if retainage > 0 else remaining
             
-            # Add to appropriate bucket
-            if aging_bucket == 'current':
-                vendor_aging[vendor]['current'] += amount_ex_ret
-            elif aging_bucket == 'days_31_60':
-                vendor_aging[vendor]['days_31_60'] += amount_ex_ret
-            elif aging_bucket == 'days_61_90':
-                vendor_aging[vendor]['days_61_90'] += amount_ex_ret
-            else:
-                vendor_aging[vendor]['days_90_plus'] += amount_ex_ret
-            
-            vendor_aging[vendor]['total_due'] += amount_ex_ret
-            vendor_aging[vendor]['retainage'] += retainage
-        
-        # Convert to list
-        vendors_list = list(vendor_aging.values())
+            # The ETL's bucket names are the accumulator keys, so add directly
+            aging_buckets[aging_bucket][vendor] += amount_ex_ret
+            total_due[vendor] += amount_ex_ret
+            total_retainage[vendor] += retainage
+        
+        # Convert to list (total_due holds every vendor, in first-seen order)
+        current = aging_buckets['current']
+        days_31_60 = aging_buckets['days_31_60']
+        days_61_90 = aging_buckets['days_61_90']
+        days_90_plus = aging_buckets['days_90_plus']
+        vendors_list = [{
+            'vendor_name': vendor,
+            'total_due': due,
+            'current': current.get(vendor, 0),
+            'days_31_60': days_31_60.get(vendor, 0),
+            'days_61_90': days_61_90.get(vendor, 0),
+            'days_90_plus': days_90_plus.get(vendor, 0),
+            'retainage': total_retainage[vendor]
+        } for vendor, due in total_due.items()]
         
         # Apply search filter
         if search:
@@ -6054,7 +6434,6 @@ def api_get_ap_aging():
         
     except Exception as e:
         print(f"[AP-AGING] Error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'success': False, 'vendors': [], 'totals': {}, 'error': str(e)}), 500
 
@@ -6070,11 +6449,7 @@ def api_get_vendor_invoices():
             return jsonify({'success': False, 'error': 'Vendor name required'}), 400
         
         # Load invoices data
-        invoices_path = os.path.join(os.path.dirname(__file__), 'data', 'ap_invoices.json')
-        with open(invoices_path, 'r', encoding='utf-8-sig') as f:
-            invoices_json = json.load(f)
-        
-        invoices = invoices_json.get('invoices', [])
+        invoices = get_raw_invoices()
         
         # Load financials_jobs for job descriptions and PM names
         jobs_path = os.path.join(os.path.dirname(__file__), 'data', 'financials_jobs.json')
@@ -6185,7 +6560,6 @@ def api_get_vendor_invoices():
         
     except Exception as e:
         print(f"[AP-AGING] Vendor detail error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'success': False, 'invoices': [], 'error': str(e)}), 500
 
@@ -6245,11 +6619,7 @@ def api_get_ar_ap_summary():
         ar_totals['total'] = ar_totals['current'] + ar_totals['days_31_60'] + ar_totals['days_61_90'] + ar_totals['days_90_plus']
         
         # Load AP invoices
-        ap_invoices_path = os.path.join(os.path.dirname(__file__), 'data', 'ap_invoices.json')
-        with open(ap_invoices_path, 'r', encoding='utf-8-sig') as f:
-            ap_json = json.load(f)
-        
-        ap_invoices = ap_json.get('invoices', [])
+        ap_invoices = get_raw_invoices()
         
         # Calculate AP totals excluding retainage
         ap_totals = {'current': 0, 'days_31_60': 0, 'days_61_90': 0, 'days_90_plus': 0, 'total': 0, 'retainage': 0}
@@ -6302,7 +6672,6 @@ def api_get_ar_ap_summary():
         
     except Exception as e:
         print(f"[AR-AP-SUMMARY] Error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -6551,7 +6920,6 @@ def api_get_ar_aging():
         
     except Exception as e:
         print(f"[AR-AGING] Error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'success': False, 'customers': [], 'totals': {}, 'error': str(e)}), 500
 
@@ -6563,17 +6931,9 @@ def api_get_ar_aging_filters():
     
     try:
         # Get PMs with active jobs from job budgets data
-        jobs_path = os.path.join(os.path.dirname(__file__), 'data', 'financials_jobs.json')
-        active_pms = set()
-        
-        if os.path.exists(jobs_path):
-            with open(jobs_path, 'r', encoding='utf-8-sig') as f:
-                jobs_data = json.load(f)
-            for job in jobs_data.get('job_budgets', []):
-                if job.get('job_status', '') == 'A':
-                    pm = job.get('project_manager_name', '')
-                    if pm and pm.strip():
-                        active_pms.add(pm.strip())
+        active_pms = ()
+        if os.path.exists(FINANCIALS_JOBS_PATH):
+            active_pms, _, _ = get_active_job_pms()
         
         # Get unique customers from AR invoices with amount due
         invoices_path = os.path.join(os.path.dirname(__file__), 'data', 'ar_invoices.json')
@@ -6596,7 +6956,7 @@ def api_get_ar_aging_filters():
         return jsonify({
             'success': True,
             'customers': sorted(list(customers)),
-            'pms': sorted(list(active_pms))
+            'pms': list(active_pms)
         })
         
     except Exception as e:
@@ -6705,7 +7065,6 @@ def api_get_customer_invoices():
         
     except Exception as e:
         print(f"[AR-AGING] Customer detail error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'success': False, 'invoices': [], 'error': str(e)}), 500
 
@@ -6894,8 +7253,7 @@ def load_nlq_data():
         data['ar'] = {}
     
     try:
-        with open(os.path.join(data_dir, 'ap_invoices.json'), 'r', encoding='utf-8-sig') as f:
-            data['ap'] = json.load(f)
+        data['ap'] = {'invoices': get_raw_invoices()}
     except Exception as e:
         print(f"[NLQ] AP data load error: {e}")
         data['ap'] = {}
@@ -6909,6 +7267,10 @@ def load_nlq_data():
     
     return data
 
+# "last 30 days" / "last 2 weeks" style date_range filters
+_NLQ_DAYS_RE = re.compile(r'(\d+)\s*day')
+_NLQ_WEEKS_RE = re.compile(r'(\d+)\s*week')
+
 def execute_nlq_query(query_plan, data):
     """Execute a structured query plan against the data.
     
@@ -7565,8 +7927,7 @@ def execute_nlq_query(query_plan, data):
         elif target == 'cash':
             try:
                 # Fetch cash data from internal API endpoint
-                import requests
-                cash_response = requests.get('http://127.0.0.1:5000/api/cash-data', timeout=30)
+                cash_response = _HTTP.get('http://127.0.0.1:5000/api/cash-data', timeout=30)
                 if cash_response.status_code == 200:
                     cash_data = cash_response.json()
                     accounts = cash_data.get('accounts', [])
@@ -7582,16 +7943,15 @@ def execute_nlq_query(query_plan, data):
                             'accounts': [{'name': a.get('name', ''), 'balance': float(a.get('balance', 0) or 0)} for a in ftg_accounts]
                         }
                     elif aggregation == 'transactions':
-                        from datetime import datetime, timedelta
                         
                         # Parse date_range filter
                         date_range = filters.get('date_range', 'last 30 days')
                         today = datetime.now().date()
                         
                         # Try to extract number of days from the date_range string
-                        import re
-                        days_match = re.search(r'(\d+)\s*day', str(date_range).lower())
-                        weeks_match = re.search(r'(\d+)\s*week', str(date_range).lower())
+                        date_range_text = str(date_range).lower()
+                        days_match = _NLQ_DAYS_RE.search(date_range_text)
+                        weeks_match = _NLQ_WEEKS_RE.search(date_range_text)
                         
                         if days_match:
                             start_date = today - timedelta(days=int(days_match.group(1)))
@@ -7814,7 +8174,6 @@ def execute_nlq_query(query_plan, data):
         
     except Exception as e:
         print(f"[NLQ] Query execution error: {e}")
-        import traceback
         traceback.print_exc()
         results = {'error': str(e)}
     
@@ -7906,7 +8265,7 @@ Respond with ONLY the JSON object, no markdown."""
                 if intent_text.startswith('json'):
                     intent_text = intent_text[4:]
             intent_text = intent_text.strip()
-            query_plan = json.loads(intent_text)
+            query_plan = _json_loads(intent_text)
         except json.JSONDecodeError as e:
             print(f"[NLQ] JSON parse error: {e}, text: {intent_text}")
             return jsonify({
@@ -7965,7 +8324,6 @@ IMPORTANT:
         
     except Exception as e:
         print(f"[NLQ] Error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({
             'success': False,